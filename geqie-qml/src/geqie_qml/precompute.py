@@ -13,9 +13,13 @@ from tqdm import tqdm
 from qiskit.quantum_info import Operator
 
 import geqie
+from geqie.encodings import optional_functions
 
 logger = logging.getLogger(__name__)
 
+# Per-process templates of angle encodings, keyed by encoding, image shape and parameters
+_TEMPLATES: dict[tuple, geqie.EncodingTemplate] = {}
+
 
 # ---------------------------------------------------------------------------
 # Public entry point
@@ -29,6 +33,7 @@ def compute_and_save_circuits(
     number_of_workers: int | None = None,
     geqie_encoding: str | ModuleType = "frqi",
     encoding_params: dict[str, Any] = {},
+    use_templates: bool = True,
 ):
     """
     Encode a dataset of images into unitary matrices and save them as .npz files.
@@ -48,6 +53,10 @@ def compute_and_save_circuits(
         Filename prefix; files are named ``{prefix}_{index}.npz``.
     number_of_workers : int | None
         Worker processes.  Defaults to (cpu_count - 1), min 1.
+    use_templates : bool
+        Bind angle encodings to a parameterized template built once per image
+        shape instead of encoding every image from scratch.  The encoded states
+        agree up to the signs that ``geqie.encode`` attaches to zero-angle pixels.
     """
     if number_of_workers is None:
         number_of_workers = max(1, cpu_count() - 1)
@@ -65,7 +74,8 @@ def compute_and_save_circuits(
                 save_dir=save_dir,
                 file_prefix=file_prefix,
                 geqie_encoding=encoding_name,
-                encoding_params=encoding_params
+                encoding_params=encoding_params,
+                use_templates=use_templates,
             )
     else:
         with futures.ProcessPoolExecutor(max_workers=number_of_workers) as executor:
@@ -79,6 +89,7 @@ def compute_and_save_circuits(
                     file_prefix=file_prefix,
                     geqie_encoding=encoding_name,
                     encoding_params=encoding_params,
+                    use_templates=use_templates,
                 ) for i in tqdm(range(len(data)), total=len(data), desc="Submitting tasks")
             ]
 
@@ -121,12 +132,37 @@ def _import_encoding_module(encoding_name: str):
     return importlib.import_module(f"geqie.encodings.{normalized_name}")
 
 
-def _compute_circuit_unitary(image, geqie_encoding: str = "frqi", encoding_params: dict[str, Any] = {}):
+def _encoding_template(image, encoding_module: ModuleType, encoding_params: dict[str, Any] = {}):
+    """
+    Return the parameterized template of an angle encoding for the shape of ``image``.
+
+    Templates are built once per process for every encoding, image shape and set of
+    parameters. Returns None for encodings that do not support templates.
+    """
+    functions = optional_functions(encoding_module)
+    if "batch_angle_function" not in functions:
+        return None
+
+    key = (encoding_module.__name__, np.shape(image), repr(sorted(encoding_params.items())))
+    if key not in _TEMPLATES:
+        _TEMPLATES[key] = geqie.encode_template(
+            encoding_module.init_function,
+            encoding_module.data_function,
+            encoding_module.map_function,
+            image=np.asarray(image),
+            perform_measurement=False,
+            encoding_params=encoding_params,
+            **functions,
+        )
+    return _TEMPLATES[key]
+
+
+def _compute_circuit_unitary(image, geqie_encoding: str = "frqi", encoding_params: dict[str, Any] = {}, use_templates: bool = True):
     """
     Encode a single image and return its full unitary matrix.
 
-    The unitary is decomposed into a state-preparation part (cached per
-    qubit count) and the encoding rotations, then multiplied together.
+    Angle encodings bind the image to a template built once per image shape and skip
+    the synthesis of a new circuit; the other encodings are encoded from scratch.
 
     Parameters
     ----------
@@ -136,12 +172,18 @@ def _compute_circuit_unitary(image, geqie_encoding: str = "frqi", encoding_param
         GEQIE encoding name, e.g. ``"frqi"``.  Defaults to ``"frqi"``.
     encoding_params : dict[str, Any]
         Additional parameters passed to the encoding function.
+    use_templates : bool
+        Bind angle encodings to a per-shape template.
 
     Returns
     -------
     np.ndarray, complex128, shape (2**n, 2**n)
     """
     encoding_module = _import_encoding_module(_normalize_encoding_name(geqie_encoding))
+    template = _encoding_template(image, encoding_module, encoding_params) if use_templates else None
+    if template is not None:
+        return Operator.from_circuit(template.assign(np.asarray(image))).to_matrix()
+
     circuit = geqie.encode(
         encoding_module.init_function,
         encoding_module.data_function,
@@ -149,13 +191,14 @@ def _compute_circuit_unitary(image, geqie_encoding: str = "frqi", encoding_param
         image=image,
         perform_measurement=False,
         encoding_params=encoding_params,
+        **optional_functions(encoding_module),
     )
     return Operator.from_circuit(circuit).to_matrix()
 
 
-def _compute_save_single(image, label, sample_index, save_dir, file_prefix, geqie_encoding, encoding_params):
+def _compute_save_single(image, label, sample_index, save_dir, file_prefix, geqie_encoding, encoding_params, use_templates=True):
     """Single-sample worker."""
     filename = os.path.join(save_dir, f"{file_prefix}_{sample_index}_label_{label}")
-    unitary_matrix = _compute_circuit_unitary(image, geqie_encoding, encoding_params)
+    unitary_matrix = _compute_circuit_unitary(image, geqie_encoding, encoding_params, use_templates)
     np.savez(file=filename, matrix=unitary_matrix, label=label, dtype=np.complex128)
 
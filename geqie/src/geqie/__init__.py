@@ -1 +1,4 @@
-from .main import *
\ No newline at end of file
+from .main import *
+from .resources import estimate
+from .session import Session
+from .tracing import Trace
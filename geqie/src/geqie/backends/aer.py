@@ -0,0 +1,196 @@
+import hashlib
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from qiskit import transpile
+from qiskit.circuit import Instruction, ParameterExpression, QuantumCircuit
+from qiskit.circuit.library import Initialize, StatePreparation, UCGate, UnitaryGate
+from qiskit_aer import AerSimulator
+
+from geqie.counts import DenseCounts
+from geqie.sampling import format_counts
+from geqie.synthesis.ucr import MultiplexedRYGate, ry_matrices
+
+# Instructions Aer runs without a matching target entry
+DIRECTIVES = {"barrier"}
+
+# Largest state preparation lowered to a dense unitary, of 4^10 amplitudes
+MAX_UNITARY_PREPARATION_QUBITS = 10
+
+
+def get_aer_simulator(device: str = "CPU", method: str = "automatic", **options: Any) -> AerSimulator:
+    return AerSimulator(device=device, method=method, **options)
+
+
+def _param_digest(param: Any) -> bytes:
+    if isinstance(param, ParameterExpression):
+        return str(param).encode()
+    if isinstance(param, np.ndarray):
+        return f"{param.shape}{param.dtype.str}".encode() + np.ascontiguousarray(param).tobytes()
+    return repr(param).encode()
+
+
+def structural_key(circuit: QuantumCircuit) -> str:
+    """
+    Hash of the instruction sequence of a circuit, including its numeric parameter values.
+
+    Unbound parameters enter the hash by name, so every image bound to the same template
+    circuit shares one key.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{circuit.num_qubits}|{circuit.num_clbits}|".encode())
+    for instruction in circuit.data:
+        digest.update(instruction.operation.name.encode())
+        digest.update(str([circuit.find_bit(qubit).index for qubit in instruction.qubits]).encode())
+        digest.update(str([circuit.find_bit(clbit).index for clbit in instruction.clbits]).encode())
+        for param in instruction.operation.params:
+            digest.update(_param_digest(param))
+    return digest.hexdigest()
+
+
+def preparation_unitary(state: np.ndarray) -> np.ndarray:
+    """Unitary whose first column is the normalized `state`, completed by a QR decomposition."""
+    state = np.asarray(state, dtype=np.complex128)
+    basis = np.eye(len(state), dtype=np.complex128)
+    basis[:, 0] = state / np.linalg.norm(state)
+    Q, R = np.linalg.qr(basis)
+    # QR fixes the first column only up to a phase, which is moved back into it
+    Q[:, 0] *= R[0, 0] / abs(R[0, 0])
+    return Q
+
+
+def _lowered_preparation(operation: StatePreparation) -> Instruction:
+    if operation.num_qubits <= MAX_UNITARY_PREPARATION_QUBITS and len(operation.params) == 2**operation.num_qubits:
+        return UnitaryGate(preparation_unitary(operation.params), check_input=False)
+    return Initialize(operation.params)
+
+
+def lower_state_preparation(circuit: QuantumCircuit) -> QuantumCircuit:
+    """
+    Replace state preparations acting on qubits that are still in |0> by native instructions.
+
+    A `StatePreparation` is synthesized into gates by the transpiler at a cost far beyond
+    simulating small circuits. Preparations of up to `MAX_UNITARY_PREPARATION_QUBITS`
+    qubits become a dense unitary mapping |0> to the state. Larger ones become `initialize`,
+    which Aer treats as a reset, which in turn rules out sampling all shots from a single
+    run of the circuit.
+    """
+    touched = set()
+    lowerable = []
+    for index, instruction in enumerate(circuit.data):
+        operation = instruction.operation
+        if (
+            isinstance(operation, StatePreparation)
+            and not getattr(operation, "_inverse", False)
+            and touched.isdisjoint(instruction.qubits)
+        ):
+            lowerable.append(index)
+        touched.update(instruction.qubits)
+    if not lowerable:
+        return circuit
+
+    lowered = circuit.copy_empty_like()
+    for index, instruction in enumerate(circuit.data):
+        operation = _lowered_preparation(instruction.operation) if index in lowerable else instruction.operation
+        lowered.append(operation, instruction.qubits, instruction.clbits, copy=False)
+    return lowered
+
+
+def lower_multiplexed_rotations(circuit: QuantumCircuit) -> QuantumCircuit:
+    """
+    Replace uniformly controlled RY rotations by Aer's native multiplexer.
+
+    The multiplexer applies one 2x2 block per control value in a single pass over the
+    state, while the CNOT decomposition of the rotation takes `2^k` passes.
+    """
+    if not any(isinstance(instruction.operation, MultiplexedRYGate) for instruction in circuit.data):
+        return circuit
+
+    lowered = circuit.copy_empty_like()
+    for instruction in circuit.data:
+        operation = instruction.operation
+        if isinstance(operation, MultiplexedRYGate):
+            # Control simplification would drop the blocks Aer expects for every control value
+            operation = UCGate(list(ry_matrices(operation.angles)), mux_simp=False)
+        lowered.append(operation, instruction.qubits, instruction.clbits, copy=False)
+    return lowered
+
+
+def lower_noiseless(circuit: QuantumCircuit) -> QuantumCircuit:
+    """Lower the instructions of a noiseless circuit that Aer runs faster natively than decomposed."""
+    return lower_multiplexed_rotations(lower_state_preparation(circuit))
+
+
+def supported_operations(simulator: AerSimulator) -> set[str]:
+    # The target of an AerSimulator is rebuilt on every access
+    return set(simulator.target.operation_names) | DIRECTIVES
+
+
+def is_native(circuit: QuantumCircuit, simulator: AerSimulator, supported: set[str] | None = None) -> bool:
+    """Whether the simulator can run every instruction of the circuit without transpilation."""
+    supported = supported if supported is not None else supported_operations(simulator)
+    return all(instruction.operation.name in supported for instruction in circuit.data)
+
+
+def prepare_circuit(circuit: QuantumCircuit, simulator: AerSimulator, noise_model: Any = None) -> QuantumCircuit:
+    """
+    Bring a circuit into a form the simulator runs, transpiling only when needed.
+
+    State preparations and uniformly controlled rotations are only lowered to native
+    instructions for noiseless simulations, so that noise models keep applying to their gates.
+    """
+    if noise_model is None and simulator.options.noise_model is None:
+        circuit = lower_noiseless(circuit)
+    if is_native(circuit, simulator):
+        return circuit
+    return transpile(circuit, simulator, optimization_level=0)
+
+
+def prepare_circuits(circuits: Sequence[QuantumCircuit], simulator: AerSimulator, noise_model: Any = None) -> List[QuantumCircuit]:
+    """`prepare_circuit` for many circuits, transpiling all those that need it in a single call."""
+    if noise_model is None and simulator.options.noise_model is None:
+        circuits = [lower_noiseless(circuit) for circuit in circuits]
+    prepared = list(circuits)
+
+    supported = supported_operations(simulator)
+    pending = [index for index, circuit in enumerate(prepared) if not is_native(circuit, simulator, supported)]
+    if pending:
+        transpiled = transpile([prepared[index] for index in pending], simulator, optimization_level=0)
+        for index, circuit in zip(pending, transpiled):
+            prepared[index] = circuit
+    return prepared
+
+
+def probability_circuit(circuit: QuantumCircuit) -> QuantumCircuit:
+    """Copy of the circuit saving its exact output probabilities instead of measuring."""
+    circuit = circuit.remove_final_measurements(inplace=False)
+    circuit.save_probabilities()
+    return circuit
+
+
+def result_counts(
+    result: Any,
+    index: int,
+    num_qubits: int,
+    return_padded_counts: bool = False,
+    return_dense_counts: bool = False,
+) -> Dict[str, int] | DenseCounts:
+    """
+    Counts of an experiment of an Aer result in the requested output form.
+
+    Dense counts are read from the histogram of integer outcomes Aer returns, without
+    formatting a bitstring for every outcome.
+    """
+    if not return_dense_counts:
+        return format_counts(result.get_counts(index), num_qubits, return_padded_counts)
+    histogram = result.data(index)["counts"]
+    indices = np.fromiter((int(outcome, 16) for outcome in histogram), dtype=np.int64, count=len(histogram))
+    weights = np.fromiter(histogram.values(), dtype=np.float64, count=len(histogram))
+    return DenseCounts.from_indices(indices, weights, num_qubits)
+
+
+def result_probabilities(result: Any) -> List[np.ndarray]:
+    """Probability vectors saved by the experiments of an Aer result, one per experiment and each of its own length."""
+    return [np.asarray(result.data(index)["probabilities"]) for index in range(len(result.results))]
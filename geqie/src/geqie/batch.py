@@ -0,0 +1,95 @@
+"""Batches of many images processed within one process, optionally across a pool of worker processes."""
+
+import glob
+import json
+import os
+
+from concurrent import futures
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from geqie.parallel import init_worker
+
+# Glob characters, which mark an image path as a pattern rather than a file
+GLOB_CHARACTERS = set("*?[")
+
+
+def read_manifest(path: str | Path) -> List[Path]:
+    """
+    Paths listed in a manifest file, relative ones resolved against its directory.
+
+    A manifest holds either a JSON list of paths or one path per line, where blank lines
+    and lines starting with '#' are ignored.
+    """
+    path = Path(path)
+    text = path.read_text()
+    if text.lstrip().startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+    return [entry if entry.is_absolute() else path.parent / entry for entry in map(Path, entries)]
+
+
+def expand_paths(paths: Sequence[str | Path], suffixes: Sequence[str] = ()) -> List[Path]:
+    """
+    Files named by `paths`, in order: files as they are, the files matching glob patterns,
+    and the files within directories, searched recursively, with one of the `suffixes`.
+    """
+    expanded = []
+    for path in map(str, paths):
+        if GLOB_CHARACTERS & set(path):
+            matches = [Path(match) for match in sorted(glob.glob(path, recursive=True)) if Path(match).is_file()]
+            if not matches:
+                raise ValueError(f"No file matches '{path}'")
+            expanded.extend(matches)
+        elif Path(path).is_dir():
+            expanded.extend(sorted(file for file in Path(path).rglob("*") if file.is_file() and file.suffix.lower() in suffixes))
+        else:
+            expanded.append(Path(path))
+    return expanded
+
+
+def output_names(paths: Sequence[str | Path]) -> Dict[Path, Path]:
+    """
+    Names of the per-path outputs of a batch, without suffix: the paths relative to their
+    common directory, so that outputs mirror its subdirectories and files sharing a name
+    in different subdirectories do not overwrite each other.
+    """
+    paths = [Path(path) for path in paths]
+    absolute = [path.absolute() for path in paths]
+    root = Path(os.path.commonpath([path.parent for path in absolute])) if absolute else Path()
+    return {path: full.parent.relative_to(root) / full.stem for path, full in zip(paths, absolute)}
+
+
+def is_batch(path: str | Path | None) -> bool:
+    """Whether a path names a batch of files, i.e. a directory or a glob pattern, rather than a single file."""
+    return path is not None and (bool(GLOB_CHARACTERS & set(str(path))) or Path(path).is_dir())
+
+
+def run_batch(
+    function: Callable[..., Any],
+    items: Sequence[Any],
+    workers: int | None = None,
+    *args: Any,
+) -> Iterator[Tuple[Any, Any, Exception | None]]:
+    """
+    Call `function(item, *args)` on every item, yielding `(item, result, error)` as each call finishes.
+
+    With more than one of `workers`, calls run in a pool of that many processes and are
+    yielded in the order they finish, otherwise in order within the calling process. An
+    error of a call is yielded in place of its result, so that one failing item does not
+    stop the batch; `function` and its arguments must then be picklable.
+    """
+    if workers is None or workers <= 1 or len(items) <= 1:
+        for item in items:
+            try:
+                yield item, function(item, *args), None
+            except Exception as error:
+                yield item, None, error
+        return
+
+    with futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        pending = {executor.submit(function, item, *args): item for item in items}
+        for future in futures.as_completed(pending):
+            error = future.exception()
+            yield pending[future], None if error is not None else future.result(), error
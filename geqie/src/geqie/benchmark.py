@@ -0,0 +1,265 @@
+"""Throughput benchmarks of encoding and simulating images across encodings, image sizes and shot counts."""
+
+import csv
+import importlib
+import json
+
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from PIL import Image
+from qiskit import transpile
+
+import geqie.main as main
+import geqie.resources as resources
+from geqie.encodings import optional_functions
+from geqie.tracing import STAGES, Trace
+
+ENCODINGS_PATH = Path(__file__).parent / "encodings"
+
+# Test images of the repository, benchmarked by default from a source checkout
+TEST_IMAGES_PATH = Path(__file__).parents[3] / "assets" / "test_images"
+
+# Stages of an encode followed by a simulation, which never reaches an execution
+BENCHMARK_STAGES = tuple(stage for stage in STAGES if stage != "execution")
+
+# Columns identifying a benchmark case, under which two runs are compared
+BENCHMARK_KEY = ("encoding", "image", "n_shots", "synthesis", "engine")
+
+COMPARED_METRICS = (
+    "total_time",
+    *(f"{stage}_time" for stage in BENCHMARK_STAGES),
+    "peak_memory",
+    "num_qubits",
+    "depth",
+    "two_qubit_gates",
+)
+
+# Differences below these are noise, whatever their ratio
+MIN_TIME_DIFFERENCE = 1e-3
+MIN_MEMORY_DIFFERENCE = 2**20
+
+
+def list_encodings() -> List[str]:
+    """Names of the bundled encodings."""
+    return sorted(path.parent.name for path in ENCODINGS_PATH.glob("*/__init__.py"))
+
+
+def find_images(paths: Sequence[str | Path], image_dimensionality: int = 2) -> List[Path]:
+    """Image files among `paths`, searching directories recursively: PNG files for 2-D images, NumPy files otherwise."""
+    pattern = "*.png" if image_dimensionality == 2 else "*.npy"
+    images = []
+    for path in map(Path, paths):
+        if not path.exists():
+            raise ValueError(f"Image path '{path}' does not exist")
+        images.extend(sorted(path.rglob(pattern)) if path.is_dir() else [path])
+    return images
+
+
+def load_image(path: str | Path, image_dimensionality: int = 2) -> np.ndarray:
+    if image_dimensionality == 2:
+        return np.asarray(Image.open(path))
+    return np.load(path)
+
+
+def benchmark_case(
+    encoding: str,
+    image_path: str | Path,
+    n_shots: int,
+    synthesis: str = "auto",
+    engine: str = "aer",
+    repeats: int = 1,
+    max_qubits: int | None = None,
+    image_dimensionality: int = 2,
+    encoding_params: Dict[str, Any] = {},
+    seed: int | None = None,
+) -> Dict[str, Any]:
+    """
+    Encode and simulate an image `repeats` times, returning one row of the benchmark.
+
+    The row holds the wall time of every stage in seconds, the fastest of all repeats, and
+    its peak memory in bytes, the largest of all repeats. `num_qubits` and `depth` describe
+    the encoded circuit, and `two_qubit_gates` counts its CX gates once transpiled to CX and
+    single-qubit gates, outside of the timed stages.
+    Cases needing more than `max_qubits` qubits are skipped, and cases raising an error are
+    recorded as failed, so that a sweep always runs to its end.
+    """
+    row: Dict[str, Any] = {
+        "encoding": encoding,
+        "image": str(image_path),
+        "n_shots": n_shots,
+        "synthesis": synthesis,
+        "engine": engine,
+        "status": "ok",
+        "error": None,
+    }
+    try:
+        module = importlib.import_module(f"geqie.encodings.{encoding}")
+        image = load_image(image_path, image_dimensionality)
+        row["image_shape"] = "x".join(str(size) for size in image.shape)
+
+        estimate = resources.estimate(module, image.shape, encoding_params, image_dimensionality=image_dimensionality)
+        row["num_qubits"] = estimate.num_qubits
+        if max_qubits is not None and estimate.num_qubits > max_qubits:
+            row.update(status="skipped", error=f"{estimate.num_qubits} qubits exceed the maximum of {max_qubits}")
+            return row
+
+        traces = []
+        for _ in range(repeats):
+            trace = Trace()
+            circuit = main.encode(
+                module.init_function,
+                module.data_function,
+                module.map_function,
+                image,
+                image_dimensionality=image_dimensionality,
+                encoding_params=encoding_params,
+                synthesis=synthesis,
+                trace=trace,
+                **optional_functions(module),
+            )
+            main.simulate(circuit, n_shots, engine=engine, seed=seed, trace=trace)
+            traces.append(trace)
+        two_qubit_gates = transpile(circuit, basis_gates=["cx", "u"]).count_ops().get("cx", 0)
+    except Exception as error:
+        row.update(status="failed", error=f"{type(error).__name__}: {error}")
+        return row
+
+    for stage in BENCHMARK_STAGES:
+        row[f"{stage}_time"] = min(trace.wall_time(stage) for trace in traces)
+        row[f"{stage}_memory"] = max(
+            (record.peak_memory for trace in traces for record in trace.stages if record.name == stage),
+            default=0,
+        )
+    row["total_time"] = min(sum(record.wall_time for record in trace.stages) for trace in traces)
+    row["peak_memory"] = max(row[f"{stage}_memory"] for stage in BENCHMARK_STAGES)
+    row["max_rss"] = max(record.max_rss or 0 for trace in traces for record in trace.stages)
+    row["num_qubits"] = traces[-1].counters["num_qubits"]
+    row["depth"] = traces[-1].counters["depth"]
+    row["two_qubit_gates"] = two_qubit_gates
+    return row
+
+
+def run_benchmark(
+    encodings: Sequence[str] | None = None,
+    images: Sequence[str | Path] | None = None,
+    n_shots: Sequence[int] = (1024,),
+    synthesis: str = "auto",
+    engine: str = "aer",
+    repeats: int = 1,
+    max_qubits: int | None = 16,
+    image_dimensionality: int = 2,
+    encoding_params: Dict[str, Any] = {},
+    seed: int | None = None,
+    callback: Callable[[Dict[str, Any]], None] | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Benchmark every combination of `encodings`, by default all bundled ones, of the images
+    found under `images`, by default the test images of the repository, and of the shot
+    counts `n_shots`. `callback` is called with every row as soon as its case is done.
+    """
+    images = images or (TEST_IMAGES_PATH,)
+    rows = []
+    for encoding in encodings or list_encodings():
+        for image_path in find_images(images, image_dimensionality):
+            for shots in n_shots:
+                row = benchmark_case(
+                    encoding, image_path, shots, synthesis, engine, repeats, max_qubits, image_dimensionality, encoding_params, seed,
+                )
+                rows.append(row)
+                if callback is not None:
+                    callback(row)
+    return rows
+
+
+def write_results(rows: List[Dict[str, Any]], path: str | Path):
+    """Write benchmark rows to a CSV file, or to a JSON file for any other suffix."""
+    path = Path(path)
+    if path.suffix != ".csv":
+        path.write_text(json.dumps(rows, indent=2))
+        return
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    with path.open("w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _parse_value(value: str) -> Any:
+    if value == "":
+        return None
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def read_results(path: str | Path) -> List[Dict[str, Any]]:
+    """Read benchmark rows written by `write_results`."""
+    path = Path(path)
+    if path.suffix != ".csv":
+        return json.loads(path.read_text())
+    with path.open(newline="") as file:
+        return [{column: _parse_value(value) for column, value in row.items()} for row in csv.DictReader(file)]
+
+
+@dataclass
+class Comparison:
+    """Change of a metric of a benchmark case between a baseline and a candidate run."""
+    key: Tuple[Any, ...]
+    metric: str
+    baseline: Any
+    candidate: Any
+    ratio: float | None
+    regression: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _regressed(metric: str, baseline: float, candidate: float, threshold: float) -> bool:
+    if metric.endswith("_time") and candidate - baseline < MIN_TIME_DIFFERENCE:
+        return False
+    if metric.endswith("_memory") and candidate - baseline < MIN_MEMORY_DIFFERENCE:
+        return False
+    return candidate > baseline * (1 + threshold)
+
+
+def compare_results(
+    baseline: List[Dict[str, Any]],
+    candidate: List[Dict[str, Any]],
+    threshold: float = 0.2,
+    metrics: Sequence[str] = COMPARED_METRICS,
+) -> List[Comparison]:
+    """
+    Compare the metrics of the cases benchmarked in both runs.
+
+    A metric regresses when the candidate exceeds the baseline by more than `threshold`,
+    relative to the baseline, and times and memory additionally by more than their noise
+    floor. A case that ran in the baseline but not in the candidate regresses in its
+    `status`.
+    """
+    baseline_rows = {tuple(row[column] for column in BENCHMARK_KEY): row for row in baseline}
+    comparisons = []
+    for row in candidate:
+        key = tuple(row[column] for column in BENCHMARK_KEY)
+        if key not in baseline_rows:
+            continue
+        base = baseline_rows[key]
+        if base["status"] != row["status"]:
+            comparisons.append(Comparison(key, "status", base["status"], row["status"], None, base["status"] == "ok"))
+            continue
+        if row["status"] != "ok":
+            continue
+        for metric in metrics:
+            before, after = base.get(metric), row.get(metric)
+            if before is None or after is None:
+                continue
+            ratio = after / before if before else None
+            comparisons.append(Comparison(key, metric, before, after, ratio, _regressed(metric, before, after, threshold)))
+    return comparisons
@@ -0,0 +1,178 @@
+"""Content-addressed on-disk cache of encoded operators, with LRU eviction by size."""
+
+import hashlib
+import inspect
+import os
+import tempfile
+import time
+
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+from geqie.assembly import BlockDiagonalOperator
+from geqie.preparation import image_digest
+
+# Bumped whenever the layout of cache entries changes
+CACHE_FORMAT_VERSION = 1
+# Default cache size limit: 1 GiB
+DEFAULT_CACHE_MAX_SIZE = 2**30
+# Sources of geqie itself, hashed into every key
+GEQIE_PATH = Path(__file__).parent
+
+
+def _geqie_version() -> str:
+    try:
+        return version("geqie")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _geqie_digest() -> str:
+    """
+    Hash of every source file of geqie, since stored operators also depend on the shared
+    encoding helpers and on the unitarization, which editable installs change without
+    changing the version.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(GEQIE_PATH.rglob("*.py")):
+        digest.update(f"{path.relative_to(GEQIE_PATH)}|".encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _source_files(function: Callable) -> list[Path]:
+    """
+    Source files an encoding function depends on: every module of the package defining it,
+    since exported functions are often wrappers around those of sibling modules, or the
+    single module defining it otherwise.
+    """
+    path = Path(inspect.getsourcefile(function))
+    if (path.parent / "__init__.py").exists():
+        return sorted(path.parent.rglob("*.py"))
+    return [path]
+
+
+def _source_digest(function: Callable | None) -> str:
+    """Hash of the source files of a function, or of its bytecode when it has none."""
+    if function is None:
+        return "-"
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        for path in _source_files(function):
+            digest.update(f"{path.name}|".encode())
+            digest.update(path.read_bytes())
+    except (TypeError, OSError):
+        code = getattr(function, "__code__", None)
+        digest.update(code.co_code if code is not None else repr(function).encode())
+    return digest.hexdigest()
+
+
+def cache_key(
+    image: np.ndarray,
+    functions: Tuple[Callable | None, ...],
+    encoding_params: Dict[str, Any] = {},
+    image_dimensionality: int = 2,
+) -> str:
+    """
+    Content address of an encode call.
+
+    The key covers the raw image, the source files of geqie and of the packages defining the
+    encoding functions, the encoding parameters and the image dimensionality, so editing any
+    module of geqie or of an encoding invalidates its entries.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{CACHE_FORMAT_VERSION}|{_geqie_version()}|{image_dimensionality}|".encode())
+    digest.update(_geqie_digest().encode())
+    digest.update(image_digest(image).encode())
+    for function in functions:
+        digest.update(_source_digest(function).encode())
+    digest.update(repr(sorted(encoding_params.items())).encode())
+    return digest.hexdigest()
+
+
+class OperatorCache:
+    """
+    Directory of ``<key>.npz`` entries holding the unitarized operator and initial state of an encoding.
+
+    Hits refresh the modification time of an entry, and writes evict the least recently
+    used entries until the directory holds at most `max_size` bytes. Entries are written
+    atomically, so concurrent processes may share one cache directory.
+    """
+
+    def __init__(self, directory: str | os.PathLike, max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def _touch(self, path: Path) -> None:
+        # File system timestamps may be too coarse to order consecutive accesses
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def _entries(self) -> list[Path]:
+        return list(self.directory.glob("*.npz"))
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+    def size(self) -> int:
+        """Total size of all entries in bytes."""
+        return sum(path.stat().st_size for path in self._entries())
+
+    def clear(self) -> None:
+        for path in self._entries():
+            path.unlink(missing_ok=True)
+
+    def get(self, key: str) -> Tuple[BlockDiagonalOperator | np.ndarray, np.ndarray] | None:
+        """Return the cached ``(U, init_state)`` pair, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                U = BlockDiagonalOperator(entry["blocks"]) if "blocks" in entry else entry["matrix"]
+                init_state = entry["init_state"]
+            self._touch(path)
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+        return U, init_state
+
+    def put(self, key: str, U: BlockDiagonalOperator | np.ndarray, init_state: Any) -> None:
+        arrays = {"init_state": np.asarray(init_state)}
+        if isinstance(U, BlockDiagonalOperator):
+            arrays["blocks"] = U.blocks
+        else:
+            arrays["matrix"] = U
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.savez_compressed(file, **arrays)
+            os.replace(tmp_path, self._path(key))
+            self._touch(self._path(key))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits `max_size`."""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
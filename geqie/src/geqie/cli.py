@@ -2,27 +2,46 @@ import functools
 import importlib
 import importlib.util
 import ast
+import contextlib
 import json
 import sys
 import types
 
 from pathlib import Path
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, List, Tuple
 
 import click
 import cloup
 from PIL import Image
+from tabulate import tabulate
 
 import qiskit
 import numpy as np
 
 import geqie.main as main
+import geqie.batch as batch
+import geqie.benchmark as benchmark
+import geqie.cache as cache
+import geqie.profiling as profiling
+import geqie.resources as resources
+import geqie.synthesis as synthesis
+import geqie.tiling as tiling
+from geqie.counts import DenseCounts
+from geqie.planner import SimulationPlan
+from geqie.encodings import optional_functions
 from geqie.logging_utils import levels as logging_levels
 
 ENCODINGS_PATH = Path(__file__).parent / "encodings"
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
 
 
 def _import_encoding(encoding: str, **_) -> types.ModuleType:
+    return _load_encoding(encoding)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_encoding(encoding: str) -> types.ModuleType:
+    # Loaded once per process, so that batches of images do not execute the module again
     encoding_dir = ENCODINGS_PATH / encoding
     init_file = encoding_dir / "__init__.py"
     
@@ -48,6 +67,20 @@ def _import_encoding(encoding: str, **_) -> types.ModuleType:
     return module
 
 
+def _image_paths(image_path=None, manifest=None, image_dimensionality=2, **_) -> List[Path] | None:
+    """Images of a batch given by a directory, a glob pattern or a manifest, None for a single image file."""
+    if manifest is not None:
+        return batch.read_manifest(manifest)
+    if image_path is None:
+        raise click.UsageError("Either '--image-path' or '--manifest' is required")
+    if not batch.is_batch(image_path):
+        return None
+    try:
+        return batch.expand_paths([image_path], suffixes=IMAGE_SUFFIXES if image_dimensionality == 2 else (".npy",))
+    except ValueError as error:
+        raise click.UsageError(str(error))
+
+
 def _parse_image(image_path, image_dimensionality, **_) -> np.ndarray:
     if image_dimensionality == 2:
         image = Image.open(image_path)
@@ -56,9 +89,26 @@ def _parse_image(image_path, image_dimensionality, **_) -> np.ndarray:
         return np.load(image_path)
 
 
+def _parse_image_shape(image_path, image_dimensionality, image_shape=None, **_) -> Tuple[int, ...]:
+    """Shape of the image, read from the header of the image file without decoding it."""
+    if image_shape:
+        return tuple(int(size) for size in image_shape.split(","))
+    if image_path is None:
+        raise click.UsageError("Either '--image-path' or '--image-shape' is required")
+    if image_dimensionality == 2:
+        with Image.open(image_path) as image:
+            bands = len(image.getbands())
+            return (image.height, image.width) + ((bands,) if bands > 1 else ())
+    return np.load(image_path, mmap_mode="r").shape
+
+
 @cloup.group()
-def cli() -> None:
-    pass
+@cloup.option("--profile", "profile_path", envvar="GEQIE_PROFILE", default=None, metavar="PATH", help="Profile the command, writing PATH.pstats and PATH.allocations.txt, or files named after the command and process within PATH when it is a directory  [env var: GEQIE_PROFILE]")
+@cloup.option("--profile-collapsed", is_flag=True, default=False, help="With '--profile', also write PATH.collapsed.txt with sampled stacks for flame graph tools")
+@cloup.pass_context
+def cli(ctx: cloup.Context, profile_path: str | None, profile_collapsed: bool) -> None:
+    if profile_path:
+        ctx.with_resource(profiling.profile(profile_path, command=ctx.invoked_subcommand or "geqie", collapsed=profile_collapsed))
 
 
 @cli.command()
@@ -72,10 +122,13 @@ def encoding_options(func) -> Callable:
         required=True,
         help="Name of the encoding from 'encodings' directory",
     )
-    @cloup.option("--image-path", required=True, help="Path to the image file")
+    @cloup.option("--image-path", default=None, help="Path to the image file, or a directory or glob pattern of images to process as a batch")
+    @cloup.option("--manifest", default=None, help="File listing the images of a batch, one path per line or as a JSON list")
     @cloup.option("--image-dimensionality", type=int, default=2, show_default=True, help="Number of image dimensions to consider")
     @cloup.option("--bitrate", type=int, default=8, show_default=True, help="Number of color bits for encodings that support it")
     @cloup.option("--verbosity-level", default="ERROR", help=f"Set verbosity level, 0-6 (higher means more verbose) or use names {logging_levels.CLI_VERBOSITY_LEVELS.values()}")
+    @cloup.option("--log-dump-dir", envvar="GEQIE_LOG_DUMP_DIR", default=None, help="Directory to which the operators logged at the MATH verbosity level are saved as .npy files instead of text  [env var: GEQIE_LOG_DUMP_DIR]")
+    @cloup.option("--synthesis", type=cloup.Choice(list(synthesis.SYNTHESIS_METHODS)), default="auto", show_default=True, help="Build angle encodings from uniformly controlled rotations ('ucr'), basis encodings from multi-controlled X gates ('esop'), either from one controlled gate per uniform quadtree block ('quadtree') or from their operator, 'auto' picks 'ucr' or 'esop' whenever possible")
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
@@ -86,7 +139,12 @@ def simulate_options(func) -> Callable:
     @cloup.option("--n-shots", type=int, help="Number of simulation shots")
     @cloup.option("--return-qiskit-result", type=cloup.BOOL, default=False, show_default=True, help="Return results directly from qiskit")
     @cloup.option("--return-padded-counts", type=cloup.BOOL, default=False, show_default=True, help="Return state counts including zero-count states")
-    @cloup.option("--output-path", required=False, help="Path to where the results will be written")
+    @cloup.option("--return-dense-counts", type=cloup.BOOL, default=False, show_default=True, help="Return counts as an array indexed by basis state")
+    @cloup.option("--output-path", required=False, help="Path to where the results will be written, as JSON lines for a batch of images or one file per image when it is a directory")
+    @cloup.option("--engine", type=cloup.Choice(["aer", "direct"]), default="aer", show_default=True, help="Simulation engine, 'direct' samples the exact encoded state without building a circuit")
+    @cloup.option("--seed", type=int, default=None, help="Seed for reproducible sampling")
+    @cloup.option("--dry-run", is_flag=True, default=False, help="Print the simulation plan, or stop before submitting the job, without running anything")
+    @cloup.option("--analytic", is_flag=True, default=False, help="Compute the exact probabilities of a noiseless circuit once and sample all shots from them")
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
@@ -103,6 +161,27 @@ def execute_options(func) -> Callable:
     return wrapper
 
 
+def tiling_options(func) -> Callable:
+    @cloup.option("--tile-size", type=int, default=None, help="Encode and simulate the image as independent power-of-two tiles of this size")
+    @cloup.option("--memory-budget", type=int, default=None, help="Tile the image with the largest tiles fitting this many bytes each")
+    @cloup.option("--tile-order", type=cloup.Choice(list(tiling.TILE_ORDERS)), default="row-major", show_default=True, help="Order in which tiles are processed")
+    @cloup.option("--workers", type=int, default=None, help="Number of worker processes for batches of images and tiled runs, and for assembling the operator of encodings without batch functions  [default: CPU count - 1 for tiled runs, 1 otherwise]")
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def cache_options(func) -> Callable:
+    @cloup.option("--cache-dir", envvar="GEQIE_CACHE_DIR", default=None, help="Directory of the on-disk cache of encoded operators, caching is disabled when unset  [env var: GEQIE_CACHE_DIR]")
+    @cloup.option("--cache-max-size", type=int, default=cache.DEFAULT_CACHE_MAX_SIZE, show_default=True, help="Maximum size of the cache directory in bytes")
+    @cloup.option("--use-cache/--no-cache", default=True, show_default=True, help="Read and write the on-disk cache")
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+    return wrapper
+
+
 def retrieve_options(func) -> Callable:
     @cloup.option(
         "--encoding",
@@ -110,7 +189,8 @@ def retrieve_options(func) -> Callable:
         type=str,
         help="Name of the encoding from 'encodings' directory.",
     )
-    @cloup.option("--result", required=True, type=str, help="Result from simulation")
+    @cloup.option("--result", required=True, type=str, help="Result from simulation, or a file, directory or glob pattern of the results of a batch")
+    @cloup.option("--output-path", default=None, help="Directory to which the images retrieved from a batch are saved as .npy files")
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
@@ -160,30 +240,165 @@ def encoding_params_options(func) -> Callable:
     return wrapper
 
 
+def _dumps(result: Any) -> str:
+    """JSON form of simulation results, with dense counts written as records."""
+    def default(obj: Any) -> Any:
+        if isinstance(obj, DenseCounts):
+            return obj.to_record()
+        if isinstance(obj, (SimulationPlan, resources.ResourceEstimate)):
+            return obj.to_dict()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return json.dumps(result, default=default)
+
+
+def _encode(**params) -> qiskit.QuantumCircuit:
+    image = _parse_image(**params)
+    encoding_module = _import_encoding(**params)
+    return main.encode(
+        encoding_module.init_function,
+        encoding_module.data_function,
+        encoding_module.map_function,
+        image,
+        **optional_functions(encoding_module),
+        **params,
+    )
+
+
+def _write_circuit(circuit: qiskit.QuantumCircuit, path: str | Path):
+    with open(path, "wb") as file:
+        qiskit.qpy.dump(circuit, file)
+
+
 @cli.command()
 @encoding_options
+@cloup.option("--output-path", default=None, help="Path to where the circuit is written as QPY, or directory of the circuits of a batch")
+@cloup.option("--workers", type=int, default=None, help="Number of worker processes for batches of images, and for assembling the operator of encodings without batch functions  [default: 1]")
+@cache_options
 @encoding_params_options
-def encode(**params) -> qiskit.QuantumCircuit:
+def encode(**params) -> qiskit.QuantumCircuit | None:
     params["logging_level"] = logging_levels.cli_verbosity_to_logging_level(params.get("verbosity_level", 0))
 
+    if (image_paths := _image_paths(**params)) is not None:
+        _run_batch("encode", image_paths, params)
+        return None
+
+    circuit = _encode(**params)
+    if output_path := params.get("output_path"):
+        _write_circuit(circuit, output_path)
+    return circuit
+
+
+def _encode_statevector(**params) -> np.ndarray:
+    image = _parse_image(**params)
+    encoding_module = _import_encoding(**params)
+    return main.encode_statevector(
+        encoding_module.init_function,
+        encoding_module.data_function,
+        encoding_module.map_function,
+        image,
+        **optional_functions(encoding_module),
+        **params,
+    )
+
+
+def _simulate_tiled(**params) -> Dict[str, Any]:
     image = _parse_image(**params)
     encoding_module = _import_encoding(**params)
-    return main.encode(encoding_module.init_function, encoding_module.data_function, encoding_module.map_function, image, **params)
+    tiled = tiling.encode_tiled(
+        encoding_module.init_function,
+        encoding_module.data_function,
+        encoding_module.map_function,
+        image,
+        **optional_functions(encoding_module),
+        **params,
+    )
+    return {"layout": tiled.layout.to_dict(), "results": tiling.simulate_tiled(tiled, **params)}
+
+
+def _simulate(**params) -> Any:
+    if params.get("tile_size") or params.get("memory_budget"):
+        return _simulate_tiled(**params)
+    if params.get("engine") == "direct":
+        circuit = _encode_statevector(**params)
+    else:
+        circuit = _encode(**params)
+    return main.simulate(circuit, **params)
+
+
+def _process_image(image_path: Path, command: str, params: Dict[str, Any], names: Dict[Path, Path]) -> Any:
+    """Run `command` on a single image of a batch, returning its JSON-serializable result, and write its circuit under its name in `names`."""
+    # Images of a batch already fill the worker processes, so that each one runs in turn
+    params = {**params, "image_path": str(image_path), "workers": 1}
+    if command == "simulate":
+        return _simulate(**params)
+
+    circuit = _encode(**params)
+    summary = {"num_qubits": circuit.num_qubits, "depth": circuit.depth(), "size": circuit.size()}
+    if output_dir := params.get("output_path"):
+        path = Path(output_dir, f"{names[image_path]}.qpy")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write_circuit(circuit, path)
+        summary["path"] = str(path)
+    return summary
+
+
+def _run_batch(command: str, image_paths: List[Path], params: Dict[str, Any]):
+    """
+    Run `command` on every image of a batch, printing one JSON line per image as it finishes.
+
+    An `output_path` directory receives one file per image, named after its path relative to
+    the common directory of the batch, and any other `output_path` one JSON line per image.
+    Images failing are reported in their line, and the command exits with status 1 once all
+    others are done.
+    """
+    output_path = params.get("output_path")
+    output_dir = output_path is not None and (Path(output_path).is_dir() or output_path.endswith(("/", "\\")) or command == "encode")
+    if output_dir:
+        Path(output_path).mkdir(parents=True, exist_ok=True)
+
+    names = batch.output_names(image_paths)
+    failed = 0
+    with contextlib.ExitStack() as stack:
+        lines = stack.enter_context(open(output_path, "w")) if output_path is not None and not output_dir else None
+        for image_path, result, error in batch.run_batch(_process_image, image_paths, params.get("workers"), command, params, names):
+            record = {"image": str(image_path), "result": result}
+            if error is not None:
+                failed += 1
+                record = {"image": str(image_path), "error": f"{type(error).__name__}: {error}"}
+            elif output_dir and command == "simulate":
+                path = Path(output_path, f"{names[image_path]}.json")
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(_dumps(result))
+            line = _dumps(record)
+            print(line, flush=True)
+            if lines is not None:
+                lines.write(line + "\n")
+                lines.flush()
+
+    if output_path is not None:
+        print(f"Results of {len(image_paths)} images written to '{output_path}'", file=sys.stderr)
+    if failed:
+        print(f"{failed} of {len(image_paths)} images failed", file=sys.stderr)
+        sys.exit(1)
 
 
 @cli.command()
 @encoding_options
 @simulate_options
+@tiling_options
+@cache_options
 @encoding_params_options
-@cloup.pass_context
-def simulate(ctx: cloup.Context, **params):
+def simulate(**params):
     params["logging_level"] = logging_levels.cli_verbosity_to_logging_level(params.get("verbosity_level", 0))
 
-    circuit = ctx.invoke(encode, **params)
-    result = main.simulate(circuit, **params)
-    print(json.dumps(result))
+    if (image_paths := _image_paths(**params)) is not None:
+        _run_batch("simulate", image_paths, params)
+        return
+
+    result = _simulate(**params)
+    print(_dumps(result))
     if output_path := params.get("output_path"):
-        Path(output_path).write_text(json.dumps(result))
+        Path(output_path).write_text(_dumps(result))
         print(f"Results written to '{output_path}'")
 
 
@@ -191,13 +406,99 @@ def simulate(ctx: cloup.Context, **params):
 @encoding_options
 @simulate_options
 @execute_options
+@cache_options
 @encoding_params_options
-@cloup.pass_context
-def execute(ctx: cloup.Context, **params):
+def execute(**params):
     params["logging_level"] = logging_levels.cli_verbosity_to_logging_level(params.get("verbosity_level", 0))
 
-    circuit = ctx.invoke(encode, **params)
-    print(json.dumps(main.execute(circuit, **params)))
+    if _image_paths(**params) is not None:
+        raise click.UsageError("Batches of images are not supported by 'execute', run it on one image at a time")
+    if not params.get("dry_run"):
+        print(_dumps(main.execute(_encode(**params), **params)))
+        return
+
+    # The estimate needs neither the encoded circuit nor the backend, unlike the transpiled resources
+    estimate = resources.estimate(
+        _import_encoding(**params),
+        _parse_image_shape(**params),
+        params["encoding_params"],
+        target="hardware",
+        image_dimensionality=params["image_dimensionality"],
+    )
+    print(_dumps({"estimate": estimate, "transpiled": main.execute(_encode(**params), **params)}))
+
+
+@cli.command()
+@cloup.option("--encoding", required=True, help="Name of the encoding from 'encodings' directory")
+@cloup.option("--image-path", default=None, help="Path to the image file, only read for its shape")
+@cloup.option("--image-shape", default=None, help="Comma-separated image shape used instead of an image file, e.g. 64,64 or 32,32,3")
+@cloup.option("--image-dimensionality", type=int, default=2, show_default=True, help="Number of image dimensions to consider")
+@cloup.option("--target", type=cloup.Choice(list(resources.TARGETS)), default="aer", show_default=True, help="Whether to count gates for Aer or decomposed for hardware")
+@encoding_params_options
+def estimate(**params):
+    image_shape = _parse_image_shape(**params)
+    encoding_module = _import_encoding(**params)
+    print(_dumps(resources.estimate(
+        encoding_module,
+        image_shape,
+        params["encoding_params"],
+        target=params["target"],
+        image_dimensionality=params["image_dimensionality"],
+    )))
+
+
+@cli.command("benchmark")
+@cloup.option("--encoding", "encodings", multiple=True, help="Name of an encoding from 'encodings' directory to benchmark, may be repeated  [default: all]")
+@cloup.option("--images", multiple=True, help="Image file or directory searched recursively for images, may be repeated  [default: assets/test_images of the repository]")
+@cloup.option("--image-dimensionality", type=int, default=2, show_default=True, help="Number of image dimensions to consider, PNG images are benchmarked in 2-D and NumPy ones otherwise")
+@cloup.option("--n-shots", multiple=True, type=int, default=[1024], show_default=True, help="Number of simulation shots, may be repeated")
+@cloup.option("--synthesis", type=cloup.Choice(list(synthesis.SYNTHESIS_METHODS)), default="auto", show_default=True, help="Synthesis of the encoded circuits")
+@cloup.option("--engine", type=cloup.Choice(["aer", "direct"]), default="aer", show_default=True, help="Simulation engine")
+@cloup.option("--repeats", type=int, default=1, show_default=True, help="Number of runs of every case, of which the fastest is kept")
+@cloup.option("--max-qubits", type=int, default=16, show_default=True, help="Skip cases needing more qubits")
+@cloup.option("--seed", type=int, default=None, help="Seed for reproducible sampling")
+@cloup.option("--output-path", default=None, help="Path to where the results will be written, as CSV for a .csv suffix and as JSON otherwise")
+@cloup.option("--compare", nargs=2, default=None, metavar="BASELINE CANDIDATE", help="Compare two written runs instead of benchmarking, exiting with status 1 on regressions")
+@cloup.option("--threshold", type=float, default=0.2, show_default=True, help="Relative increase of a metric flagged as a regression by '--compare'")
+@encoding_params_options
+def benchmark_command(**params):
+    """Benchmark the latency, memory and circuit size of encodings, or compare two benchmark runs."""
+    if params["compare"]:
+        baseline, candidate = (benchmark.read_results(path) for path in params["compare"])
+        comparisons = benchmark.compare_results(baseline, candidate, threshold=params["threshold"])
+        changed = [comparison for comparison in comparisons if comparison.regression or (comparison.ratio or 1) < 1 / (1 + params["threshold"])]
+        print(tabulate(
+            [(*comparison.key[:2], comparison.metric, comparison.baseline, comparison.candidate, comparison.ratio, "REGRESSION" if comparison.regression else "improvement") for comparison in changed],
+            headers=["encoding", "image", "metric", "baseline", "candidate", "ratio", ""],
+        ))
+        regressions = sum(comparison.regression for comparison in comparisons)
+        print(f"{len(comparisons)} metrics compared, {regressions} regressions")
+        if regressions:
+            sys.exit(1)
+        return
+
+    def report(row: Dict[str, Any]):
+        timing = f"{row['total_time']:.4f} s" if row["status"] == "ok" else f"{row['status']}: {row['error']}"
+        print(f"{row['encoding']} {row['image']} {row['n_shots']} shots: {timing}", file=sys.stderr)
+
+    rows = benchmark.run_benchmark(
+        encodings=params["encodings"] or None,
+        images=params["images"] or None,
+        n_shots=params["n_shots"],
+        synthesis=params["synthesis"],
+        engine=params["engine"],
+        repeats=params["repeats"],
+        max_qubits=params["max_qubits"],
+        image_dimensionality=params["image_dimensionality"],
+        encoding_params=params["encoding_params"],
+        seed=params["seed"],
+        callback=report,
+    )
+    if output_path := params.get("output_path"):
+        benchmark.write_results(rows, output_path)
+        print(f"Results written to '{output_path}'")
+    else:
+        print(json.dumps(rows))
 
 
 @cli.command()
@@ -207,7 +508,55 @@ def retrieve(**params):
     params["logging_level"] = logging_levels.cli_verbosity_to_logging_level(params.get("verbosity_level", 0))
 
     retrieve_function = _import_encoding(**params).retrieve_function
-    print(retrieve_function(json.loads(params.get("result")), **params))
+    try:
+        results = json.loads(params.get("result"))
+    except json.JSONDecodeError:
+        _retrieve_batch(retrieve_function, **params)
+        return
+    print(_retrieve(retrieve_function, results, **params))
+
+
+def _retrieve(retrieve_function: Callable, results: Any, **params) -> np.ndarray:
+    if isinstance(results, dict) and "layout" in results:
+        layout = tiling.TileLayout.from_dict(results["layout"])
+        return tiling.retrieve_tiled(retrieve_function, results["results"], layout, **params)
+    return retrieve_function(results, **params)
+
+
+def _read_batch_results(paths: List[Path]) -> List[Tuple[Path, str, Any]]:
+    """
+    Results of a batch as `(source, image, result)` triples, read from JSON lines written by a
+    batch, whose source is the image, or from one JSON file per image, which is its own source.
+    """
+    results = []
+    for path in paths:
+        if path.suffix == ".jsonl":
+            records = [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+            results.extend((Path(record["image"]), record["image"], record["result"]) for record in records if "result" in record)
+        else:
+            results.append((path, path.stem, json.loads(path.read_text())))
+    return results
+
+
+def _retrieve_batch(retrieve_function: Callable, result: str, output_path: str | None = None, **params):
+    try:
+        paths = batch.expand_paths([result], suffixes=(".json", ".jsonl"))
+    except ValueError as error:
+        raise click.UsageError(str(error))
+    if missing := [path for path in paths if not path.is_file()]:
+        raise click.UsageError(f"'--result' is neither JSON nor an existing result file: '{missing[0]}'")
+    if output_path is not None:
+        Path(output_path).mkdir(parents=True, exist_ok=True)
+
+    results = _read_batch_results(paths)
+    names = batch.output_names([source for source, _, _ in results])
+    for source, image, result in results:
+        retrieved = np.asarray(_retrieve(retrieve_function, result, **params))
+        print(json.dumps({"image": image, "result": retrieved.tolist()}), flush=True)
+        if output_path is not None:
+            path = Path(output_path, f"{names[source]}.npy")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            np.save(path, retrieved)
 
 
 if __name__ == '__main__':
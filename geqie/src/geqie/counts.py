@@ -0,0 +1,126 @@
+"""Dense measurement counts: one array entry per basis state instead of a `{bitstring: count}` dict."""
+
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+BIT_ORDERS = ("little", "big")
+
+
+def reverse_bits(indices: np.ndarray, num_bits: int) -> np.ndarray:
+    """Reverse the order of the lowest `num_bits` bits of every index."""
+    indices = np.asarray(indices, dtype=np.int64)
+    reversed_indices = np.zeros_like(indices)
+    for bit in range(num_bits):
+        reversed_indices |= ((indices >> bit) & 1) << (num_bits - 1 - bit)
+    return reversed_indices
+
+
+class DenseCounts:
+    """
+    Counts of all `2**num_qubits` outcomes of a measurement, indexed by basis state.
+
+    With the default "little" bit order, bit `k` of an index is the outcome of qubit `k`,
+    so the index of a qiskit-style bitstring is `int(bitstring, base=2)`. With "big" bit
+    order, qubit 0 is the most significant bit instead.
+    """
+
+    def __init__(self, counts: np.ndarray, num_qubits: int | None = None, bit_order: str = "little"):
+        counts = np.asarray(counts, dtype=np.int64)
+        if num_qubits is None:
+            num_qubits = int(np.log2(counts.size))
+        if counts.shape != (2**num_qubits,):
+            raise ValueError(f"Expected counts of shape {(2**num_qubits,)} for {num_qubits} qubits, received shape: '{counts.shape}'")
+        if bit_order not in BIT_ORDERS:
+            raise ValueError(f"Unknown bit order '{bit_order}'. Use 'little' or 'big'.")
+        self.counts = counts
+        self.num_qubits = num_qubits
+        self.bit_order = bit_order
+
+    def __repr__(self) -> str:
+        return f"DenseCounts(num_qubits={self.num_qubits}, shots={self.shots}, bit_order='{self.bit_order}')"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DenseCounts):
+            return NotImplemented
+        other = other.with_bit_order(self.bit_order)
+        return self.num_qubits == other.num_qubits and np.array_equal(self.counts, other.counts)
+
+    __hash__ = None
+
+    @property
+    def shots(self) -> int:
+        return int(self.counts.sum())
+
+    @classmethod
+    def from_indices(
+        cls,
+        indices: np.ndarray,
+        weights: np.ndarray,
+        num_qubits: int,
+        bit_order: str = "little",
+    ) -> "DenseCounts":
+        """Dense counts from outcome indices and their counts, repeated indices being summed."""
+        counts = np.bincount(np.asarray(indices, dtype=np.int64), weights=weights, minlength=2**num_qubits)
+        return cls(np.rint(counts), num_qubits, bit_order)
+
+    @classmethod
+    def from_dict(cls, counts: Dict[str, int], num_qubits: int | None = None) -> "DenseCounts":
+        """Dense counts from qiskit-style `{bitstring: count}` counts."""
+        if num_qubits is None:
+            if not counts:
+                raise ValueError("Cannot infer the number of qubits from empty counts, pass num_qubits.")
+            num_qubits = len(next(iter(counts)).replace(" ", ""))
+        indices = np.fromiter((int(state.replace(" ", ""), base=2) for state in counts), dtype=np.int64, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        return cls.from_indices(indices, weights, num_qubits)
+
+    def with_bit_order(self, bit_order: str) -> "DenseCounts":
+        """The same counts in the given bit order."""
+        if bit_order == self.bit_order:
+            return self
+        permutation = reverse_bits(np.arange(2**self.num_qubits), self.num_qubits)
+        return DenseCounts(self.counts[permutation], self.num_qubits, bit_order)
+
+    def nonzero(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Little-endian indices of the observed outcomes and their counts."""
+        counts = self.with_bit_order("little").counts
+        indices = np.flatnonzero(counts)
+        return indices, counts[indices]
+
+    def to_dict(self, padded: bool = False) -> Dict[str, int]:
+        """Qiskit-style `{bitstring: count}` counts, including zero-count states if `padded`."""
+        counts = self.with_bit_order("little").counts
+        indices = range(len(counts)) if padded else np.flatnonzero(counts)
+        return {f"{index:0{self.num_qubits}b}": int(counts[index]) for index in indices}
+
+    def to_record(self) -> Dict[str, Any]:
+        """JSON-serializable form of the counts."""
+        return {"counts": self.counts.tolist(), "num_qubits": self.num_qubits, "bit_order": self.bit_order}
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "DenseCounts":
+        return cls(record["counts"], record["num_qubits"], record.get("bit_order", "little"))
+
+
+def is_record(results: Any) -> bool:
+    """Whether `results` is the JSON form of `DenseCounts`, as opposed to `{bitstring: count}` counts."""
+    return isinstance(results, dict) and "num_qubits" in results and "counts" in results
+
+
+def as_dense(results: DenseCounts | Dict[str, Any]) -> DenseCounts:
+    """Counts in any supported form as little-endian `DenseCounts`."""
+    if isinstance(results, DenseCounts):
+        return results.with_bit_order("little")
+    if is_record(results):
+        return DenseCounts.from_record(results).with_bit_order("little")
+    return DenseCounts.from_dict(results)
+
+
+def as_counts_dict(results: DenseCounts | Dict[str, Any]) -> Dict[str, int]:
+    """Counts in any supported form as qiskit-style `{bitstring: count}` counts."""
+    if isinstance(results, DenseCounts):
+        return results.to_dict()
+    if is_record(results):
+        return DenseCounts.from_record(results).to_dict()
+    return results
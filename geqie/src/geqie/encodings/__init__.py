@@ -1,7 +1,57 @@
 """Common utilities for quantum image encodings."""
 
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Callable, Dict, Tuple
+
 import numpy as np
 
+# Functions an encoding module may export next to the required `init_function`,
+# `data_function`, `map_function` and `retrieve_function`:
+#   prepare_function(image, **params) -> image preprocessed once per encode, e.g. converted
+#       to grayscale, cast or quantized; the other functions receive the prepared image
+#   batch_data_function(image, R, **params) -> basis position of every pixel, shape (N,)
+#   batch_map_function(image, R, **params) -> map block of every pixel, shape (N, d, d)
+#   batch_angle_function(image, R, **params) -> for angle encodings, whose map blocks are
+#       made of `ry_gates(angle)` rotations as declared by the `rotations` of their metadata,
+#       the angles of every pixel, shape (N,) or (N, L)
+#   batch_basis_function(image, R, **params) -> for basis encodings, whose map blocks flip
+#       the color qubits to a basis state under each of L channel labels held by the
+#       `label_qubits` of their metadata, the basis state of every pixel, shape (N,) or (N, L)
+#   metadata_function(**params) -> `EncodingMetadata` of the encoding
+# Pixels are ordered as in `np.ndindex(*image_shape)`.
+OPTIONAL_FUNCTIONS = (
+    "prepare_function",
+    "batch_data_function",
+    "batch_map_function",
+    "batch_angle_function",
+    "batch_basis_function",
+    "metadata_function",
+)
+
+# Layouts of the rotations of angle encodings:
+#   "labelled": the lowest qubit is rotated by the angle of each of L channel labels held
+#       by the qubits above it, which start in a uniform superposition of the used labels
+#   "per_qubit": each of the L color qubits is rotated by its own angle
+ROTATION_LAYOUTS = ("labelled", "per_qubit")
+
+
+@dataclass(frozen=True)
+class EncodingMetadata:
+    """
+    Structure of an encoding known without encoding any image, as returned by the
+    `metadata_function(**params)` of an encoding module.
+
+    The position register holds `R = ceil(log2(max(image_shape)))` qubits per image axis,
+    and `color_qubits` more qubits hold the color of every pixel. Angle encodings declare
+    the layout of their rotations in `rotations`, one of `ROTATION_LAYOUTS`, and None
+    marks every other encoding. Basis encodings declare the color qubits holding their
+    channel labels, lowest label bit first, in `label_qubits`.
+    """
+    color_qubits: int
+    rotations: str | None = None
+    label_qubits: Tuple[int, ...] = ()
+
 
 def ensure_grayscale(image: np.ndarray, strategy: str | None = None) -> np.ndarray:
     """
@@ -38,3 +88,38 @@ def ensure_grayscale(image: np.ndarray, strategy: str | None = None) -> np.ndarr
             raise ValueError(f"Unknown strategy '{strategy}'. Use 'first_channel', 'average', or 'luminance'.")
     
     raise ValueError(f"Expected 2D single- or multi-channel or image, received shape: '{image.shape}'")
+
+
+def ry_gates(theta: np.ndarray) -> np.ndarray:
+    """Stack of RY-like rotation matrices `[[cos, -sin], [sin, cos]]`, one per angle, shape `(*theta.shape, 2, 2)`."""
+    cos_theta, sin_theta = np.cos(theta), np.sin(theta)
+    return np.stack([
+        np.stack([cos_theta, -sin_theta], axis=-1),
+        np.stack([sin_theta,  cos_theta], axis=-1),
+    ], axis=-2)
+
+
+def batch_kron(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Kronecker product of two stacks of matrices, taken pairwise along the leading axis."""
+    n, a_rows, a_cols = a.shape
+    _, b_rows, b_cols = b.shape
+    return np.einsum("nij,nkl->nikjl", a, b).reshape(n, a_rows * b_rows, a_cols * b_cols)
+
+
+def xor_permutations(patterns: np.ndarray, dim: int) -> np.ndarray:
+    """
+    Stack of permutation matrices `|j XOR p><j|`, one per pattern `p`.
+
+    This is the matrix of a tensor product of X and I gates, with X on every qubit whose
+    bit is set in `p` (qubit 0 being the least significant bit).
+    """
+    patterns = np.asarray(patterns, dtype=np.int64)
+    columns = np.arange(dim)
+    permutations = np.zeros((patterns.size, dim, dim))
+    permutations[np.arange(patterns.size)[:, None], columns ^ patterns[:, None], columns] = 1
+    return permutations
+
+
+def optional_functions(encoding_module: ModuleType) -> Dict[str, Callable]:
+    """Collect the optional protocol functions provided by an encoding module, to be passed on to `encode`."""
+    return {name: getattr(encoding_module, name) for name in OPTIONAL_FUNCTIONS if hasattr(encoding_module, name)}
@@ -0,0 +1,97 @@
+"""
+Vectorized decoding of measurement counts, shared by the retrieve functions of the encodings.
+
+Outcomes are handled as integer basis-state indices with their counts as weights. Fields of
+a qiskit-style bitstring `state` are read with `bit_field`, so that `state[start:stop]` of
+the string-based decoders becomes `bit_field(indices, num_qubits, start, stop)`. Counts are
+then aggregated per pixel, or per pixel and channel label, with `np.bincount`.
+"""
+
+from typing import Any, Dict, NamedTuple
+
+import numpy as np
+
+from ..counts import DenseCounts, as_dense
+
+
+class Outcomes(NamedTuple):
+    indices: np.ndarray
+    weights: np.ndarray
+    num_qubits: int
+
+
+def outcomes(results: DenseCounts | Dict[str, Any]) -> Outcomes:
+    """Observed outcomes of counts in any supported form, as little-endian indices and their counts."""
+    dense = as_dense(results)
+    indices, weights = dense.nonzero()
+    return Outcomes(indices, weights.astype(np.float64), dense.num_qubits)
+
+
+def bit_field(indices: np.ndarray, num_bits: int, start: int, stop: int) -> np.ndarray:
+    """Value of the bits `start:stop` of every index, counted from the most significant of `num_bits` bits."""
+    stop = min(stop, num_bits)
+    return (indices >> (num_bits - stop)) & ((1 << (stop - start)) - 1)
+
+
+def _label_keys(positions: np.ndarray, labels: np.ndarray | None, num_labels: int) -> tuple[np.ndarray, np.ndarray]:
+    # Outcomes with labels outside of `range(num_labels)` carry no data and are dropped
+    if labels is None:
+        return positions, np.ones(positions.shape, dtype=bool)
+    return positions * num_labels + labels, labels < num_labels
+
+
+def bit_probability(
+    positions: np.ndarray,
+    bits: np.ndarray,
+    weights: np.ndarray,
+    size: int,
+    labels: np.ndarray | None = None,
+    num_labels: int = 1,
+) -> np.ndarray:
+    """
+    Fraction of the counts of every position, or position and channel label, with the bit set.
+
+    This is the probability of measuring 1 on the qubit rotated by an angle encoding. Positions
+    that were never observed get 0. With `labels`, the result has shape `(size, num_labels)`.
+    """
+    keys, valid = _label_keys(positions, labels, num_labels)
+    keys, bits, weights = keys[valid], bits[valid], weights[valid]
+
+    total = np.bincount(keys, weights, minlength=size * num_labels)
+    ones = np.bincount(keys, weights * bits, minlength=size * num_labels)
+    probabilities = np.divide(ones, total, out=np.zeros_like(total), where=total > 0)
+    return probabilities if labels is None else probabilities.reshape(size, num_labels)
+
+
+def most_frequent(
+    positions: np.ndarray,
+    values: np.ndarray,
+    weights: np.ndarray,
+    size: int,
+    labels: np.ndarray | None = None,
+    num_labels: int = 1,
+) -> np.ndarray:
+    """
+    Most frequently measured value of every position, or position and channel label.
+
+    This decodes basis encodings, whose noiseless outcomes hold a single value per position.
+    Positions that were never observed get 0, and ties go to the larger value. With `labels`,
+    the result has shape `(size, num_labels)`.
+    """
+    keys, valid = _label_keys(positions, labels, num_labels)
+    keys, values, weights = keys[valid], values[valid], weights[valid]
+
+    order = np.lexsort((values, weights, keys))
+    keys, values = keys[order], values[order]
+    last = np.append(keys[1:] != keys[:-1], True)
+
+    decoded = np.zeros(size * num_labels, dtype=np.int64)
+    decoded[keys[last]] = values[last]
+    return decoded if labels is None else decoded.reshape(size, num_labels)
+
+
+def pack_fields(fields: np.ndarray, width: int = 1) -> np.ndarray:
+    """Integers assembled from `width`-bit fields along the last axis, the first field being the least significant."""
+    fields = np.asarray(fields, dtype=np.int64)
+    shifts = width * np.arange(fields.shape[-1])
+    return (fields << shifts).sum(axis=-1)
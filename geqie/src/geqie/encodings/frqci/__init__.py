@@ -1,4 +1,9 @@
 from .init import init as init_function
+from .prepare import prepare as prepare_function
 from .data import data as data_function
+from .data import batch_data as batch_data_function
 from .map import map as map_function
+from .map import batch_map as batch_map_function
+from .map import batch_angles as batch_angle_function
 from .retrieve import retrieve as retrieve_function
+from .metadata import metadata as metadata_function
@@ -2,6 +2,8 @@ import numpy as np
 
 from qiskit.quantum_info import Operator
 
+from .. import ry_gates
+
 RED_SHIFT   = 16
 GREEN_SHIFT = 8
 BLUE_SHIFT  = 0
@@ -27,3 +29,15 @@ def map(u: int, v: int, R: int, image: np.ndarray, **_) -> Operator:
 
     return Operator(map_operator)
 
+
+def batch_angles(image: np.ndarray, R: int, **_) -> np.ndarray:
+    pixels = image[:, :, :3].reshape(-1, 3).astype(np.uint32)
+    red, green, blue = pixels.T
+
+    color_blend = (red << RED_SHIFT) + (green << GREEN_SHIFT) + (blue << BLUE_SHIFT)
+
+    return color_blend / NORMALIZATION_FACTOR * (np.pi / 2)
+
+
+def batch_map(image: np.ndarray, R: int, **_) -> np.ndarray:
+    return ry_gates(batch_angles(image, R))
@@ -0,0 +1,5 @@
+import numpy as np
+
+
+def prepare(image: np.ndarray, **_) -> np.ndarray:
+    return image[:, :, :3].astype(np.uint32)
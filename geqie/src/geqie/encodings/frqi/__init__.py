@@ -5,9 +5,14 @@ from qiskit.quantum_info import Statevector, Operator
 
 from .. import ensure_grayscale
 from .init import init as init_function
+from .prepare import prepare as prepare_function
 from .data import data as _data_function
+from .data import batch_data as _batch_data_function
 from .map import map as _map_function
+from .map import batch_map as _batch_map_function
+from .map import batch_angles as _batch_angle_function
 from .retrieve import retrieve as retrieve_function
+from .metadata import metadata as metadata_function
 
 
 def data_function(u: int, v: int, R: int, image: np.ndarray, grayscale_strategy: str | None = None, **encoding_args: Any) -> Statevector:
@@ -18,3 +23,18 @@ def data_function(u: int, v: int, R: int, image: np.ndarray, grayscale_strategy:
 def map_function(u: int, v: int, R: int, image: np.ndarray, grayscale_strategy: str | None = None, **encoding_args: Any) -> Operator:
     filtered_image = ensure_grayscale(image, grayscale_strategy)
     return _map_function(u, v, R, filtered_image, **encoding_args)
+
+
+def batch_data_function(image: np.ndarray, R: int, grayscale_strategy: str | None = None, **encoding_args: Any) -> np.ndarray:
+    filtered_image = ensure_grayscale(image, grayscale_strategy)
+    return _batch_data_function(filtered_image, R, **encoding_args)
+
+
+def batch_map_function(image: np.ndarray, R: int, grayscale_strategy: str | None = None, **encoding_args: Any) -> np.ndarray:
+    filtered_image = ensure_grayscale(image, grayscale_strategy)
+    return _batch_map_function(filtered_image, R, **encoding_args)
+
+
+def batch_angle_function(image: np.ndarray, R: int, grayscale_strategy: str | None = None, **encoding_args: Any) -> np.ndarray:
+    filtered_image = ensure_grayscale(image, grayscale_strategy)
+    return _batch_angle_function(filtered_image, R, **encoding_args)
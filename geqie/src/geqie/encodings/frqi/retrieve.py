@@ -1,40 +1,29 @@
 import numpy as np
-import json
+
+from ..decoding import bit_probability, outcomes
 
 def retrieve(results: str, **_) -> np.ndarray:
     """
     Decodes an image from quantum state measurement results.
 
     Parameters:
-    results (dict): A dictionary where keys are binary strings representing quantum states,
-                         and values are their respective occurrence counts.
+    results (dict | DenseCounts): A dictionary where keys are binary strings representing quantum states,
+                         and values are their respective occurrence counts, or the equivalent dense counts.
 
     Returns:
     np.ndarray: A NumPy array representing the decoded image.
     """
-    state_length = len(next(iter(results)))
+    indices, weights, state_length = outcomes(results)
     color_qubits = 1
     number_of_position_qubits = state_length - color_qubits
     x_qubits = number_of_position_qubits // 2
     y_qubits = number_of_position_qubits // 2
-    
-    image_shape = (2**x_qubits, 2**y_qubits)
 
-    reconstructed_image = np.zeros((image_shape[0], image_shape[1]))
-
-    ones = np.zeros_like(reconstructed_image)
-    total = np.zeros_like(reconstructed_image)
+    image_shape = (2**x_qubits, 2**y_qubits)
 
-    for state, n in results.items():
-        b = state[:-1]
-        c = state[-1]
+    p1 = bit_probability(indices >> color_qubits, indices & 1, weights, np.prod(image_shape))
 
-        m = int(b, base=2)
-        total.flat[m] += n
-        if c == "1":
-            ones.flat[m] += n
-    
-    reconstructed_image = np.where(total > 0, np.arccos(np.sqrt(1 - ones / total)), 0)
+    reconstructed_image = np.arccos(np.sqrt(1 - p1)).reshape(image_shape)
     reconstructed_image = 255 * 2 * reconstructed_image / np.pi
-    reconstructed_image = reconstructed_image.astype(np.uint8)        
+    reconstructed_image = reconstructed_image.astype(np.uint8)
     return reconstructed_image
@@ -1,6 +1,8 @@
 import numpy as np
 from qiskit.quantum_info import Operator
 
+from .. import batch_kron, ry_gates
+
 
 BIT_PAIR_ANGLES = {
     (0, 0): 0,
@@ -31,3 +33,23 @@ def map(u: int, v: int, R: int, image: np.ndarray, **_) -> Operator:
         map_operator = np.kron(ry_gate(BIT_PAIR_ANGLES[bit_pair]), map_operator)
 
     return Operator(map_operator)
+
+
+def batch_angles(image: np.ndarray, R: int, **_) -> np.ndarray:
+    p = image.reshape(-1).astype(np.int64)
+    # Angle of every bit pair, indexed by `2 * lower_bit + upper_bit`
+    angles = np.array([BIT_PAIR_ANGLES[(bit_k, bit_k_1)] for bit_k in (0, 1) for bit_k_1 in (0, 1)])
+
+    # Color qubit `k // 2` is rotated by the angle of the bit pair starting at bit `k`
+    pair_indices = [2 * ((p >> k) & 1) + ((p >> (k + 1)) & 1) for k in range(0, 8, 2)]
+    return angles[np.stack(pair_indices, axis=-1)]
+
+
+def batch_map(image: np.ndarray, R: int, **_) -> np.ndarray:
+    pair_gates = ry_gates(batch_angles(image, R))
+
+    map_operators = pair_gates[:, 0]
+    for qubit in range(1, 4):
+        map_operators = batch_kron(pair_gates[:, qubit], map_operators)
+
+    return map_operators
@@ -1,6 +1,8 @@
 import numpy as np
 from qiskit.quantum_info import Operator
 
+from .. import ry_gates
+
 
 I_GATE = np.eye(2)
 X_GATE = np.array([
@@ -31,3 +33,16 @@ def map(u: int, v: int, R: int, image: np.ndarray, **_) -> Operator:
     map_operator = np.array(operators).sum(axis=0)
 
     return Operator(map_operator)
+
+
+def batch_angles(image: np.ndarray, R: int, **_) -> np.ndarray:
+    return image[:, :, :3].reshape(-1, 3) / 255.0 * (np.pi / 2)
+
+
+def batch_map(image: np.ndarray, R: int, **_) -> np.ndarray:
+    p = batch_angles(image, R)
+    channel_positioning = np.stack([CHANNEL_POSITIONING[channel] for channel in range(3)])
+
+    map_operators = np.einsum("cij,nckl->nikjl", channel_positioning, ry_gates(p))
+
+    return map_operators.reshape(-1, 8, 8)
@@ -1,54 +1,35 @@
 import numpy as np
-import json
+
+from ..decoding import bit_field, bit_probability, outcomes
 
 def retrieve(results: str, **_) -> np.ndarray:
     """
     Decodes an image from quantum state measurement results.
 
     Parameters:
-    results (dict): A dictionary where keys are binary strings representing quantum states,
-                         and values are their respective occurrence counts.
+    results (dict | DenseCounts): A dictionary where keys are binary strings representing quantum states,
+                         and values are their respective occurrence counts, or the equivalent dense counts.
 
     Returns:
     np.ndarray: A NumPy array representing the decoded image.
     """
-    state_length = len(next(iter(results)))
-    number_of_position_qubits = state_length - 3
+    indices, weights, state_length = outcomes(results)
+    color_qubits = 3
+    number_of_position_qubits = state_length - color_qubits
     x_qubits = number_of_position_qubits // 2
     y_qubits = number_of_position_qubits // 2
 
     image_shape = (2**x_qubits, 2**y_qubits)
 
-    reconstructed_image = np.zeros((image_shape[0], image_shape[1], 3))
-
-    ones = np.zeros((image_shape[0], image_shape[1], 3))
-    total = np.zeros((image_shape[0], image_shape[1], 3))
-
-    for state, n in results.items():
-        if n > 0:
-            x = state[0:x_qubits]
-            y = state[x_qubits: 2*y_qubits]
-            x_dec = int(x, base=2)
-            y_dec = int(y, base=2)
-            c = state[2*y_qubits: 2*y_qubits+3]
-
-            # if Red:
-            if c[0:2] == "00":
-                if c[-1] == "1":
-                    ones[x_dec, y_dec, 0] = n
-                total[x_dec, y_dec, 0] += n
-            # if Green:
-            if c[0:2] == "01":
-                if c[-1] == "1":
-                    ones[x_dec, y_dec, 1] = n
-                total[x_dec, y_dec, 1] += n
-            # if Blue:
-            if c[0:2] == "10":
-                if c[-1] == "1":
-                    ones[x_dec, y_dec, 2] = n
-                total[x_dec, y_dec, 2] += n
-            
-    reconstructed_image = np.where(total > 0, np.arccos(np.sqrt(1 - ones / total)), 0)
+    x = bit_field(indices, state_length, 0, x_qubits)
+    y = bit_field(indices, state_length, x_qubits, 2*y_qubits)
+    # The two upper color qubits label the channel (00 red, 01 green, 10 blue), the lowest one holds its angle
+    c = bit_field(indices, state_length, 2*y_qubits, 2*y_qubits + color_qubits)
+
+    positions = np.ravel_multi_index((x, y), image_shape)
+    p1 = bit_probability(positions, c & 1, weights, np.prod(image_shape), labels=c >> 1, num_labels=3)
+
+    reconstructed_image = np.arccos(np.sqrt(1 - p1)).reshape(*image_shape, 3)
     reconstructed_image = 255 * 2 * reconstructed_image / np.pi
-    reconstructed_image = reconstructed_image.astype(np.uint8)    
-    return reconstructed_image
\ No newline at end of file
+    reconstructed_image = reconstructed_image.astype(np.uint8)
+    return reconstructed_image
@@ -10,3 +10,7 @@ def data(*coords: int, R: int, image: np.ndarray, **_) -> Statevector:
     data_vector[m] = 1
 
     return Statevector(data_vector)
+
+
+def batch_data(image: np.ndarray, R: int, **_) -> np.ndarray:
+    return np.arange(image.size)
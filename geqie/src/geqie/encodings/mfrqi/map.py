@@ -2,6 +2,8 @@ import numpy as np
 
 from qiskit.quantum_info import Operator
 
+from .. import ry_gates
+
 
 def map(u: int, v: int, w: int, R: int, image: np.ndarray, **_) -> Operator:
     p = image[u, v, w] * (np.pi / 2)
@@ -11,3 +13,11 @@ def map(u: int, v: int, w: int, R: int, image: np.ndarray, **_) -> Operator:
     ]
 
     return Operator(map_operator)
+
+
+def batch_angles(image: np.ndarray, R: int, **_) -> np.ndarray:
+    return image.reshape(-1) * (np.pi / 2)
+
+
+def batch_map(image: np.ndarray, R: int, **_) -> np.ndarray:
+    return ry_gates(batch_angles(image, R))
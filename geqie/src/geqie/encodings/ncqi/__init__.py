@@ -1,4 +1,8 @@
 from .init import init as init_function
 from .data import data as data_function
+from .data import batch_data as batch_data_function
 from .map import map as map_function
-from .retrieve import retrieve as retrieve_function
\ No newline at end of file
+from .map import batch_map as batch_map_function
+from .map import batch_basis_states as batch_basis_function
+from .retrieve import retrieve as retrieve_function
+from .metadata import metadata as metadata_function
@@ -2,6 +2,8 @@ import numpy as np
 
 from qiskit.quantum_info import Operator
 
+from .. import xor_permutations
+
 
 I_GATE = np.eye(2)
 X_GATE = np.array([
@@ -37,3 +39,19 @@ def map(u: int, v: int, R: int, image: np.ndarray, **_) -> Operator:
     map_operator = map_operator[0] + map_operator[1] + map_operator[2]
 
     return Operator(map_operator)
+
+
+def batch_basis_states(image: np.ndarray, R: int, **_) -> np.ndarray:
+    p = image[:, :, :3].reshape(-1, 3).astype(np.int64) & 0xFF
+    # Channel labels on the two lowest qubits: red = II, green = IX, blue = XI
+    return (p << 2) | np.array([0, 1, 2])
+
+
+def batch_map(image: np.ndarray, R: int, **_) -> np.ndarray:
+    patterns = batch_basis_states(image, R)
+
+    map_operator = xor_permutations(patterns[:, 0], 2**10)
+    for channel in range(1, 3):
+        map_operator += xor_permutations(patterns[:, channel], 2**10)
+
+    return map_operator
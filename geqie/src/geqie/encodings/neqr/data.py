@@ -6,4 +6,9 @@ def data(u: int, v: int, R: int, image: np.ndarray, **_) -> Statevector:
     data_vector = np.zeros(2**(2 * R))
     data_vector[m] = 1
 
-    return Statevector(data_vector)
\ No newline at end of file
+    return Statevector(data_vector)
+
+
+def batch_data(image: np.ndarray, R: int, **_) -> np.ndarray:
+    u, v = np.indices(image.shape[:2]).reshape(2, -1)
+    return u * image.shape[0] + v
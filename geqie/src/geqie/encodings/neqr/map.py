@@ -3,6 +3,9 @@ from typing import Any
 
 from qiskit.quantum_info import Operator
 
+from .. import xor_permutations
+from .prepare import quantize
+
 I_GATE = np.eye(2)
 X_GATE = np.array([
 	[0, 1], 
@@ -38,3 +41,12 @@ def map(u: int, v: int, R: int, image: np.ndarray, bitrate: int = 8, **_: Any) -
 			map_operator = np.kron(I_GATE, map_operator)
 
 	return Operator(map_operator)
+
+
+def batch_basis_states(image: np.ndarray, R: int, bitrate: int = 8, **_: Any) -> np.ndarray:
+	return quantize(image, bitrate).reshape(-1)
+
+
+def batch_map(image: np.ndarray, R: int, bitrate: int = 8, **_: Any) -> np.ndarray:
+	p = batch_basis_states(image, R, bitrate)
+	return xor_permutations(p, 2**int(bitrate))
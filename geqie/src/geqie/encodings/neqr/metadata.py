@@ -0,0 +1,5 @@
+from .. import EncodingMetadata
+
+
+def metadata(bitrate: int = 8, **_) -> EncodingMetadata:
+    return EncodingMetadata(color_qubits=bitrate)
@@ -0,0 +1,21 @@
+import numpy as np
+
+from .. import ensure_grayscale
+
+
+def quantize(image: np.ndarray, bitrate: int = 8) -> np.ndarray:
+    """Fit 8-bit pixel values into `bitrate` bits by dropping their least significant bits."""
+    bitrate = int(bitrate)
+    if bitrate <= 0 or bitrate > 8:
+        raise ValueError("bitrate must be between 1 and 8")
+    p = image.astype(np.int64)
+    too_large = p >= 2**bitrate
+    unfit = too_large & ~((p <= 255) & (bitrate < 8))
+    if np.any(unfit):
+        raise ValueError(f"pixel value {p[unfit][0]} does not fit in {bitrate} bits")
+
+    return np.where(too_large, p >> (8 - bitrate), p)
+
+
+def prepare(image: np.ndarray, bitrate: int = 8, grayscale_strategy: str | None = None, **_) -> np.ndarray:
+    return quantize(ensure_grayscale(image, grayscale_strategy), bitrate)
@@ -44,3 +44,30 @@ def map(u: int, v: int, R: int, image: np.ndarray, **_) -> Operator:
         u_v_pixel_operator += np.kron(label_operator, RGB_operator)
 
     return Operator(u_v_pixel_operator)
+
+
+def batch_basis_states(image: np.ndarray, R: int, **_) -> np.ndarray:
+    p = image[:, :, :3].reshape(-1, 3).astype(np.int64)
+
+    # Label `bit` selects bit `7 - bit` of every channel, combined into an RGB X-pattern
+    labels = np.arange(8)
+    channel_bits = (p[:, None, :] >> (7 - labels)[None, :, None]) & 1
+    rgb_patterns = channel_bits @ np.array([4, 2, 1])
+
+    return labels * 8 + rgb_patterns
+
+
+def batch_map(image: np.ndarray, R: int, **_) -> np.ndarray:
+    states = batch_basis_states(image, R)
+    n_pixels = states.shape[0]
+
+    labels = np.arange(8)
+    rgb = np.arange(8)
+    # The label bits of the states are unchanged by XOR with an RGB value
+    rows = states[:, :, None] ^ rgb[None, None, :]
+    columns = labels[:, None] * 8 + rgb[None, :]
+
+    u_v_pixel_operators = np.zeros((n_pixels, 2**6, 2**6))
+    u_v_pixel_operators[np.arange(n_pixels)[:, None, None], rows, columns] = 1
+
+    return u_v_pixel_operators
@@ -0,0 +1,5 @@
+from .. import EncodingMetadata
+
+
+def metadata(**_) -> EncodingMetadata:
+    return EncodingMetadata(color_qubits=6, label_qubits=(3, 4, 5))
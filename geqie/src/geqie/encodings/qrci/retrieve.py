@@ -1,18 +1,19 @@
 import numpy as np
-import json
+
+from ..decoding import bit_field, most_frequent, outcomes, pack_fields
 
 def retrieve(results: str, **_) -> np.ndarray:
     """
     Decodes an image from quantum state measurement results.
 
     Parameters:
-    results (dict): A dictionary where keys are binary strings representing quantum states,
-                         and values are their respective occurrence counts.
+    results (dict | DenseCounts): A dictionary where keys are binary strings representing quantum states,
+                         and values are their respective occurrence counts, or the equivalent dense counts.
 
     Returns:
     np.ndarray: A NumPy array representing the decoded image.
     """
-    state_length = len(next(iter(results)))
+    indices, weights, state_length = outcomes(results)
     color_qubits = 3
     lxy_qubits = 3
     number_of_position_qubits = state_length - color_qubits - lxy_qubits
@@ -20,25 +21,17 @@ def retrieve(results: str, **_) -> np.ndarray:
     y_qubits = number_of_position_qubits // 2
 
     image_shape = (2**x_qubits, 2**y_qubits)
-    reconstructed_image = np.zeros((image_shape[0], image_shape[1], 3))
-
-    for state, n in results.items():
-        if n > 0:
-            x = state[0:x_qubits]
-            y = state[x_qubits:number_of_position_qubits]
-            lxy = state[number_of_position_qubits: number_of_position_qubits+lxy_qubits]
-            rgb = state[number_of_position_qubits+lxy_qubits: number_of_position_qubits+lxy_qubits+color_qubits]
-
-
-            lxy_dec = abs(int(lxy, base=2)-(lxy_qubits+color_qubits+1))
-            x_dec = int(x, base=2)
-            y_dec = int(y, base=2)
-
-            if rgb[0] == '1':
-                reconstructed_image[x_dec, y_dec, 0] += (2**(lxy_dec))
-            if rgb[1] == '1':
-                reconstructed_image[x_dec, y_dec, 1] += (2**(lxy_dec))
-            if rgb[2] == '1':
-                reconstructed_image[x_dec, y_dec, 2] += (2**(lxy_dec))
-        
-    return reconstructed_image.astype(np.uint8)
+
+    x = bit_field(indices, state_length, 0, x_qubits)
+    y = bit_field(indices, state_length, x_qubits, number_of_position_qubits)
+    lxy = bit_field(indices, state_length, number_of_position_qubits, number_of_position_qubits + lxy_qubits)
+    rgb = bit_field(indices, state_length, number_of_position_qubits + lxy_qubits, state_length)
+
+    # Label `lxy` holds bit `7 - lxy` of every channel as an RGB pattern, red being its highest bit
+    positions = np.ravel_multi_index((x, y), image_shape)
+    bit_planes = most_frequent(positions, rgb, weights, np.prod(image_shape), labels=lxy, num_labels=2**lxy_qubits)
+    channel_bits = (bit_planes[:, :, None] >> np.arange(color_qubits)[::-1]) & 1
+
+    # Fields from the least significant bit, i.e. from the last label, per channel
+    reconstructed_image = pack_fields(np.moveaxis(channel_bits[:, ::-1], 1, -1))
+    return reconstructed_image.reshape(*image_shape, color_qubits).astype(np.uint8)
@@ -2,6 +2,8 @@ import numpy as np
 
 from qiskit.quantum_info import Operator
 
+from .. import xor_permutations
+
 I_GATE = np.eye(2)
 X_GATE = np.array([
     [0, 1], 
@@ -28,3 +30,12 @@ def map(rho: int, theta: int, R: int, image: np.ndarray, **_) -> Operator:
             map_operator = np.kron(I_GATE, map_operator)
 
     return Operator(map_operator)
+
+
+def batch_basis_states(image: np.ndarray, R: int, **_) -> np.ndarray:
+    return image.reshape(-1).astype(np.int64)
+
+
+def batch_map(image: np.ndarray, R: int, **_) -> np.ndarray:
+    p = batch_basis_states(image, R)
+    return xor_permutations(p, 2**8)
@@ -0,0 +1,7 @@
+import numpy as np
+
+from .. import ensure_grayscale
+
+
+def prepare(image: np.ndarray, grayscale_strategy: str | None = None, **_) -> np.ndarray:
+    return ensure_grayscale(image, grayscale_strategy)
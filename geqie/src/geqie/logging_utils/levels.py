@@ -8,6 +8,9 @@ MATH = 9
 STATE = 8
 TRACE = 5
 
+for _level, _name in ((MATH, "MATH"), (STATE, "STATE"), (TRACE, "TRACE")):
+    logging.addLevelName(_level, _name)
+
 LOGGING_LEVELS_MAPPING = {
     "ERROR": ERROR,
     "WARNING": WARNING,
@@ -30,6 +33,8 @@ CLI_VERBOSITY_LEVELS = {
 
 
 def cli_verbosity_to_logging_level(verbosity_level: int | str) -> int:
+    if isinstance(verbosity_level, str) and verbosity_level.isdigit():
+        verbosity_level = int(verbosity_level)
     if isinstance(verbosity_level, str):
         return LOGGING_LEVELS_MAPPING.get(verbosity_level.upper(), ERROR)
     return CLI_VERBOSITY_LEVELS.get(verbosity_level, ERROR)
\ No newline at end of file
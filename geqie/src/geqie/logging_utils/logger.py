@@ -1,22 +1,80 @@
 import logging as logging
+import sys
+
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
 from geqie.logging_utils import levels
+from geqie.logging_utils.tabulate import tabulate_complex
 
 LOG_FORMAT = "%(levelname)s\t %(asctime)s --- %(message)s (geqie.%(module)s:%(lineno)d)"
 LOGGER = None
 
 
+class Lazy:
+    """Message argument computed only once a record is formatted, e.g. `logger.info("%s", Lazy(circuit.draw))`."""
+
+    def __init__(self, function: Callable[[], Any]):
+        self.function = function
+
+    def __str__(self) -> str:
+        return str(self.function())
+
+
+class _StderrHandler(logging.StreamHandler):
+    """Stream handler writing to the current `sys.stderr`, which test runners may swap between calls."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
 class GEQIELogger(logging.Logger):
+    """
+    Logger with the MATH, STATE and TRACE levels below DEBUG.
+
+    Messages are formatted only for enabled levels, so %-style arguments, and `Lazy` ones
+    for expensive reprs, cost a level check when disabled. f-strings are formatted before
+    the check and belong behind `isEnabledFor` guards.
+    """
+    dump_dir: Path | None = None
+    _dumps: int = 0
+
     def trace(self, message, *args, **kwargs):
         if self.isEnabledFor(levels.TRACE):
-            self._log(levels.TRACE, message, args, **kwargs)
+            self._log(levels.TRACE, message, args, stacklevel=kwargs.pop("stacklevel", 1) + 1, **kwargs)
 
     def state(self, message, *args, **kwargs):
         if self.isEnabledFor(levels.STATE):
-            self._log(levels.STATE, message, args, **kwargs)
+            self._log(levels.STATE, message, args, stacklevel=kwargs.pop("stacklevel", 1) + 1, **kwargs)
 
     def math(self, message, *args, **kwargs):
         if self.isEnabledFor(levels.MATH):
-            self._log(levels.MATH, message, args, **kwargs)
+            self._log(levels.MATH, message, args, stacklevel=kwargs.pop("stacklevel", 1) + 1, **kwargs)
+
+    def dump(self, name: str, matrix: np.ndarray | Callable[[], np.ndarray], level: int = levels.MATH):
+        """
+        Log a matrix, by default at the MATH level, computing it from a callable only when enabled.
+
+        With a `dump_dir`, the matrix is saved to a numbered `.npy` file there and only its path
+        is logged, otherwise it is logged as a table.
+        """
+        if not self.isEnabledFor(level):
+            return
+        matrix = np.asarray(matrix() if callable(matrix) else matrix)
+        if self.dump_dir is None:
+            self._log(level, "%s=\n%s", (name, tabulate_complex(matrix)), stacklevel=2)
+            return
+        self.dump_dir.mkdir(parents=True, exist_ok=True)
+        path = self.dump_dir / f"{self._dumps:04d}_{name}.npy"
+        self._dumps += 1
+        np.save(path, matrix)
+        self._log(level, "%s%s written to '%s'", (name, matrix.shape, path), stacklevel=2)
 
 
 def get_logger(name: str) -> GEQIELogger:
@@ -24,25 +82,28 @@ def get_logger(name: str) -> GEQIELogger:
     return logging.getLogger(name)
 
 
-def setup_logger(verbosity_level: int | None = None, reset: bool = False) -> GEQIELogger:
+def setup_logger(verbosity_level: int | None = None, reset: bool = False, dump_dir: str | None = None) -> GEQIELogger:
+    """
+    Return the geqie logger, whose handler is created on first use.
+
+    With `reset`, the level and the directory of matrix dumps are set again, while the
+    handler is kept, so that per-call resets stay cheap.
+    """
     global LOGGER
-    verbosity_level = verbosity_level or levels.ERROR
-    
+
     if LOGGER and not reset:
         return LOGGER
-    
-    if LOGGER and reset:
-        for handler in LOGGER.handlers[:]:
-            LOGGER.removeHandler(handler)
-
-    logging.basicConfig(level=logging.CRITICAL)
-    formatter = logging.Formatter(fmt=LOG_FORMAT, datefmt="%Y-%m-%d %H:%M:%S")
-    handler = logging.StreamHandler()
-    handler.setFormatter(formatter)
-
-    logger = get_logger("geqie")
-    logger.addHandler(handler)
-    logger.setLevel(verbosity_level)
-    logger.propagate = False
-    LOGGER = logger
-    return logger
+
+    if LOGGER is None:
+        logging.basicConfig(level=logging.CRITICAL)
+        handler = _StderrHandler()
+        handler.setFormatter(logging.Formatter(fmt=LOG_FORMAT, datefmt="%Y-%m-%d %H:%M:%S"))
+
+        logger = get_logger("geqie")
+        logger.addHandler(handler)
+        logger.propagate = False
+        LOGGER = logger
+
+    LOGGER.setLevel(verbosity_level or levels.ERROR)
+    LOGGER.dump_dir = Path(dump_dir) if dump_dir else None
+    return LOGGER
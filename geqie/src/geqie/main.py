@@ -1,8 +1,7 @@
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, List, Sequence
 
 import numpy as np
 
-from qiskit_aer import AerSimulator
 from qiskit_aer.noise import NoiseModel
 from qiskit import transpile
 from qiskit.circuit import QuantumCircuit
@@ -10,8 +9,19 @@ from qiskit.result import Result
 from qiskit.quantum_info import Operator, Statevector
 
 import geqie.backends.ibm_qp as ibm_qp
-from geqie.logging_utils.logger import setup_logger
-from geqie.logging_utils.tabulate import tabulate_complex
+from geqie.backends.aer import get_aer_simulator, prepare_circuit, prepare_circuits, probability_circuit, result_counts, result_probabilities
+from geqie.assembly import BlockDiagonalOperator, apply, assemble, num_qubits, to_matrix, unitarize
+from geqie.cache import DEFAULT_CACHE_MAX_SIZE, OperatorCache, cache_key
+from geqie.logging_utils.logger import Lazy, setup_logger
+from geqie.planner import SimulationPlan, plan_simulation
+from geqie.preparation import PreparedImageCache, prepare_image
+from geqie.resources import ResourceEstimate, circuit_resources
+from geqie.counts import DenseCounts
+from geqie.sampling import format_counts, sample_results, stack_probabilities
+from geqie.encodings import EncodingMetadata
+from geqie.synthesis import SYNTHESIS_METHODS, build_basis_circuit, build_circuit, build_rotation_circuit, repeated_positions, rotation_angles, superposition_init
+from geqie.templates import EncodingTemplate, encode_template
+from geqie.tracing import Trace, stage
 
 
 def encode(
@@ -24,82 +34,472 @@ def encode(
     perform_measurement: bool = True,
     logging_level: int | None = None,
     encoding_params: Dict[str, str] = {},
+    prepare_function: Callable[..., np.ndarray] | None = None,
+    batch_data_function: Callable[..., np.ndarray] | None = None,
+    batch_map_function: Callable[..., np.ndarray] | None = None,
+    batch_angle_function: Callable[..., np.ndarray] | None = None,
+    batch_basis_function: Callable[..., np.ndarray] | None = None,
+    metadata_function: Callable[..., EncodingMetadata] | None = None,
+    synthesis: str = "auto",
+    workers: int | None = None,
+    prepare_cache: PreparedImageCache | None = None,
+    cache_dir: str | None = None,
+    cache_max_size: int = DEFAULT_CACHE_MAX_SIZE,
+    use_cache: bool = True,
+    log_dump_dir: str | None = None,
+    trace: Trace | None = None,
     **_: Dict[Any, Any],
 ) -> QuantumCircuit:
-    logger = setup_logger(logging_level, reset=True)
-
-    shape = image.shape[:image_dimensionality]
+    """
+    Encode an image into a quantum circuit.
+
+    `prepare_function` runs once on the image before any other encoding function is
+    called, and its result is reused from `prepare_cache` when one is given.
+
+    When both `batch_data_function` and `batch_map_function` are given, they replace the
+    per-pixel `data_function` and `map_function` calls: the first returns the basis
+    position of every pixel within the `2^(len(shape) * R)` position register, the second
+    the stack of map blocks, both in `np.ndindex(*shape)` order. Otherwise, with more than
+    one of `workers`, the coordinates are sharded across a process pool whose workers write
+    their map blocks into shared memory.
+
+    With `cache_dir` set, the unitarized operator is stored in an on-disk `OperatorCache`
+    of at most `cache_max_size` bytes, keyed by the image content, the geqie and encoding
+    sources and parameters, so that repeated encodes skip the assembly and unitarization
+    altogether.
+    `use_cache=False` bypasses the cache.
+
+    At the MATH logging level, G and U are logged as tables, or saved as `.npy` files to
+    `log_dump_dir` when set, which suits large operators better.
+
+    A `trace` records the wall time and peak memory of the preprocessing, assembly,
+    unitarization and circuit build stages, and the size of the circuit.
+
+    `synthesis="auto"` builds angle and basis encodings without any operator, from rotations
+    or X gates controlled by the position register (see the README for every method), and
+    other encodings from their unitarized operator. Circuits built without an operator skip
+    the operator cache. Pixels sharing a basis position, and init functions preparing other
+    states than uniform positions, fall back to the operator.
+    """
+    logger = setup_logger(logging_level, reset=True, dump_dir=log_dump_dir)
+
+    if synthesis not in SYNTHESIS_METHODS:
+        raise ValueError(f"Unknown synthesis '{synthesis}'. Use one of {SYNTHESIS_METHODS}.")
+    metadata = metadata_function(**encoding_params) if metadata_function is not None else None
+    rotations = metadata.rotations if metadata is not None else "labelled"
+    angle_based = batch_data_function is not None and batch_angle_function is not None and rotations is not None
+    basis_based = batch_data_function is not None and batch_basis_function is not None and metadata is not None
+    if synthesis == "ucr" and not angle_based:
+        raise ValueError("Synthesis 'ucr' requires an angle encoding providing `batch_data_function` and `batch_angle_function`")
+    if synthesis == "esop" and not basis_based:
+        raise ValueError("Synthesis 'esop' requires a basis encoding providing `batch_data_function`, `batch_basis_function` and `metadata_function`")
+    if synthesis == "quadtree" and not (angle_based or basis_based):
+        raise ValueError("Synthesis 'quadtree' requires an angle or a basis encoding")
+
+    structured = (synthesis in ("auto", "ucr", "quadtree") and angle_based) or (synthesis in ("auto", "esop", "quadtree") and basis_based)
+    if structured:
+        with stage(trace, "preprocessing"):
+            prepared = prepare_image(prepare_function, image, encoding_params, cache=prepare_cache)
+        R = int(np.ceil(np.log2(max(prepared.shape[:image_dimensionality]))))
+        num_positions = 2**(image_dimensionality * R)
+        with stage(trace, "assembly"):
+            indices = batch_data_function(prepared, R=R, **encoding_params)
+        if repeated_positions(indices):
+            # The blocks of pixels sharing a position add up, which only the operator reproduces
+            if synthesis != "auto":
+                raise ValueError(f"Synthesis '{synthesis}' requires every pixel at a distinct basis position, use synthesis='operator'")
+            logger.info("Pixels share basis positions, falling back to operator synthesis")
+            structured = False
+
+    if structured:
+        with stage(trace, "assembly"):
+            if angle_based:
+                ry_angles = rotation_angles(indices, batch_angle_function(prepared, R=R, **encoding_params), num_positions)
+                width = ry_angles.shape[1]
+                n_labels = int(np.ceil(np.log2(width))) if rotations == "labelled" else 0
+                n_color_qubits = n_labels + 1 if rotations == "labelled" else width
+                label_qubits = range(1, n_labels + 1)
+            else:
+                values = batch_basis_function(prepared, R=R, **encoding_params).reshape(len(indices), -1)
+                states = np.zeros((num_positions, values.shape[1]), dtype=np.int64)
+                states[indices] = values
+                n_color_qubits, label_qubits = metadata.color_qubits, metadata.label_qubits
+        position_qubits = image_dimensionality * R
+        if not superposition_init(init_function(position_qubits + n_color_qubits, **encoding_params), position_qubits, label_qubits):
+            # The structured circuits always start from uniform positions, which the init function does not prepare
+            if synthesis != "auto":
+                raise ValueError(f"Synthesis '{synthesis}' requires an init function preparing uniform positions, use synthesis='operator'")
+            logger.info("Init state is not a uniform superposition of the positions, falling back to operator synthesis")
+            structured = False
+
+    if structured:
+        if angle_based:
+            method = "quadtree" if synthesis == "quadtree" else "ucr"
+            with stage(trace, "circuit_build"):
+                circuit = build_rotation_circuit(ry_angles, rotations, perform_measurement, method, image_dimensionality)
+        else:
+            method = "quadtree" if synthesis == "quadtree" else "esop"
+            with stage(trace, "circuit_build"):
+                circuit = build_basis_circuit(states, metadata.color_qubits, metadata.label_qubits, perform_measurement, method, image_dimensionality)
+        if trace is not None:
+            trace.count(synthesis=method)
+            trace.count_circuit(circuit)
+
+        if circuit.metadata:
+            logger.info(
+                f"{circuit.metadata['synthesis']} synthesis: {circuit.metadata['gates']} controlled gates instead of "
+                f"{circuit.metadata['uncompressed_gates']} ({circuit.metadata['compression']:.1f}x compression)"
+            )
+        logger.info("\n%s", Lazy(circuit.draw))
+        return circuit
+
+    cache, key, cached = None, None, None
+    if cache_dir is not None and use_cache:
+        cache = OperatorCache(cache_dir, max_size=cache_max_size)
+        key = cache_key(
+            image,
+            (init_function, data_function, map_function, prepare_function, batch_data_function, batch_map_function),
+            encoding_params,
+            image_dimensionality,
+        )
+        cached = cache.get(key)
+        logger.debug(f"Operator cache {'hit' if cached is not None else 'miss'}: {key}")
+
+    if cached is not None:
+        U, init_state = cached
+        init_state = Statevector(init_state)
+    else:
+        with stage(trace, "preprocessing"):
+            image = prepare_image(prepare_function, image, encoding_params, cache=prepare_cache)
+        with stage(trace, "assembly"):
+            G = assemble(
+                data_function,
+                map_function,
+                image,
+                image_dimensionality=image_dimensionality,
+                encoding_params=encoding_params,
+                batch_data_function=batch_data_function,
+                batch_map_function=batch_map_function,
+                workers=workers,
+            )
+        with stage(trace, "unitarization"):
+            U = unitarize(G)
+        logger.dump("G", lambda: to_matrix(G))
+        logger.dump("U", lambda: to_matrix(U))
+
+        n_qubits = num_qubits(U)
+        init_state = init_function(n_qubits, **encoding_params)
+        if cache is not None:
+            cache.put(key, U, Statevector(init_state).data)
+    logger.state("init_state=%r", init_state)
+
+    with stage(trace, "circuit_build"):
+        circuit = build_circuit(init_state, U, perform_measurement=perform_measurement)
+    if trace is not None:
+        trace.count(synthesis="operator", operator_cache_hit=cached is not None)
+        trace.count_circuit(circuit)
+
+    logger.info("\n%s", Lazy(circuit.draw))
 
-    R = int(np.ceil(np.log2(max(shape))))
+    return circuit
 
-    products, data_vectors, map_operators = [], [], []
 
-    for coords in np.ndindex(*shape):
-        data_vector = data_function(*coords, R=R, image=image, **encoding_params)
-        map_operator = map_function(*coords, R=R, image=image, **encoding_params)
-        product = data_vector.to_operator() ^ map_operator
+def encode_statevector(
+    init_function: Callable[..., Statevector],
+    data_function: Callable[..., Statevector],
+    map_function: Callable[..., Operator],
+    image: np.ndarray,
+    image_dimensionality: int = 2,
+    batch: bool = False,
+    logging_level: int | None = None,
+    encoding_params: Dict[str, str] = {},
+    prepare_function: Callable[..., np.ndarray] | None = None,
+    batch_data_function: Callable[..., np.ndarray] | None = None,
+    batch_map_function: Callable[..., np.ndarray] | None = None,
+    prepare_cache: PreparedImageCache | None = None,
+    workers: int | None = None,
+    **_: Dict[Any, Any],
+) -> np.ndarray:
+    """
+    Compute the encoded state U|init> directly, without building a circuit.
+
+    With `batch=True` the leading axis of `image` indexes a stack of equally shaped
+    images, and one state per image is returned as the rows of a 2-D array. States of
+    block-diagonal encodings are unitarized and applied in a single NumPy pass.
+    """
+    logger = setup_logger(logging_level, reset=True)
 
-        products.append(product)
-        data_vectors.append(data_vector)
-        map_operators.append(map_operator)
+    images = image if batch else [image]
+    operators = []
+    for single_image in images:
+        prepared_image = prepare_image(prepare_function, single_image, encoding_params, cache=prepare_cache)
+        operators.append(assemble(
+            data_function,
+            map_function,
+            prepared_image,
+            image_dimensionality=image_dimensionality,
+            encoding_params=encoding_params,
+            batch_data_function=batch_data_function,
+            batch_map_function=batch_map_function,
+            workers=workers,
+        ))
+
+    n_qubits = num_qubits(operators[0])
+    init_state = np.asarray(init_function(n_qubits, **encoding_params), dtype=np.complex128)
+    init_state = init_state / np.linalg.norm(init_state)
+    logger.state("init_state=%r", init_state)
+
+    if all(isinstance(G, BlockDiagonalOperator) for G in operators):
+        U = BlockDiagonalOperator(np.stack([G.blocks for G in operators])).unitarize()
+        states = U.apply(init_state)
+    else:
+        states = np.stack([apply(unitarize(G), init_state) for G in operators])
 
-        logger.state(f"{coords=}")
-        logger.state(f"{data_vector=}")
-        logger.state(f"{map_operator=}")
-        logger.state(f"{product=}")
-        logger.state("===========")
+    return states if batch else states[0]
 
-    G = np.sum(products, axis=0)
-    U, _r = np.linalg.qr(G)
-    logger.math(f"G=\n{tabulate_complex(G)}")
-    logger.math(f"U=\n{tabulate_complex(U)}")
 
-    U_op = Operator(U)
-    n_qubits = U_op.num_qubits
-    init_state = init_function(n_qubits, **encoding_params)
-    logger.state(f"{init_state=}")
+def simulate(
+    circuit: QuantumCircuit | Statevector | np.ndarray,
+    n_shots: int | Sequence[int],
+    return_qiskit_result: bool = False,
+    return_padded_counts: bool = False,
+    device: str = "CPU",
+    method: str = "automatic",
+    noise_model: NoiseModel | None = None,
+    engine: str = "aer",
+    seed: int | None = None,
+    analytic: bool = False,
+    return_probabilities: bool = False,
+    return_dense_counts: bool = False,
+    memory_budget: int | None = None,
+    dry_run: bool = False,
+    logging_level: int | None = None,
+    trace: Trace | None = None,
+    **_: Dict[Any, Any],
+) -> Result | Dict[str, int] | DenseCounts | List[Dict[str, int] | DenseCounts] | np.ndarray | SimulationPlan:
+    """
+    Sample measurement counts of an encoded image.
+
+    `engine="aer"` runs the circuit on an `AerSimulator`, transpiling it only if it holds
+    instructions Aer does not support natively. `engine="direct"` samples the exact output
+    probabilities of a noiseless state instead. It accepts a circuit, a state, or a 2-D
+    array of states from `encode_statevector(batch=True)`, in which case a list of counts
+    is returned. `seed` makes the sampling of either engine reproducible.
+
+    With `analytic=True`, Aer computes the exact output probabilities of a noiseless circuit
+    once and the counts are drawn from them in a single multinomial sample, as the direct
+    engine always does. `return_probabilities=True` returns these probabilities instead of
+    counts. A sequence of `n_shots` returns one counts dict per shot count, all drawn from
+    the same probabilities in analytic mode.
+
+    `return_dense_counts=True` returns `DenseCounts`, an array of counts indexed by basis
+    state, instead of `{bitstring: count}` dicts. Aer results only keep the outcome of every
+    shot for `return_qiskit_result=True`.
+
+    Aer simulations are planned before anything is allocated: `method="automatic"` picks the
+    fastest method whose estimated memory fits `memory_budget` (by default the available
+    memory), and a `ResourceError` is raised when none does. `dry_run=True` returns the
+    `SimulationPlan` without simulating.
+
+    A `trace` records the wall time and peak memory of the transpile, simulation and result
+    conversion stages, and the method, shots and size of the simulated circuit.
+
+    Use a `Session` to reuse simulators and prepared circuits across calls.
+    """
+    logger = setup_logger(logging_level, reset=True)
 
-    circuit = QuantumCircuit(n_qubits)
-    circuit.prepare_state(init_state, range(n_qubits), normalize=True)
-    circuit.append(U_op, range(n_qubits))
-    if perform_measurement:
-        circuit.measure_all()
+    if engine == "direct":
+        if dry_run:
+            raise ValueError("Dry runs plan Aer simulations, the 'direct' engine has nothing to plan.")
+        if trace is not None:
+            trace.count(engine=engine, n_shots=n_shots)
+        return _simulate_direct(
+            circuit, n_shots, return_qiskit_result, return_padded_counts, noise_model, seed, return_probabilities, return_dense_counts,
+            trace=trace,
+        )
+    if engine != "aer":
+        raise ValueError(f"Unknown simulation engine '{engine}'. Use 'aer' or 'direct'.")
+
+    plan = plan_simulation(circuit, n_shots, noise_model, method, memory_budget, analytic or return_probabilities)
+    logger.debug(f"Planned simulation: {plan}")
+    if dry_run:
+        return plan
+    if trace is not None:
+        trace.count(engine=engine, method=plan.method, n_shots=n_shots)
+
+    simulator = get_aer_simulator(device=device, method=plan.method)
+    if analytic or return_probabilities:
+        if noise_model is not None:
+            raise ValueError("Analytic sampling only supports noiseless simulations.")
+
+        logger.debug("Computing exact probabilities...")
+        with stage(trace, "transpile"):
+            runnable_circuit = prepare_circuit(probability_circuit(circuit), simulator)
+        with stage(trace, "simulation"):
+            result = simulator.run(runnable_circuit, shots=1).result()
+        if return_qiskit_result:
+            return result
+        with stage(trace, "result_conversion"):
+            probabilities = result_probabilities(result)
+            if return_probabilities:
+                return probabilities[0]
+            return sample_results(probabilities, n_shots, seed, return_padded_counts, return_dense_counts)[0]
+
+    if np.ndim(n_shots):
+        return [
+            simulate(
+                circuit, shots, return_qiskit_result, return_padded_counts, device, plan.method, noise_model, engine, seed,
+                return_dense_counts=return_dense_counts,
+                memory_budget=memory_budget,
+                trace=trace,
+            )
+            for shots in n_shots
+        ]
+
+    with stage(trace, "transpile"):
+        runnable_circuit = prepare_circuit(circuit, simulator, noise_model)
+    if trace is not None:
+        trace.count_circuit(runnable_circuit, prefix="simulated_")
 
-    logger.info("\n" + str(circuit.draw()))
+    logger.debug("Simulating circuit...")
+    run_options = {} if seed is None else {"seed_simulator": seed}
+    with stage(trace, "simulation"):
+        # Per-shot memory is only kept for callers of the raw result
+        result = simulator.run(
+            runnable_circuit, shots=n_shots, memory=return_qiskit_result, noise_model=noise_model, **run_options,
+        ).result()
+    logger.debug("Simulation completed.")
+    if return_qiskit_result:
+        return result
 
-    return circuit
+    with stage(trace, "result_conversion"):
+        return result_counts(result, 0, circuit.num_qubits, return_padded_counts, return_dense_counts)
 
 
-def simulate(
-    circuit: QuantumCircuit, 
-    n_shots: int, 
+def simulate_many(
+    circuits: Sequence[QuantumCircuit],
+    n_shots: int,
     return_qiskit_result: bool = False,
     return_padded_counts: bool = False,
     device: str = "CPU",
     method: str = "automatic",
     noise_model: NoiseModel | None = None,
+    engine: str = "aer",
+    seed: int | None = None,
+    max_parallel_experiments: int = 0,
+    max_parallel_threads: int = 0,
+    analytic: bool = False,
+    return_probabilities: bool = False,
+    return_dense_counts: bool = False,
+    memory_budget: int | None = None,
+    dry_run: bool = False,
     logging_level: int | None = None,
     **_: Dict[Any, Any],
-) -> Result | Dict[str, int]:
+) -> Result | List[Dict[str, int] | DenseCounts] | np.ndarray | List[np.ndarray] | SimulationPlan:
+    """
+    Sample measurement counts of many encoded images, returned in the order of `circuits`.
+
+    With `engine="aer"` all circuits are submitted in a single `AerSimulator.run` call.
+    Aer then runs up to `max_parallel_experiments` circuits in parallel (0 means as many as
+    fit in memory) on `max_parallel_threads` threads (0 means all cores), and only
+    parallelizes within a circuit when it is too large to run several at once.
+    `analytic`, `return_probabilities` and `return_dense_counts` behave as in `simulate`, with one row of
+    probabilities per circuit, stacked into a 2-D array when all circuits have the same number of
+    qubits and listed otherwise. The simulation is planned as in `simulate` for its largest circuit,
+    whose `SimulationPlan` `dry_run=True` returns.
+    """
     logger = setup_logger(logging_level, reset=True)
 
-    simulator = AerSimulator(device=device, method=method)
-    transpiled_circuit = transpile(circuit, simulator, optimization_level=0)
-    
-    logger.debug("Simulating circuit...")
-    result = simulator.run(transpiled_circuit, shots=n_shots, memory=True, noise_model=noise_model).result()
+    if engine == "direct":
+        if dry_run:
+            raise ValueError("Dry runs plan Aer simulations, the 'direct' engine has nothing to plan.")
+        rng = np.random.default_rng(seed)
+        results = [
+            _simulate_direct(
+                circuit, n_shots, return_qiskit_result, return_padded_counts, noise_model, rng, return_probabilities, return_dense_counts,
+            )
+            for circuit in circuits
+        ]
+        return stack_probabilities(results) if return_probabilities else results
+    if engine != "aer":
+        raise ValueError(f"Unknown simulation engine '{engine}'. Use 'aer' or 'direct'.")
+
+    largest = max(circuits, key=lambda circuit: circuit.num_qubits)
+    plan = plan_simulation(largest, n_shots, noise_model, method, memory_budget, analytic or return_probabilities)
+    logger.debug(f"Planned simulation: {plan}")
+    if dry_run:
+        return plan
+
+    simulator = get_aer_simulator(device=device, method=plan.method)
+    analytic = analytic or return_probabilities
+    if analytic:
+        if noise_model is not None:
+            raise ValueError("Analytic sampling only supports noiseless simulations.")
+        circuits_to_run = [probability_circuit(circuit) for circuit in circuits]
+    else:
+        circuits_to_run = circuits
+    runnable_circuits = prepare_circuits(circuits_to_run, simulator, noise_model)
+
+    logger.debug(f"Simulating {len(runnable_circuits)} circuits...")
+    run_options = {} if seed is None else {"seed_simulator": seed}
+    result = simulator.run(
+        runnable_circuits,
+        shots=1 if analytic else n_shots,
+        memory=return_qiskit_result and not analytic,
+        noise_model=noise_model,
+        max_parallel_experiments=max_parallel_experiments,
+        max_parallel_threads=max_parallel_threads,
+        **run_options,
+    ).result()
     logger.debug("Simulation completed.")
     if return_qiskit_result:
         return result
 
-    counts = result.get_counts(transpiled_circuit)
+    if analytic:
+        probabilities = result_probabilities(result)
+        if return_probabilities:
+            return stack_probabilities(probabilities)
+        return sample_results(probabilities, n_shots, seed, return_padded_counts, return_dense_counts)
+
+    return [
+        result_counts(result, index, circuit.num_qubits, return_padded_counts, return_dense_counts)
+        for index, circuit in enumerate(circuits)
+    ]
+
+
+def _simulate_direct(
+    circuit: QuantumCircuit | Statevector | np.ndarray,
+    n_shots: int,
+    return_qiskit_result: bool,
+    return_padded_counts: bool,
+    noise_model: NoiseModel | None,
+    seed: int | np.random.Generator | None,
+    return_probabilities: bool = False,
+    return_dense_counts: bool = False,
+    trace: Trace | None = None,
+) -> Dict[str, int] | DenseCounts | List[Dict[str, int] | DenseCounts] | np.ndarray:
+    logger = setup_logger()
 
-    if return_padded_counts:
-        logger.debug("Padding counts...")
-        counts_padded = {f"{n:0{circuit.num_qubits}b}": 0 for n in range(2**circuit.num_qubits)}
-        return {**counts_padded, **counts}
+    if return_qiskit_result:
+        raise ValueError("The 'direct' engine does not produce qiskit results, use engine='aer'.")
+    if noise_model is not None:
+        raise ValueError("The 'direct' engine only simulates noiseless states, use engine='aer'.")
+
+    with stage(trace, "simulation"):
+        if isinstance(circuit, QuantumCircuit):
+            circuit = Statevector(circuit.remove_final_measurements(inplace=False))
+        states = np.asarray(circuit)
+        probabilities = np.abs(np.atleast_2d(states))**2
+
+    if return_probabilities:
+        results = probabilities
     else:
-        return counts
+        logger.debug("Sampling exact probabilities...")
+        with stage(trace, "result_conversion"):
+            results = sample_results(probabilities, n_shots, seed, return_padded_counts, return_dense_counts)
+        logger.debug("Sampling completed.")
+
+    return results if states.ndim == 2 else results[0]
 
 
 def execute(
@@ -108,6 +508,7 @@ def execute(
     circuit_param_values: Dict[str, Any] = {},
     return_qiskit_result: bool = False,
     return_padded_counts: bool = False,
+    return_dense_counts: bool = False,
     dry_run: bool = False,
     api_token: str = "",
     instance_crn: str = "",
@@ -117,8 +518,21 @@ def execute(
     ibm_qp_runtime_args: Dict[str, Any] = {},
     transpiler_args: Dict[str, Any] = {},
     logging_level: int | None = None,
+    trace: Trace | None = None,
     **_: Dict[Any, Any],
-) -> Result | Dict[str, int] | None:
+) -> Result | Dict[str, int] | DenseCounts | List[Dict[str, int] | DenseCounts] | ResourceEstimate:
+    """
+    Run a circuit on an IBM Quantum backend.
+
+    A 2-D array of `circuit_param_values`, e.g. from `EncodingTemplate.bind(images, batch=True)`,
+    runs a parameterized circuit once per row within a single job and returns a list of counts.
+    `return_dense_counts=True` returns `DenseCounts` instead of `{bitstring: count}` dicts.
+    `dry_run=True` stops before submitting the job and returns the resources of the
+    transpiled circuit instead. Unlike `geqie.estimate`, which needs the encoding and image
+    shape rather than a circuit, this counts what the backend would actually run; `geqie
+    execute --dry-run` reports both. A `trace` records the wall time and peak memory of the
+    transpile, execution and result conversion stages, and the size of the transpiled circuit.
+    """
     logger = setup_logger(logging_level, reset=True)
 
     logger.info("Setting up IBM Quantum backend...")
@@ -133,27 +547,32 @@ def execute(
     )
 
     logger.info("Circuit transpilation...")
-    transpiled_circuit = transpile(
-        circuit=circuit,
-        backend=ibm_qp_backend,
-        translation_method="translator",
-        **transpiler_args,
-    )
+    with stage(trace, "transpile"):
+        transpiled_circuit = transpile(
+            circuit=circuit,
+            backend=ibm_qp_backend,
+            translation_method="translator",
+            **transpiler_args,
+        )
     logger.info("Circuit transpilation. Done.")
-    logger.trace(transpiled_circuit.draw())
+    if trace is not None:
+        trace.count(backend=ibm_qp_backend.name, n_shots=n_shots)
+        trace.count_circuit(transpiled_circuit, prefix="transpiled_")
+    logger.trace("%s", Lazy(transpiled_circuit.draw))
 
     sampler = ibm_qp.get_sampler(ibm_qp_backend)
 
     if dry_run:
         logger.info("Dry run mode. Exiting before job submission.")
-        return None
+        return circuit_resources(transpiled_circuit, target=ibm_qp_backend.name)
 
     try:
         logger.info(f"Submitting job to backend '{ibm_qp_backend.name}'...")
         job = sampler.run([(transpiled_circuit, circuit_param_values)], shots=n_shots)
         logger.debug(f"{job.job_id()=}")
 
-        result = job.result()
+        with stage(trace, "execution"):
+            result = job.result()
         logger.info("Job completed.")
         logger.debug(f"{job.metrics()=}")
     except Exception as e:
@@ -165,10 +584,12 @@ def execute(
         return result
 
     pub_result = result[0]
-    counts = pub_result.data.meas.get_counts()
+    meas = pub_result.data.meas
 
-    if return_padded_counts:
-        counts_padded = {f"{n:0{circuit.num_qubits}b}": 0 for n in range(2**circuit.num_qubits)}
-        return {**counts_padded, **counts}
-    else:
-        return counts
+    def _format_counts(counts: Dict[str, int]) -> Dict[str, int] | DenseCounts:
+        return format_counts(counts, circuit.num_qubits, return_padded_counts, return_dense_counts)
+
+    with stage(trace, "result_conversion"):
+        if meas.ndim:
+            return [_format_counts(meas.get_counts(loc=i)) for i in range(meas.shape[0])]
+        return _format_counts(meas.get_counts())
@@ -0,0 +1,45 @@
+"""Process pool helpers: single-threaded workers and NumPy arrays shared between processes."""
+
+import os
+
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Tuple
+
+import numpy as np
+
+
+def init_worker():
+    """Pin pool workers to a single OS thread so that processes, not threads, fill the cores."""
+    os.environ["OMP_NUM_THREADS"] = "1"
+    os.environ["MKL_NUM_THREADS"] = "1"
+    os.environ["OPENBLAS_NUM_THREADS"] = "1"
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """
+    Handle of a NumPy array in shared memory, cheap to pass to worker processes.
+
+    The creating process owns the memory and must `unlink` it once done, workers only
+    `attach` to it, so that writes of workers land in the array of the owner without any
+    pickling.
+    """
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+    @classmethod
+    def create(cls, shape: Tuple[int, ...], dtype: np.dtype) -> Tuple["SharedArray", shared_memory.SharedMemory, np.ndarray]:
+        """Allocate a zeroed shared array, returning its handle, its memory and a view of it."""
+        dtype = np.dtype(dtype)
+        memory = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        array = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+        array[...] = 0
+        return cls(memory.name, tuple(shape), dtype.str), memory, array
+
+    def attach(self) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+        """Map the shared array into a worker process, returning its memory, to be closed, and a view of it."""
+        # Workers share the resource tracker of the owner, whose `unlink` alone unregisters the memory
+        memory = shared_memory.SharedMemory(name=self.name)
+        return memory, np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=memory.buf)
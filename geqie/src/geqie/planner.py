@@ -0,0 +1,182 @@
+"""Up-front resource planning of Aer simulations: pick a method that fits in memory or refuse the job."""
+
+import os
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from qiskit.circuit import QuantumCircuit
+
+# Default memory budget of a single simulation or tile when it cannot be queried: 1 GiB
+DEFAULT_MEMORY_BUDGET = 2**30
+BYTES_PER_AMPLITUDE = np.dtype(np.complex128).itemsize
+
+PLANNED_METHODS = ("statevector", "matrix_product_state", "density_matrix")
+AER_DEFAULT_SHOTS = 1024
+
+MEMINFO_PATH = "/proc/meminfo"
+
+# Instructions that neither hold memory nor evolve the state
+NON_EVOLVING = {"barrier", "measure", "save_probabilities", "save_statevector", "save_density_matrix"}
+
+# Rough throughput of complex multiply-adds, only meant to rank methods and flag hopeless jobs
+AMPLITUDE_UPDATES_PER_SECOND = 2e8
+
+
+class ResourceError(MemoryError):
+    """A simulation that would not fit in the memory budget with any considered method."""
+
+
+@dataclass
+class MethodEstimate:
+    method: str
+    memory: int
+    runtime: float
+    fits: bool
+
+
+@dataclass
+class SimulationPlan:
+    """Method chosen for a simulation together with the estimates of every considered method."""
+    method: str
+    num_qubits: int
+    n_shots: int
+    noisy: bool
+    analytic: bool
+    memory_budget: int
+    estimates: List[MethodEstimate] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def available_memory() -> int:
+    """
+    Physical memory currently available, falling back to the default budget where it cannot be queried.
+
+    On Linux this is `MemAvailable`, which unlike the free memory counts the page cache
+    the kernel can reclaim.
+    """
+    try:
+        with open(MEMINFO_PATH) as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 2**10
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+    except (AttributeError, OSError, ValueError):
+        return DEFAULT_MEMORY_BUDGET
+
+
+def _gate_spans(circuit: QuantumCircuit) -> List[List[int]]:
+    return [
+        [circuit.find_bit(qubit).index for qubit in instruction.qubits]
+        for instruction in circuit.data
+        if instruction.operation.name not in NON_EVOLVING
+    ]
+
+
+def bond_dimensions(circuit: QuantumCircuit) -> np.ndarray:
+    """
+    Upper bounds of the bond dimensions of a matrix product state of the circuit output.
+
+    The bond between qubits `k - 1` and `k` is bounded by the dimension of the smaller side
+    and, starting from a product state, by the gates acting across it: a gate with `a` of its
+    qubits on one side and `b` on the other multiplies it by at most `2**min(a, b)`.
+    """
+    n = circuit.num_qubits
+    cuts = np.arange(1, n)
+    log_bonds = np.minimum(cuts, n - cuts).astype(float)
+    log_entangling = np.zeros(n - 1)
+    for span in _gate_spans(circuit):
+        span = np.asarray(span)
+        below = (span[None, :] < cuts[:, None]).sum(axis=1)
+        log_entangling += np.minimum(below, len(span) - below)
+    return 2**np.minimum(log_bonds, log_entangling).astype(np.int64)
+
+
+def estimate_method(
+    circuit: QuantumCircuit,
+    method: str,
+    n_shots: int = 1,
+    noisy: bool = False,
+    memory_budget: int | None = None,
+    analytic: bool = False,
+) -> MethodEstimate:
+    """
+    Estimated peak memory in bytes and runtime in seconds of simulating a circuit with an Aer method.
+
+    Applying a gate on `k` qubits touches every amplitude `2**k` times. Noiseless runs evolve
+    the state once and sample all shots from it, while noisy runs of the statevector and matrix
+    product state methods evolve one trajectory per shot. Analytic runs additionally hold
+    the `2**n` output probabilities.
+    """
+    memory_budget = memory_budget if memory_budget is not None else available_memory()
+    n = circuit.num_qubits
+    gate_sizes = np.array([2**len(span) for span in _gate_spans(circuit)], dtype=float)
+    trajectories = n_shots if noisy else 1
+
+    if method == "statevector":
+        memory = BYTES_PER_AMPLITUDE * 2**n
+        updates = 2.0**n * gate_sizes.sum() * trajectories
+    elif method == "density_matrix":
+        memory = BYTES_PER_AMPLITUDE * 4**n
+        updates = 2 * 4.0**n * gate_sizes.sum()
+    elif method == "matrix_product_state":
+        bonds = np.concatenate([[1], bond_dimensions(circuit), [1]]).astype(float)
+        memory = int(BYTES_PER_AMPLITUDE * 2 * (bonds[:-1] * bonds[1:]).sum())
+        updates = bonds.max()**3 * gate_sizes.sum() * trajectories
+    else:
+        raise ValueError(f"Cannot estimate the resources of method '{method}'. Use one of {PLANNED_METHODS}.")
+
+    if analytic:
+        memory += np.dtype(np.float64).itemsize * 2**n
+
+    return MethodEstimate(method, int(memory), float(updates / AMPLITUDE_UPDATES_PER_SECOND), bool(memory <= memory_budget))
+
+
+def plan_simulation(
+    circuit: QuantumCircuit,
+    n_shots: int | Sequence[int] | None = 1,
+    noise_model: Any = None,
+    method: str = "automatic",
+    memory_budget: int | None = None,
+    analytic: bool = False,
+) -> SimulationPlan:
+    """
+    Choose the Aer method of a simulation before allocating anything.
+
+    With `method="automatic"` Aer keeps choosing the method itself as long as a statevector
+    fits `memory_budget` (by default the available memory). Otherwise the fastest of
+    `PLANNED_METHODS` that fits is chosen. An explicit method in `PLANNED_METHODS` is checked
+    against the budget, other explicit methods are passed through unchecked.
+
+    Raises:
+        ResourceError: If no considered method fits the memory budget.
+    """
+    memory_budget = memory_budget if memory_budget is not None else available_memory()
+    # Aer runs its default number of shots when none is given
+    n_shots = int(np.max(n_shots)) if n_shots is not None else AER_DEFAULT_SHOTS
+    noisy = noise_model is not None
+    plan = SimulationPlan(method, circuit.num_qubits, n_shots, noisy, analytic, memory_budget)
+    if method != "automatic" and method not in PLANNED_METHODS:
+        return plan
+
+    candidates = PLANNED_METHODS if method == "automatic" else (method,)
+    plan.estimates = [estimate_method(circuit, candidate, n_shots, noisy, memory_budget, analytic) for candidate in candidates]
+    fitting = [estimate for estimate in plan.estimates if estimate.fits]
+    if not fitting:
+        smallest = min(plan.estimates, key=lambda estimate: estimate.memory)
+        raise ResourceError(
+            f"Simulating {circuit.num_qubits} qubits needs at least {smallest.memory} bytes "
+            f"({smallest.method}), exceeding the memory budget of {memory_budget} bytes"
+        )
+
+    if method == "automatic" and any(estimate.method == "statevector" for estimate in fitting):
+        return plan
+    plan.method = min(fitting, key=lambda estimate: estimate.runtime).method
+    return plan
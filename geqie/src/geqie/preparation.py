@@ -0,0 +1,73 @@
+"""Image preparation stage run once per encode, with an optional in-memory cache."""
+
+import hashlib
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+
+def image_digest(image: np.ndarray) -> str:
+    """Content hash of an image, including its shape and dtype."""
+    image = np.ascontiguousarray(image)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.shape}|{image.dtype.str}|".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class PreparedImageCache:
+    """
+    LRU cache of prepared images, keyed by the prepare function, image content and parameters.
+
+    Cached arrays are private read-only copies, so mutating the input image afterwards
+    never leaks into later encodes.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, np.ndarray] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def prepare(
+        self,
+        prepare_function: Callable[..., np.ndarray],
+        image: np.ndarray,
+        encoding_params: Dict[str, Any] = {},
+    ) -> np.ndarray:
+        key = (
+            prepare_function.__module__,
+            prepare_function.__qualname__,
+            image_digest(image),
+            repr(sorted(encoding_params.items())),
+        )
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        prepared = np.array(prepare_function(image, **encoding_params))
+        prepared.flags.writeable = False
+        self._entries[key] = prepared
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return prepared
+
+
+def prepare_image(
+    prepare_function: Callable[..., np.ndarray] | None,
+    image: np.ndarray,
+    encoding_params: Dict[str, Any] = {},
+    cache: PreparedImageCache | None = None,
+) -> np.ndarray:
+    """Run the encoding's preparation stage, if it declares one."""
+    if prepare_function is None:
+        return image
+    if cache is not None:
+        return cache.prepare(prepare_function, image, encoding_params)
+    return prepare_function(image, **encoding_params)
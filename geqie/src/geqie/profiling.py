@@ -0,0 +1,131 @@
+"""Profiles of whole CLI runs: cProfile statistics, top allocations and collapsed stacks for flame graphs."""
+
+import contextlib
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Dict, Iterator
+
+# Number of allocation sites written to the allocation report
+TOP_ALLOCATIONS = 50
+
+# Interval between two samples of the collapsed stacks, in seconds
+SAMPLING_INTERVAL = 0.005
+
+
+def profile_paths(path: str | Path, command: str = "geqie") -> Dict[str, Path]:
+    """
+    Files a profile is written to, all sharing the prefix `path`.
+
+    When `path` is a directory, the prefix is named after the command and the process ID
+    within it, so that concurrent runs, e.g. of GUI workers, never overwrite each other.
+    """
+    path = Path(path)
+    if path.is_dir():
+        path = path / f"{command}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    return {
+        "pstats": path.with_name(f"{path.name}.pstats"),
+        "allocations": path.with_name(f"{path.name}.allocations.txt"),
+        "collapsed": path.with_name(f"{path.name}.collapsed.txt"),
+    }
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the stack of a thread every `interval` seconds from a background thread.
+
+    `stacks` counts the samples of every stack in the collapsed format read by flame graph
+    tools such as `flamegraph.pl` or speedscope: its frames, outermost first, joined by
+    semicolons.
+    """
+
+    def __init__(self, thread_id: int | None = None, interval: float = SAMPLING_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="geqie-stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def write(self, path: str | Path):
+        with open(path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+def write_allocations(snapshot: tracemalloc.Snapshot, path: str | Path, limit: int = TOP_ALLOCATIONS):
+    """Write the `limit` source lines that allocated the most memory still alive in `snapshot`."""
+    statistics = snapshot.statistics("lineno")
+    with open(path, "w") as file:
+        file.write(f"Top {min(limit, len(statistics))} of {len(statistics)} allocation sites by size\n")
+        for statistic in statistics[:limit]:
+            frame = statistic.traceback[0]
+            file.write(f"{statistic.size / 2**10:12.1f} KiB {statistic.count:9d} blocks  {frame.filename}:{frame.lineno}\n")
+        _, peak = tracemalloc.get_traced_memory()
+        file.write(f"Peak traced memory: {peak / 2**20:.1f} MiB\n")
+
+
+@contextlib.contextmanager
+def profile(path: str | Path, command: str = "geqie", collapsed: bool = False) -> Iterator[Dict[str, Path]]:
+    """
+    Profile the enclosed block, writing the files of `profile_paths` once it ends.
+
+    The `.pstats` file holds cProfile statistics, readable with `pstats` or `snakeviz`.
+    The `.allocations.txt` report lists the top allocation sites traced by `tracemalloc`
+    at the end of the block, along with the peak traced memory. With `collapsed`, the
+    stacks sampled by a `StackSampler` are written to `.collapsed.txt` as well.
+    Both the profiler and the allocation tracing slow the profiled code down.
+    """
+    paths = profile_paths(path, command)
+    paths["pstats"].parent.mkdir(parents=True, exist_ok=True)
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    sampler = StackSampler() if collapsed else None
+    if sampler is not None:
+        sampler.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield paths
+    finally:
+        profiler.disable()
+        # Taken first, so that the report leaves out what writing the profile allocates
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, cProfile.__file__)])
+        if sampler is not None:
+            sampler.stop()
+            sampler.write(paths["collapsed"])
+        profiler.dump_stats(paths["pstats"])
+        write_allocations(snapshot, paths["allocations"])
+        if started_tracing:
+            tracemalloc.stop()
+        print(f"Profile written to '{paths['pstats'].with_suffix('')}.*'", file=sys.stderr)
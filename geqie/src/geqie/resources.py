@@ -0,0 +1,303 @@
+"""Resource estimates of encoding, synthesizing and simulating an image, computed without doing any of it."""
+
+import functools
+import importlib
+
+from dataclasses import asdict, dataclass
+from types import ModuleType
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from qiskit import transpile
+from qiskit.circuit import QuantumCircuit
+
+from geqie.encodings import EncodingMetadata, optional_functions
+from geqie.planner import BYTES_PER_AMPLITUDE, available_memory
+from geqie.preparation import prepare_image
+from geqie.synthesis import product_structure, repeated_positions
+
+TARGETS = ("aer", "hardware")
+ANGLE_BYTES = np.dtype(np.float64).itemsize
+STATE_BYTES = np.dtype(np.int64).itemsize
+# Measured size of a multi-controlled X appended to a QuantumCircuit
+INSTRUCTION_BYTES = 256
+
+
+@dataclass
+class ResourceEstimate:
+    """
+    Resources of an encoded image, in bytes for memory.
+
+    `depth` and `two_qubit_gates` describe the circuit after synthesis for the `target`:
+    Aer runs state preparations and uniformly controlled or dense unitaries natively,
+    while hardware runs them decomposed into CX and single-qubit gates. Fields that cannot
+    be known from what was estimated are None.
+    """
+    target: str
+    num_qubits: int
+    position_qubits: int | None
+    color_qubits: int | None
+    encode_memory: int | None
+    unitary_memory: int
+    simulation_memory: int
+    depth: int
+    two_qubit_gates: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def state_preparation_cx(num_qubits: int) -> int:
+    """CX count of preparing an arbitrary state with uniformly controlled RY and RZ rotations."""
+    return max(2**(num_qubits + 1) - 4, 0)
+
+
+def uniformly_controlled_cx(num_controls: int) -> int:
+    """CX count of a uniformly controlled single-qubit rotation with `num_controls` controls."""
+    return 2**num_controls if num_controls else 0
+
+
+def unitary_cx(num_qubits: int) -> int:
+    """CX count of an arbitrary unitary from the quantum Shannon decomposition."""
+    if num_qubits < 2:
+        return 0
+    return int(np.ceil(23 / 48 * 4**num_qubits - 3 / 2 * 2**num_qubits + 4 / 3))
+
+
+@functools.lru_cache
+def multi_controlled_x(num_controls: int) -> Tuple[int, int]:
+    """CX count and depth of a multi-controlled X with `num_controls` controls, as Qiskit synthesizes it without ancillas."""
+    circuit = QuantumCircuit(num_controls + 1)
+    circuit.mcx(list(range(num_controls)), num_controls)
+    synthesized = transpile(circuit, basis_gates=["cx", "u"], optimization_level=0)
+    return synthesized.count_ops().get("cx", 0), synthesized.depth()
+
+
+def _import_encoding(encoding: str | ModuleType) -> ModuleType:
+    if isinstance(encoding, ModuleType):
+        return encoding
+    return importlib.import_module(f"geqie.encodings.{encoding}")
+
+
+def _metadata(encoding: ModuleType, encoding_params: Dict[str, Any]) -> EncodingMetadata | None:
+    if hasattr(encoding, "metadata_function"):
+        return encoding.metadata_function(**encoding_params)
+    return None
+
+
+def rotation_layout(encoding: str | ModuleType, encoding_params: Dict[str, Any] = {}) -> str | None:
+    """Layout of the rotations `encode` synthesizes the encoding from, or None when it synthesizes its operator."""
+    encoding = _import_encoding(encoding)
+    if not (hasattr(encoding, "batch_data_function") and hasattr(encoding, "batch_angle_function")):
+        return None
+    metadata = _metadata(encoding, encoding_params)
+    return metadata.rotations if metadata is not None else "labelled"
+
+
+def basis_layout(encoding: str | ModuleType, encoding_params: Dict[str, Any] = {}) -> EncodingMetadata | None:
+    """Metadata of a basis encoding `encode` synthesizes from ESOP covers, or None when it is not one."""
+    encoding = _import_encoding(encoding)
+    if not (hasattr(encoding, "batch_data_function") and hasattr(encoding, "batch_basis_function")):
+        return None
+    return _metadata(encoding, encoding_params)
+
+
+def shared_positions(
+    encoding: str | ModuleType,
+    image_shape: Tuple[int, ...],
+    encoding_params: Dict[str, Any] = {},
+    image_dimensionality: int = 2,
+) -> bool:
+    """
+    Whether pixels of an image of the given shape share basis positions, making `encode`
+    fall back from rotations or ESOP covers to the operator. The positions are probed on
+    a blank image, since batch data functions place pixels by their coordinates only.
+    """
+    encoding = _import_encoding(encoding)
+    if not hasattr(encoding, "batch_data_function"):
+        return False
+    R = int(np.ceil(np.log2(max(image_shape[:image_dimensionality]))))
+    blank = prepare_image(getattr(encoding, "prepare_function", None), np.zeros(image_shape, dtype=np.uint8), encoding_params)
+    indices = encoding.batch_data_function(blank, R=R, **encoding_params)
+    return repeated_positions(indices)
+
+
+def structured_init(
+    encoding: str | ModuleType,
+    n_color_qubits: int,
+    encoding_params: Dict[str, Any] = {},
+    image_dimensionality: int = 2,
+) -> bool:
+    """
+    Whether `encode` prepares the initial state of the encoding with H and X gates only.
+
+    The structure is probed on the initial state of the smallest register, one position
+    qubit per image axis, since init functions build their states from a fixed pattern.
+    """
+    encoding = _import_encoding(encoding)
+    init_state = encoding.init_function(n_color_qubits + image_dimensionality, **encoding_params)
+    return product_structure(np.asarray(init_state)) is not None
+
+
+def color_qubits(
+    encoding: str | ModuleType,
+    image_shape: Tuple[int, ...],
+    encoding_params: Dict[str, Any] = {},
+    image_dimensionality: int = 2,
+) -> int:
+    """Number of color qubits from the metadata of the encoding, or probed on a blank 2-pixel-sided image."""
+    encoding = _import_encoding(encoding)
+    metadata = _metadata(encoding, encoding_params)
+    if metadata is not None:
+        return metadata.color_qubits
+
+    # Imported here, since tiling depends on the encode entry points of geqie.main
+    from geqie.tiling import color_qubits as probe_color_qubits
+
+    blank = np.zeros((2,) * image_dimensionality + tuple(image_shape[image_dimensionality:]), dtype=np.uint8)
+    return probe_color_qubits(
+        encoding.data_function,
+        encoding.map_function,
+        blank,
+        image_dimensionality=image_dimensionality,
+        encoding_params=encoding_params,
+        **optional_functions(encoding),
+    )
+
+
+def estimate(
+    encoding: str | ModuleType,
+    image_shape: Tuple[int, ...],
+    encoding_params: Dict[str, Any] = {},
+    target: str = "aer",
+    image_dimensionality: int = 2,
+    perform_measurement: bool = True,
+) -> ResourceEstimate:
+    """
+    Estimate the resources of encoding an image of the given shape, without building any operator.
+
+    `encoding` is an encoding module or the name of a bundled one. The encode memory covers the
+    blocks of G and of its unitarization, the initial state and, for encodings with more than
+    one color qubit, the dense unitary placed in the circuit. Angle encodings are instead
+    synthesized from uniformly controlled rotations, whose angles are all the encode memory
+    they need. Basis encodings are synthesized from multi-controlled X gates, bounded by one
+    per position and label minterm and per color qubit; their gates, depth and memory are
+    upper bounds, reached by no image. Either falls back to the operator model when pixels
+    share basis positions, as `encode` does. The simulation memory is the one of a
+    statevector simulation.
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Unknown target '{target}'. Use 'aer' or 'hardware'.")
+
+    shape = tuple(image_shape[:image_dimensionality])
+    R = int(np.ceil(np.log2(max(shape))))
+    position_qubits = image_dimensionality * R
+    n_color_qubits = color_qubits(encoding, image_shape, encoding_params, image_dimensionality)
+    num_qubits = position_qubits + n_color_qubits
+
+    block_dim = 2**n_color_qubits
+    unitary_memory = BYTES_PER_AMPLITUDE * 4**num_qubits
+    rotations = rotation_layout(encoding, encoding_params)
+    basis = basis_layout(encoding, encoding_params)
+    if (rotations is not None or basis is not None) and shared_positions(encoding, image_shape, encoding_params, image_dimensionality):
+        rotations, basis = None, None
+
+    if rotations is not None:
+        # Labelled rotations target one qubit under every label, per-qubit ones every color qubit
+        label_qubits = n_color_qubits - 1 if rotations == "labelled" else 0
+        multiplexers = 1 if rotations == "labelled" else n_color_qubits
+        encode_memory = ANGLE_BYTES * 2**(position_qubits + label_qubits) * multiplexers
+        if target == "aer":
+            depth, two_qubit_gates = 1 + int(label_qubits > 0) + multiplexers, 0
+        else:
+            two_qubit_gates = state_preparation_cx(label_qubits) + multiplexers * uniformly_controlled_cx(position_qubits + label_qubits)
+            # RY gates and CNOTs alternate on the rotated qubits, after the Hadamard layer
+            depth = 2 * two_qubit_gates + 1
+    elif basis is not None:
+        # Every cover of a flipped color qubit has at most one cube per position and label minterm
+        label_qubits = len(basis.label_qubits)
+        minterms = 2**(position_qubits + label_qubits)
+        gates = (n_color_qubits - label_qubits) * minterms
+        encode_memory = STATE_BYTES * minterms * (1 + 2 * (n_color_qubits - label_qubits)) + INSTRUCTION_BYTES * gates
+        if target == "aer":
+            # X layers flip the negative literals around every gate
+            depth, two_qubit_gates = 1 + int(label_qubits > 0) + 3 * gates, gates
+        else:
+            gate_cx, gate_depth = multi_controlled_x(position_qubits + label_qubits)
+            label_cx = state_preparation_cx(label_qubits)
+            two_qubit_gates = label_cx + gates * gate_cx
+            depth = 2 * label_cx + 1 + gates * (gate_depth + 2)
+    else:
+        encode_memory = BYTES_PER_AMPLITUDE * (2 * 2**position_qubits * block_dim**2 + 2**num_qubits)
+        if block_dim > 2:
+            encode_memory += unitary_memory
+        if target == "aer":
+            depth, two_qubit_gates = 2, 0
+        else:
+            if block_dim == 2:
+                operator_cx = uniformly_controlled_cx(position_qubits)
+            else:
+                operator_cx = unitary_cx(num_qubits)
+            init_cx = 0 if structured_init(encoding, n_color_qubits, encoding_params, image_dimensionality) else state_preparation_cx(num_qubits)
+            two_qubit_gates = init_cx + operator_cx
+            # Both stages act on a shared target qubit, so their CX gates hardly run in parallel
+            depth = 2 * two_qubit_gates + 1
+
+    return ResourceEstimate(
+        target=target,
+        num_qubits=num_qubits,
+        position_qubits=position_qubits,
+        color_qubits=n_color_qubits,
+        encode_memory=int(encode_memory),
+        unitary_memory=int(unitary_memory),
+        simulation_memory=int(BYTES_PER_AMPLITUDE * 2**num_qubits),
+        depth=depth + int(perform_measurement),
+        two_qubit_gates=two_qubit_gates,
+    )
+
+
+def circuit_resources(circuit: QuantumCircuit, target: str = "hardware") -> ResourceEstimate:
+    """Resources of an already synthesized circuit, e.g. one transpiled for a backend."""
+    return ResourceEstimate(
+        target=target,
+        num_qubits=circuit.num_qubits,
+        position_qubits=None,
+        color_qubits=None,
+        encode_memory=None,
+        unitary_memory=int(BYTES_PER_AMPLITUDE * 4**circuit.num_qubits),
+        simulation_memory=int(BYTES_PER_AMPLITUDE * 2**circuit.num_qubits),
+        depth=circuit.depth(),
+        two_qubit_gates=sum(1 for instruction in circuit.data if instruction.operation.num_qubits == 2),
+    )
+
+
+def max_image_size(
+    encoding: str | ModuleType,
+    memory_budget: int | None = None,
+    encoding_params: Dict[str, Any] = {},
+    image_dimensionality: int = 2,
+    channels: Tuple[int, ...] = (),
+) -> int:
+    """
+    Largest power-of-two image side whose encode and simulation memory both fit the budget.
+
+    This is the per-encoding counterpart of a single static image-size limit. The budget
+    defaults to the available memory. Returns 0 when not even a 2-pixel side fits.
+    """
+    memory_budget = memory_budget if memory_budget is not None else available_memory()
+
+    n_color_qubits = color_qubits(encoding, (2,) * image_dimensionality + tuple(channels), encoding_params, image_dimensionality)
+
+    def fits(size: int) -> bool:
+        # Ruled out by the statevector first, before probing the pixel positions of a larger image
+        num_qubits = image_dimensionality * int(np.log2(size)) + n_color_qubits
+        if BYTES_PER_AMPLITUDE * 2**num_qubits > memory_budget:
+            return False
+        resources = estimate(encoding, (size,) * image_dimensionality + tuple(channels), encoding_params, image_dimensionality=image_dimensionality)
+        return max(resources.encode_memory, resources.simulation_memory) <= memory_budget
+
+    size = 0
+    while fits(2 * max(size, 1)):
+        size = 2 * max(size, 1)
+    return size
@@ -0,0 +1,74 @@
+"""Shot sampling from exact output probabilities."""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from geqie.counts import DenseCounts
+
+
+def sample_counts(probabilities: np.ndarray, n_shots: int, seed: int | np.random.Generator | None = None) -> np.ndarray:
+    """Draw `n_shots` measurement outcomes in a single multinomial sample, returning counts per basis state."""
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    probabilities = probabilities / probabilities.sum()
+    return np.random.default_rng(seed).multinomial(n_shots, probabilities)
+
+
+def counts_to_dict(counts: np.ndarray, n_qubits: int, return_padded_counts: bool = False) -> Dict[str, int]:
+    """Convert counts indexed by basis state into qiskit-style `{bitstring: count}` counts."""
+    return DenseCounts(counts, n_qubits).to_dict(padded=return_padded_counts)
+
+
+def pad_counts(counts: Dict[str, int], n_qubits: int) -> Dict[str, int]:
+    """Add zero counts for all basis states missing from qiskit-style counts."""
+    counts_padded = {f"{n:0{n_qubits}b}": 0 for n in range(2**n_qubits)}
+    return {**counts_padded, **counts}
+
+
+def format_counts(
+    counts: Dict[str, int],
+    n_qubits: int,
+    return_padded_counts: bool = False,
+    return_dense_counts: bool = False,
+) -> Dict[str, int] | DenseCounts:
+    """Qiskit-style counts in the requested output form, dense counts being always complete."""
+    if return_dense_counts:
+        return DenseCounts.from_dict(counts, n_qubits)
+    if return_padded_counts:
+        return pad_counts(counts, n_qubits)
+    return counts
+
+
+def stack_probabilities(probabilities: Sequence[np.ndarray]) -> np.ndarray | List[np.ndarray]:
+    """Probability vectors as the rows of a 2-D array, or as a list when their circuits differ in qubit count."""
+    if len({np.shape(row) for row in probabilities}) != 1:
+        return list(probabilities)
+    return np.stack(probabilities)
+
+
+def sample_results(
+    probabilities: np.ndarray | Sequence[np.ndarray],
+    n_shots: int | Sequence[int],
+    seed: int | np.random.Generator | None = None,
+    return_padded_counts: bool = False,
+    return_dense_counts: bool = False,
+) -> List[Dict[str, int] | DenseCounts] | List[List[Dict[str, int] | DenseCounts]]:
+    """
+    Counts of every row of a 2-D array of exact output probabilities, or of every vector of
+    a sequence, whose lengths give the number of qubits of each.
+
+    A sequence of `n_shots` draws one counts dict per shot count from the same
+    probabilities, so sweeping the number of shots costs no additional simulation.
+    """
+    rng = np.random.default_rng(seed)
+
+    def _draw(row: np.ndarray, shots: int) -> Dict[str, int] | DenseCounts:
+        n_qubits = int(np.log2(len(row)))
+        counts = sample_counts(row, shots, seed=rng)
+        if return_dense_counts:
+            return DenseCounts(counts, n_qubits)
+        return counts_to_dict(counts, n_qubits, return_padded_counts)
+
+    if np.ndim(n_shots):
+        return [[_draw(row, shots) for shots in n_shots] for row in probabilities]
+    return [_draw(row, n_shots) for row in probabilities]
@@ -0,0 +1,287 @@
+"""Long-lived encoding and simulation context for workers processing streams of images."""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from qiskit.circuit import QuantumCircuit
+from qiskit.quantum_info import Operator, Statevector
+from qiskit.result import Result
+from qiskit_aer import AerSimulator
+from qiskit_aer.noise import NoiseModel
+
+import geqie.main as main
+from geqie.backends.aer import get_aer_simulator, prepare_circuit, probability_circuit, result_counts, result_probabilities, structural_key
+from geqie.cache import DEFAULT_CACHE_MAX_SIZE
+from geqie.planner import SimulationPlan, plan_simulation
+from geqie.preparation import PreparedImageCache
+from geqie.counts import DenseCounts
+from geqie.sampling import sample_results, stack_probabilities
+from geqie.templates import EncodingTemplate
+
+
+class Session:
+    """
+    Reusable context for encoding and simulating many images.
+
+    Simulators are created once per (device, method, noise model). Circuits prepared for a
+    simulator, i.e. with their state preparations lowered and transpiled when needed, are
+    kept in an LRU cache of `max_circuits` entries keyed by their structural hash. A
+    parameterized circuit such as `EncodingTemplate.circuit` is therefore prepared once
+    and bound to the values of every new image at run time.
+    """
+
+    def __init__(
+        self,
+        device: str = "CPU",
+        method: str = "automatic",
+        noise_model: NoiseModel | None = None,
+        max_circuits: int = 128,
+        cache_dir: str | None = None,
+        cache_max_size: int = DEFAULT_CACHE_MAX_SIZE,
+        logging_level: int | None = None,
+    ):
+        self.device = device
+        self.method = method
+        self.noise_model = noise_model
+        self.max_circuits = max_circuits
+        self.cache_dir = cache_dir
+        self.cache_max_size = cache_max_size
+        self.logging_level = logging_level
+        self.prepare_cache = PreparedImageCache()
+        self.hits = 0
+        self.misses = 0
+        # Noise models are kept alongside their simulators so that their ids stay unique
+        self._simulators: Dict[Tuple, Tuple[AerSimulator, NoiseModel | None]] = {}
+        self._circuits: OrderedDict[Tuple, QuantumCircuit] = OrderedDict()
+        self._templates: Dict[Tuple, EncodingTemplate] = {}
+
+    def simulator(
+        self,
+        device: str | None = None,
+        method: str | None = None,
+        noise_model: NoiseModel | None = None,
+    ) -> AerSimulator:
+        """Simulator for the given options, falling back to the session defaults."""
+        device = device or self.device
+        method = method or self.method
+        noise_model = noise_model if noise_model is not None else self.noise_model
+
+        key = (device, method, id(noise_model))
+        if key not in self._simulators:
+            self._simulators[key] = (get_aer_simulator(device, method, noise_model=noise_model), noise_model)
+        return self._simulators[key][0]
+
+    def prepare(self, circuit: QuantumCircuit, simulator: AerSimulator) -> QuantumCircuit:
+        """Circuit ready to run on the simulator, from the LRU cache when its structure was seen before."""
+        key = (id(simulator), structural_key(circuit))
+        if key in self._circuits:
+            self.hits += 1
+            self._circuits.move_to_end(key)
+            return self._circuits[key]
+
+        self.misses += 1
+        prepared = prepare_circuit(circuit, simulator)
+        self._circuits[key] = prepared
+        while len(self._circuits) > self.max_circuits:
+            self._circuits.popitem(last=False)
+        return prepared
+
+    def encode(
+        self,
+        init_function: Callable[..., Statevector],
+        data_function: Callable[..., Statevector],
+        map_function: Callable[..., Operator],
+        image: np.ndarray,
+        **encode_kwargs: Any,
+    ) -> QuantumCircuit:
+        """`geqie.encode` sharing the prepared-image cache and the on-disk cache settings of the session."""
+        kwargs = {
+            "prepare_cache": self.prepare_cache,
+            "cache_dir": self.cache_dir,
+            "cache_max_size": self.cache_max_size,
+            "logging_level": self.logging_level,
+            **encode_kwargs,
+        }
+        return main.encode(init_function, data_function, map_function, image, **kwargs)
+
+    def encode_template(
+        self,
+        init_function: Callable[..., Statevector],
+        data_function: Callable[..., Statevector],
+        map_function: Callable[..., Operator],
+        image: np.ndarray,
+        **encode_kwargs: Any,
+    ) -> EncodingTemplate:
+        """`geqie.encode_template`, built once per encoding, image shape and parameters."""
+        image_dimensionality = encode_kwargs.get("image_dimensionality", 2)
+        key = (
+            init_function, data_function, map_function,
+            image.shape[:image_dimensionality],
+            encode_kwargs.get("perform_measurement", True),
+            repr(sorted(encode_kwargs.get("encoding_params", {}).items())),
+        )
+        if key not in self._templates:
+            self._templates[key] = main.encode_template(init_function, data_function, map_function, image, **encode_kwargs)
+        return self._templates[key]
+
+    def simulate(
+        self,
+        circuit: QuantumCircuit | Statevector | np.ndarray,
+        n_shots: int | Sequence[int],
+        return_qiskit_result: bool = False,
+        return_padded_counts: bool = False,
+        device: str | None = None,
+        method: str | None = None,
+        noise_model: NoiseModel | None = None,
+        engine: str = "aer",
+        seed: int | None = None,
+        analytic: bool = False,
+        return_probabilities: bool = False,
+        return_dense_counts: bool = False,
+        parameter_values: np.ndarray | None = None,
+        memory_budget: int | None = None,
+        dry_run: bool = False,
+        **_: Dict[Any, Any],
+    ) -> Result | Dict[str, int] | DenseCounts | List[Dict[str, int] | DenseCounts] | np.ndarray | SimulationPlan:
+        """
+        `geqie.simulate` on the simulators and prepared circuits of the session, planned
+        and refused alike.
+
+        `parameter_values` binds a parameterized circuit in the order of its parameters, e.g.
+        to `EncodingTemplate.bind(image)`. A 2-D array runs one experiment per row and
+        returns a list of counts, or of probability vectors.
+        """
+        analytic = analytic or return_probabilities
+        if engine != "aer" or (np.ndim(n_shots) and not analytic):
+            return main.simulate(
+                circuit,
+                n_shots,
+                return_qiskit_result=return_qiskit_result,
+                return_padded_counts=return_padded_counts,
+                noise_model=noise_model if noise_model is not None else self.noise_model,
+                engine=engine,
+                seed=seed,
+                return_probabilities=return_probabilities,
+                return_dense_counts=return_dense_counts,
+                device=device or self.device,
+                method=method or self.method,
+                memory_budget=memory_budget,
+                dry_run=dry_run,
+                logging_level=self.logging_level,
+            )
+
+        noise_model = noise_model if noise_model is not None else self.noise_model
+        plan = plan_simulation(circuit, n_shots, noise_model, method or self.method, memory_budget, analytic)
+        if dry_run:
+            return plan
+
+        simulator = self.simulator(device, plan.method, noise_model)
+        if analytic:
+            if simulator.options.noise_model is not None:
+                raise ValueError("Analytic sampling only supports noiseless simulations.")
+            circuit = probability_circuit(circuit)
+        prepared = self.prepare(circuit, simulator)
+
+        run_options = {} if seed is None else {"seed_simulator": seed}
+        batch = False
+        if parameter_values is not None:
+            values = np.asarray(parameter_values, dtype=np.float64)
+            batch = values.ndim == 2
+            values = np.atleast_2d(values)
+            # Bind positionally, since a cached circuit may hold equally named parameters of another template
+            run_options["parameter_binds"] = [{parameter: values[:, i] for i, parameter in enumerate(prepared.parameters)}]
+
+        result = simulator.run(prepared, shots=1 if analytic else n_shots, memory=return_qiskit_result and not analytic, **run_options).result()
+        if return_qiskit_result:
+            return result
+
+        if analytic:
+            probabilities = result_probabilities(result)
+            if return_probabilities:
+                probabilities = stack_probabilities(probabilities)
+            else:
+                probabilities = sample_results(probabilities, n_shots, seed, return_padded_counts, return_dense_counts)
+            return probabilities if batch else probabilities[0]
+
+        counts = [
+            result_counts(result, i, circuit.num_qubits, return_padded_counts, return_dense_counts)
+            for i in range(len(result.results))
+        ]
+        return counts if batch else counts[0]
+
+    def simulate_many(
+        self,
+        circuits: Sequence[QuantumCircuit],
+        n_shots: int,
+        return_qiskit_result: bool = False,
+        return_padded_counts: bool = False,
+        device: str | None = None,
+        method: str | None = None,
+        noise_model: NoiseModel | None = None,
+        engine: str = "aer",
+        seed: int | None = None,
+        max_parallel_experiments: int = 0,
+        max_parallel_threads: int = 0,
+        analytic: bool = False,
+        return_probabilities: bool = False,
+        return_dense_counts: bool = False,
+        memory_budget: int | None = None,
+        dry_run: bool = False,
+        **_: Dict[Any, Any],
+    ) -> Result | List[Dict[str, int] | DenseCounts] | np.ndarray | List[np.ndarray] | SimulationPlan:
+        """`geqie.simulate_many` on the simulators and prepared circuits of the session."""
+        if engine != "aer":
+            return main.simulate_many(
+                circuits,
+                n_shots,
+                return_qiskit_result=return_qiskit_result,
+                return_padded_counts=return_padded_counts,
+                noise_model=noise_model if noise_model is not None else self.noise_model,
+                engine=engine,
+                seed=seed,
+                return_probabilities=return_probabilities,
+                return_dense_counts=return_dense_counts,
+                device=device or self.device,
+                method=method or self.method,
+                dry_run=dry_run,
+                logging_level=self.logging_level,
+            )
+
+        analytic = analytic or return_probabilities
+        noise_model = noise_model if noise_model is not None else self.noise_model
+        largest = max(circuits, key=lambda circuit: circuit.num_qubits)
+        plan = plan_simulation(largest, n_shots, noise_model, method or self.method, memory_budget, analytic)
+        if dry_run:
+            return plan
+
+        simulator = self.simulator(device, plan.method, noise_model)
+        if analytic:
+            if simulator.options.noise_model is not None:
+                raise ValueError("Analytic sampling only supports noiseless simulations.")
+            circuits = [probability_circuit(circuit) for circuit in circuits]
+        prepared = [self.prepare(circuit, simulator) for circuit in circuits]
+
+        run_options = {} if seed is None else {"seed_simulator": seed}
+        result = simulator.run(
+            prepared,
+            shots=1 if analytic else n_shots,
+            memory=return_qiskit_result and not analytic,
+            max_parallel_experiments=max_parallel_experiments,
+            max_parallel_threads=max_parallel_threads,
+            **run_options,
+        ).result()
+        if return_qiskit_result:
+            return result
+
+        if analytic:
+            probabilities = result_probabilities(result)
+            if return_probabilities:
+                return stack_probabilities(probabilities)
+            return sample_results(probabilities, n_shots, seed, return_padded_counts, return_dense_counts)
+
+        return [
+            result_counts(result, index, circuit.num_qubits, return_padded_counts, return_dense_counts)
+            for index, circuit in enumerate(circuits)
+        ]
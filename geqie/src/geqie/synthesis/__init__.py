@@ -0,0 +1,6 @@
+"""Circuit synthesis for assembled GEQIE operators."""
+
+from .builder import SYNTHESIS_METHODS, build_basis_circuit, build_circuit, build_rotation_circuit, init_instructions, operator_instruction, product_structure, region_metadata, repeated_positions, rotation_angles, superposition_circuit, superposition_init
+from .esop import esop_circuit, esop_cover
+from .quadtree import QuadtreeRYGate, labelled_quadtree_cubes, quadtree_cubes
+from .ucr import MultiplexedRYGate, ucry, ucry_angles
@@ -0,0 +1,281 @@
+from typing import Any, Dict, Sequence, Tuple
+
+import numpy as np
+
+from qiskit.circuit import Instruction, QuantumCircuit
+from qiskit.circuit.library import UCGate, UnitaryGate
+from qiskit.quantum_info import Statevector
+
+from geqie.assembly import BlockDiagonalOperator
+from geqie.synthesis.esop import esop_circuit, esop_cover
+from geqie.synthesis.quadtree import QuadtreeRYGate, labelled_quadtree_cubes
+from geqie.synthesis.ucr import MultiplexedRYGate
+
+from geqie.encodings import ROTATION_LAYOUTS
+
+# "ucr" builds angle encodings from uniformly controlled rotations, "esop" builds basis
+# encodings from multi-controlled X gates, "quadtree" builds either from one controlled gate
+# per uniform block of the image, "operator" builds any encoding from its unitarized operator,
+# and "auto" picks "ucr" or "esop" whenever the encoding supports them
+SYNTHESIS_METHODS = ("auto", "ucr", "esop", "quadtree", "operator")
+
+
+def operator_instruction(U: BlockDiagonalOperator | np.ndarray) -> Instruction:
+    """
+    Convert a unitary into a circuit instruction acting on all qubits.
+
+    Block-diagonal unitaries with single-qubit blocks become a uniformly controlled
+    gate (``UCGate``) targeting qubit 0 and controlled by the position register, which
+    Aer simulates natively without a dense matrix. Larger blocks are placed in a dense
+    ``UnitaryGate`` without any global factorization. Control simplification of the
+    ``UCGate`` is disabled, since Aer's multiplexer expects one block per control state.
+    """
+    if isinstance(U, BlockDiagonalOperator):
+        if U.block_dim == 2:
+            return UCGate(list(U.blocks), mux_simp=False)
+        U = U.to_matrix()
+    return UnitaryGate(U, check_input=False)
+
+
+def product_structure(state: np.ndarray, atol: float = 1e-10) -> Tuple[int, int, float] | None:
+    """
+    Recognize a product of |+> states on some qubits and basis states on the others.
+
+    Such a state is a uniform superposition of the basis states `base ^ s`, for every `s`
+    whose bits lie within `mask`, and the check takes a single pass over the amplitudes.
+    Returns `(mask, base, phase)` with the global phase of the amplitudes, or None for
+    any other state.
+    """
+    state = np.asarray(state)
+    magnitudes = np.abs(state)
+    support = np.flatnonzero(magnitudes > atol * magnitudes.max())
+    mask = int(np.bitwise_or.reduce(support ^ support[0]))
+    if len(support) != 2**mask.bit_count():
+        return None
+    amplitudes = state[support]
+    if not np.allclose(amplitudes, amplitudes[0], atol=atol * magnitudes.max()):
+        return None
+    return mask, int(support[0]) & ~mask, float(np.angle(amplitudes[0]))
+
+
+def init_instructions(circuit: QuantumCircuit, init_state: Statevector) -> QuantumCircuit:
+    """
+    Prepare the initial state on all qubits of a circuit.
+
+    Product states of |+> and basis states, like those of all bundled encodings, are
+    prepared by H and X gates. Other states fall back to a generic state preparation,
+    whose synthesis grows exponentially with the number of qubits.
+    """
+    structure = product_structure(init_state.data)
+    if structure is None:
+        circuit.prepare_state(init_state, range(circuit.num_qubits), normalize=True)
+        return circuit
+
+    mask, base, phase = structure
+    flipped = [qubit for qubit in range(circuit.num_qubits) if base >> qubit & 1]
+    superposed = [qubit for qubit in range(circuit.num_qubits) if mask >> qubit & 1]
+    if flipped:
+        circuit.x(flipped)
+    if superposed:
+        circuit.h(superposed)
+    circuit.global_phase += phase
+    return circuit
+
+
+def build_circuit(
+    init_state: Statevector,
+    U: BlockDiagonalOperator | np.ndarray,
+    perform_measurement: bool = True,
+) -> QuantumCircuit:
+    n_qubits = init_state.num_qubits
+
+    circuit = QuantumCircuit(n_qubits)
+    init_instructions(circuit, init_state)
+    circuit.append(operator_instruction(U), range(n_qubits))
+    if perform_measurement:
+        circuit.measure_all()
+
+    return circuit
+
+
+def superposition_circuit(
+    num_qubits: int,
+    position_qubits: int,
+    num_labels: int = 1,
+    label_qubits: Sequence[int] | None = None,
+) -> QuantumCircuit:
+    """
+    Hadamards on the position register, the upper `position_qubits` qubits, and a uniform
+    superposition of the first `num_labels` values of the channel labels held by
+    `label_qubits`, by default qubits `1..ceil(log2(num_labels))`.
+    """
+    if label_qubits is None:
+        label_qubits = range(1, int(np.ceil(np.log2(num_labels))) + 1)
+    label_qubits = list(label_qubits)
+
+    circuit = QuantumCircuit(num_qubits)
+    circuit.h(range(num_qubits - position_qubits, num_qubits))
+    if num_labels == 2**len(label_qubits):
+        if label_qubits:
+            circuit.h(label_qubits)
+    else:
+        label_state = np.zeros(2**len(label_qubits))
+        label_state[:num_labels] = 1
+        circuit.prepare_state(Statevector(label_state / np.linalg.norm(label_state)), label_qubits)
+    return circuit
+
+
+def superposition_init(init_state: np.ndarray, position_qubits: int, label_qubits: Sequence[int] = ()) -> bool:
+    """
+    Whether an initial state is the one `superposition_circuit` stands for: a uniform
+    superposition of the positions held by the top `position_qubits` qubits, with the color
+    qubits in |0> but for superpositions of the `label_qubits`, which the circuits prepare
+    from the labels themselves.
+    """
+    state = np.asarray(init_state)
+    structure = product_structure(state)
+    if structure is None:
+        return False
+    mask, base, _ = structure
+    color_qubits = int(np.log2(len(state))) - position_qubits
+    positions = (2**position_qubits - 1) << color_qubits
+    labels = sum(1 << qubit for qubit in label_qubits)
+    return base == 0 and mask & positions == positions and mask & ~positions & ~labels == 0
+
+
+def repeated_positions(indices: np.ndarray) -> bool:
+    """Whether pixels share any of the basis positions `indices`, counted in a single pass."""
+    indices = np.ravel(indices)
+    return indices.size > 0 and np.bincount(indices).max() > 1
+
+
+def rotation_angles(indices: np.ndarray, angles: np.ndarray, num_positions: int) -> np.ndarray:
+    """
+    RY angles of every position, shape `(num_positions, L)`, from the `batch_angle_function`
+    angles of the pixels at the basis positions `indices`.
+
+    `ry_gates(p)` of the map blocks is a qiskit RY gate of angle `2p`. Positions outside a
+    non-square image keep the angle 0.
+
+    Raises:
+        ValueError: If pixels share a position, whose map blocks the operator would add up.
+    """
+    if repeated_positions(indices):
+        raise ValueError("Rotation angles require every pixel at a distinct basis position")
+    angles = np.asarray(angles).reshape(len(indices), -1)
+    ry_angles = np.zeros((num_positions, angles.shape[1]))
+    ry_angles[indices] = 2 * angles
+    return ry_angles
+
+
+def region_metadata(synthesis: str, gates: int, uncompressed_gates: int) -> Dict[str, Any]:
+    """
+    Circuit metadata on how many controlled gates a synthesis emitted, against one per
+    nonzero value of a position, label and color qubit without any merging.
+    """
+    return {
+        "synthesis": synthesis,
+        "gates": int(gates),
+        "uncompressed_gates": int(uncompressed_gates),
+        "compression": float(uncompressed_gates / gates) if gates else 1.0,
+    }
+
+
+def build_rotation_circuit(
+    ry_angles: np.ndarray,
+    rotations: str = "labelled",
+    perform_measurement: bool = True,
+    method: str = "ucr",
+    image_dimensionality: int = 2,
+) -> QuantumCircuit:
+    """
+    Build the circuit of an angle encoding from its RY angles, without any operator.
+
+    `ry_angles[m]` holds the angles of position `m`. With "labelled" rotations, qubit 0 is
+    rotated by `ry_angles[m, l]` under each of the channel labels `l` held by the qubits above
+    it. With "per_qubit" rotations, color qubit `k` is rotated by `ry_angles[m, k]`. Either
+    way the rotations are uniformly controlled by the position register, i.e. `O(N)` CNOTs.
+    With `method="quadtree"` they are instead decomposed into one multi-controlled rotation
+    per uniform block of the image, as reported in the `metadata` of the circuit.
+    """
+    num_positions, width = ry_angles.shape
+    position_qubits = int(np.log2(num_positions))
+
+    def rotation(angles: np.ndarray, label_qubits: int = 0) -> MultiplexedRYGate:
+        if method == "quadtree":
+            return QuadtreeRYGate(angles, image_dimensionality=image_dimensionality, label_qubits=label_qubits)
+        return MultiplexedRYGate(angles)
+
+    if rotations == "labelled":
+        label_qubits = int(np.ceil(np.log2(width)))
+        n_qubits = position_qubits + label_qubits + 1
+        padded = np.zeros((num_positions, 2**label_qubits))
+        padded[:, :width] = ry_angles
+
+        circuit = superposition_circuit(n_qubits, position_qubits, num_labels=width)
+        gates = [rotation(padded.reshape(-1), label_qubits)]
+        circuit.append(gates[0], range(n_qubits))
+    elif rotations == "per_qubit":
+        n_qubits = position_qubits + width
+
+        circuit = superposition_circuit(n_qubits, position_qubits)
+        gates = [rotation(ry_angles[:, qubit]) for qubit in range(width)]
+        for qubit, gate in enumerate(gates):
+            circuit.append(gate, [qubit, *range(width, n_qubits)])
+    else:
+        raise ValueError(f"Unknown rotation layout '{rotations}'. Use one of {ROTATION_LAYOUTS}.")
+
+    if method == "quadtree":
+        circuit.metadata = region_metadata(method, sum(len(gate.cubes()[0]) for gate in gates), np.count_nonzero(ry_angles))
+    if perform_measurement:
+        circuit.measure_all()
+    return circuit
+
+
+def build_basis_circuit(
+    states: np.ndarray,
+    color_qubits: int,
+    label_qubits: Sequence[int] = (),
+    perform_measurement: bool = True,
+    method: str = "esop",
+    image_dimensionality: int = 2,
+) -> QuantumCircuit:
+    """
+    Build the circuit of a basis encoding from its color basis states, without any operator.
+
+    `states[m, l]` is the basis state of the color register at position `m` under the channel
+    label `l`, whose bits are held by `label_qubits`, lowest first. After the uniform
+    superpositions of positions and labels, every other color qubit is flipped by
+    multi-controlled X gates, one per cube of a minimized ESOP cover of the positions and
+    labels at which its bit is set, or with `method="quadtree"` one per uniform block of
+    the image in which it is set. The `metadata` of the circuit reports the number of these
+    gates. Positions outside a non-square image keep the state 0.
+    """
+    num_positions, num_labels = states.shape
+    position_qubits = int(np.log2(num_positions))
+    n_qubits = position_qubits + color_qubits
+    label_qubits = list(label_qubits)
+
+    # Variables of the covers: the label bits, then the position bits
+    control_qubits = [*label_qubits, *range(color_qubits, n_qubits)]
+    padded = np.zeros((num_positions, 2**len(label_qubits)), dtype=np.int64)
+    padded[:, :num_labels] = states
+
+    circuit = superposition_circuit(n_qubits, position_qubits, num_labels, label_qubits=label_qubits)
+    gates, uncompressed_gates = 0, 0
+    for qubit in range(color_qubits):
+        if qubit in label_qubits:
+            continue
+        bits = (padded >> qubit) & 1
+        if method == "quadtree":
+            care, value, _ = labelled_quadtree_cubes(bits, len(label_qubits), image_dimensionality)
+        else:
+            care, value = esop_cover(np.flatnonzero(bits), len(control_qubits))
+        esop_circuit(circuit, care, value, control_qubits, qubit)
+        gates += len(care)
+        uncompressed_gates += np.count_nonzero(bits)
+
+    circuit.metadata = region_metadata(method, gates, uncompressed_gates)
+    if perform_measurement:
+        circuit.measure_all()
+    return circuit
@@ -0,0 +1,87 @@
+"""Exclusive-sum-of-products (ESOP) covers of Boolean functions, synthesized into multi-controlled X gates."""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from qiskit.circuit import Gate, QuantumCircuit
+from qiskit.circuit.library import XGate
+
+# Literal of a variable within a cube, as the bits of its coefficients of (x', x)
+NEGATIVE, POSITIVE, ABSENT = 0b10, 0b01, 0b11
+
+
+def _merge_variable(care: np.ndarray, value: np.ndarray, bit: int, num_variables: int) -> Tuple[np.ndarray, np.ndarray]:
+    """XOR together the cubes that only differ in the variable `bit`, which leaves at most one cube of each group."""
+    literal = np.where(care & bit, np.where(value & bit, POSITIVE, NEGATIVE), ABSENT)
+    keys = ((care & ~bit) << num_variables) | (value & ~bit)
+
+    order = np.argsort(keys, kind="stable")
+    keys, literal = keys[order], literal[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    literal = np.bitwise_xor.reduceat(literal, starts)
+    keys = keys[starts]
+
+    kept = literal != 0
+    keys, literal = keys[kept], literal[kept]
+    care, value = keys >> num_variables, keys & ((1 << num_variables) - 1)
+    care = np.where(literal == ABSENT, care, care | bit)
+    value = np.where(literal == POSITIVE, value | bit, value)
+    return care, value
+
+
+def esop_cover(minterms: np.ndarray, num_variables: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimized ESOP cover of the Boolean function of `num_variables` variables true on `minterms`.
+
+    Cube `i` is the product of the variables set in `care[i]`, negated where `value[i]` has
+    the bit cleared. Starting from the minterms, every pass XORs together the cubes that differ
+    in a single variable, which the identities `x'a ^ xa = a`, `a ^ xa = x'a` and `a ^ a = 0`
+    reduce to at most one cube, until a pass no longer shrinks the cover. Regions of equal
+    bits thereby collapse into single cubes, so the cover grows with the entropy of the
+    function rather than with its number of minterms.
+    """
+    value = np.unique(np.asarray(minterms, dtype=np.int64))
+    care = np.full(value.shape, 2**num_variables - 1, dtype=np.int64)
+
+    size = None
+    while len(value) and len(value) != size:
+        size = len(value)
+        for variable in range(num_variables):
+            care, value = _merge_variable(care, value, 1 << variable, num_variables)
+    return care, value
+
+
+def esop_circuit(
+    circuit: QuantumCircuit,
+    care: np.ndarray,
+    value: np.ndarray,
+    control_qubits: Sequence[int],
+    target: int,
+    operations: Sequence[Gate] | None = None,
+) -> QuantumCircuit:
+    """
+    Append an X on `target` controlled by every cube of an ESOP cover over `control_qubits`.
+
+    With `operations`, the single-qubit gate `operations[i]` is controlled by cube `i` instead.
+    Negative literals are realized by flipping their control qubits around the gates. Cubes
+    are visited in order of their values and flips are only undone once no longer needed,
+    which keeps the X gates between the multi-controlled ones few.
+    """
+    flipped = 0
+    for index in np.lexsort((value, care)):
+        cube_care, cube_value = int(care[index]), int(value[index])
+        toggles = (flipped ^ (cube_care & ~cube_value)) & cube_care
+        for variable in range(len(control_qubits)):
+            if toggles >> variable & 1:
+                circuit.x(control_qubits[variable])
+        flipped ^= toggles
+
+        controls = [control_qubits[variable] for variable in range(len(control_qubits)) if cube_care >> variable & 1]
+        operation = operations[index] if operations is not None else XGate()
+        circuit.append(operation.control(len(controls)) if controls else operation, [*controls, target])
+
+    for variable in range(len(control_qubits)):
+        if flipped >> variable & 1:
+            circuit.x(control_qubits[variable])
+    return circuit
@@ -0,0 +1,105 @@
+"""Quadtree (octree in 3-D) decompositions of images into uniform blocks, synthesized into controlled gates."""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from qiskit.circuit import QuantumCircuit
+from qiskit.circuit.library import RYGate
+
+from geqie.synthesis.esop import esop_circuit
+from geqie.synthesis.ucr import MultiplexedRYGate
+
+
+def quadtree_cubes(values: np.ndarray, image_dimensionality: int = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Maximal uniform blocks of the values of a position register, as cubes over its qubits.
+
+    The `2^(d R)` positions index a grid of side `2^R` in `d` dimensions in row-major order.
+    A block of side `2^s` shares the upper `R - s` bits of every coordinate, which are the
+    `care` bits of its cube, and it is maximal when it is uniform while its parent is not.
+    Returns `(care, value, block_values)`, the blocks together covering every position once.
+    """
+    values = np.asarray(values)
+    R = int(np.log2(values.size)) // image_dimensionality
+    minimum = maximum = values.reshape((2**R,) * image_dimensionality)
+
+    minima, uniform = [minimum], [np.ones(minimum.shape, dtype=bool)]
+    for level in range(1, R + 1):
+        split = (2**(R - level), 2) * image_dimensionality
+        halves = tuple(range(1, 2 * image_dimensionality, 2))
+        minimum = minimum.reshape(split).min(axis=halves)
+        maximum = maximum.reshape(split).max(axis=halves)
+        minima.append(minimum)
+        uniform.append(minimum == maximum)
+
+    cares, cube_values, block_values = [], [], []
+    for level in range(R + 1):
+        maximal = uniform[level]
+        if level < R:
+            parent = uniform[level + 1]
+            for axis in range(image_dimensionality):
+                parent = parent.repeat(2, axis=axis)
+            maximal = maximal & ~parent
+        coordinates = np.nonzero(maximal)
+
+        care, value = 0, np.zeros(len(coordinates[0]), dtype=np.int64)
+        for axis, coordinate in enumerate(coordinates):
+            # The first axis holds the most significant bits of a position
+            offset = (image_dimensionality - 1 - axis) * R
+            care |= (2**R - 2**level) << offset
+            value |= coordinate.astype(np.int64) << (level + offset)
+        cares.append(np.full(value.shape, care, dtype=np.int64))
+        cube_values.append(value)
+        block_values.append(minima[level][maximal])
+
+    return np.concatenate(cares), np.concatenate(cube_values), np.concatenate(block_values)
+
+
+def labelled_quadtree_cubes(
+    values: np.ndarray,
+    label_qubits: int = 0,
+    image_dimensionality: int = 2,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    `quadtree_cubes` of every channel label, over the label bits followed by the position bits.
+
+    `values[m, l]` is the value of position `m` under label `l`, with `2^label_qubits`
+    columns. Blocks of the value 0 are left out, since they need no gate.
+    """
+    values = np.asarray(values).reshape(-1, 2**label_qubits)
+    cares, cube_values, block_values = [], [], []
+    for label in range(values.shape[1]):
+        care, value, blocks = quadtree_cubes(values[:, label], image_dimensionality)
+        nonzero = blocks != 0
+        cares.append((care[nonzero] << label_qubits) | (2**label_qubits - 1))
+        cube_values.append((value[nonzero] << label_qubits) | label)
+        block_values.append(blocks[nonzero])
+    return np.concatenate(cares), np.concatenate(cube_values), np.concatenate(block_values)
+
+
+class QuadtreeRYGate(MultiplexedRYGate):
+    """
+    Uniformly controlled RY rotation defined by one multi-controlled RY per uniform block.
+
+    The lowest `label_qubits` controls hold channel labels and the others the position
+    register of an image with `image_dimensionality` axes. Each maximal block of positions
+    sharing an angle under a label is rotated at once, controlled only by the shared upper
+    coordinate bits of the block, so piecewise-constant images need few gates.
+    """
+
+    def __init__(self, angles: Sequence[float], image_dimensionality: int = 2, label_qubits: int = 0):
+        super().__init__(angles)
+        self.name = "quadtree_ry"
+        self.image_dimensionality = image_dimensionality
+        self.label_qubits = label_qubits
+
+    def cubes(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Blocks rotated by the gate as `(care, value, angles)` over its controls."""
+        return labelled_quadtree_cubes(self.angles, self.label_qubits, self.image_dimensionality)
+
+    def _define(self):
+        care, value, angles = self.cubes()
+        circuit = QuantumCircuit(self.num_qubits, name=self.name)
+        esop_circuit(circuit, care, value, range(1, self.num_qubits), 0, [RYGate(angle) for angle in angles])
+        self.definition = circuit
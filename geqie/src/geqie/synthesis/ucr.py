@@ -0,0 +1,98 @@
+"""Uniformly controlled RY rotations decomposed into RY and CNOT gates along a Gray code."""
+
+from typing import Sequence
+
+import numpy as np
+
+from qiskit.circuit import Gate, ParameterExpression, QuantumCircuit
+
+
+def gray_code(num_bits: int) -> np.ndarray:
+    """Reflected binary Gray code of all `num_bits`-bit integers."""
+    n = np.arange(2**num_bits)
+    return n ^ (n >> 1)
+
+
+def walsh_hadamard(values: np.ndarray) -> np.ndarray:
+    """Unnormalized fast Walsh-Hadamard transform along the last axis, of length `2^k`."""
+    values = np.asarray(values, dtype=np.float64)
+    size = values.shape[-1]
+    transformed = values.reshape(-1, size).copy()
+    h = 1
+    while h < size:
+        pairs = transformed.reshape(-1, size // (2 * h), 2, h)
+        low, high = pairs[:, :, 0, :].copy(), pairs[:, :, 1, :]
+        pairs[:, :, 0, :] += high
+        pairs[:, :, 1, :] = low - high
+        h *= 2
+    return transformed.reshape(values.shape)
+
+
+def ucry_angles(angles: np.ndarray) -> np.ndarray:
+    """
+    Convert multiplexed RY angles into the angles of the single RY gates of `ucry`.
+
+    `angles[..., m]` is the RY angle applied when the controls hold the value `m`. The
+    `i`-th gate of the decomposition rotates by the Walsh-Hadamard coefficient of the
+    angles at the `i`-th Gray code, so the conversion runs in `O(2^k k)`.
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    size = angles.shape[-1]
+    num_controls = int(np.log2(size))
+    return walsh_hadamard(angles)[..., gray_code(num_controls)] / size
+
+
+def ucry_controls(num_controls: int) -> np.ndarray:
+    """Index of the control qubit of the CNOT that follows each RY gate of `ucry`."""
+    codes = gray_code(num_controls)
+    changes = codes ^ np.roll(codes, -1)
+    return np.log2(np.maximum(changes, 1)).astype(int)
+
+
+def ucry(angles: Sequence[float | ParameterExpression], num_controls: int) -> QuantumCircuit:
+    """
+    Uniformly controlled RY rotation on qubit 0, controlled by qubits `1..num_controls`.
+
+    `angles` are the gate angles produced by `ucry_angles`, either numbers or parameters.
+    The circuit alternates the `2^k` RY gates with `2^k` CNOTs, whose controls walk the
+    Gray code so that every control value accumulates its own signed sum of angles.
+    """
+    circuit = QuantumCircuit(num_controls + 1, name="ucry")
+    if num_controls == 0:
+        circuit.ry(angles[0], 0)
+        return circuit
+
+    for angle, control in zip(angles, ucry_controls(num_controls)):
+        circuit.ry(angle, 0)
+        circuit.cx(int(control) + 1, 0)
+    return circuit
+
+
+def ry_matrices(angles: np.ndarray) -> np.ndarray:
+    """Stack of qiskit RY gate matrices, one per angle."""
+    cos_half, sin_half = np.cos(np.asarray(angles) / 2), np.sin(np.asarray(angles) / 2)
+    return np.stack([np.stack([cos_half, -sin_half], axis=-1), np.stack([sin_half, cos_half], axis=-1)], axis=-2)
+
+
+class MultiplexedRYGate(Gate):
+    """
+    Uniformly controlled RY rotation on qubit 0, controlled by qubits `1..num_controls`.
+
+    `angles[m]` is the RY angle applied when the controls hold the value `m`. The gate is
+    defined by the `ucry` decomposition into `2^k` RY gates and CNOTs, which is what
+    transpilation for hardware produces, while simulators may run it as a multiplexer.
+    """
+
+    def __init__(self, angles: Sequence[float]):
+        angles = np.asarray(angles, dtype=np.float64)
+        num_controls = int(np.log2(angles.size))
+        if angles.size != 2**num_controls:
+            raise ValueError(f"Expected a power-of-two number of angles, received: {angles.size}")
+        super().__init__("multiplexed_ry", num_controls + 1, list(angles))
+
+    @property
+    def angles(self) -> np.ndarray:
+        return np.asarray(self.params, dtype=np.float64)
+
+    def _define(self):
+        self.definition = ucry(ucry_angles(self.angles), self.num_qubits - 1)
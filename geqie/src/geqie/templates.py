@@ -0,0 +1,131 @@
+"""Parameterized circuit templates of angle encodings, built once per image shape."""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+from qiskit.circuit import ParameterVector, QuantumCircuit
+from qiskit.quantum_info import Operator, Statevector
+
+from geqie.encodings import EncodingMetadata
+from geqie.preparation import prepare_image
+from geqie.synthesis.builder import rotation_angles, superposition_circuit
+from geqie.synthesis.ucr import ucry, ucry_angles
+
+
+@dataclass
+class EncodingTemplate:
+    """
+    Circuit of an angle encoding for a fixed image shape, with the rotation angles left as parameters.
+
+    The circuit puts the position register into a uniform superposition, prepares the channel
+    labels, if any, in a uniform superposition over the used labels and applies a uniformly
+    controlled RY rotation to the color qubit. `bind` computes the parameter values of an
+    image in `O(N log N)`, so that a single (transpiled) circuit serves every image.
+    """
+    circuit: QuantumCircuit
+    parameters: ParameterVector
+    image_shape: Tuple[int, ...]
+    image_dimensionality: int
+    num_labels: int
+    batch_data_function: Callable[..., np.ndarray]
+    batch_angle_function: Callable[..., np.ndarray]
+    prepare_function: Callable[..., np.ndarray] | None = None
+    encoding_params: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def R(self) -> int:
+        return int(np.ceil(np.log2(max(self.image_shape))))
+
+    @property
+    def label_qubits(self) -> int:
+        return int(np.ceil(np.log2(self.num_labels)))
+
+    def _bind_single(self, image: np.ndarray) -> np.ndarray:
+        image = prepare_image(self.prepare_function, image, self.encoding_params)
+        if image.shape[:self.image_dimensionality] != self.image_shape:
+            raise ValueError(f"Template was built for images of shape {self.image_shape}, got {image.shape[:self.image_dimensionality]}")
+
+        indices = self.batch_data_function(image, R=self.R, **self.encoding_params)
+        angles = self.batch_angle_function(image, R=self.R, **self.encoding_params)
+
+        num_positions = 2**(self.image_dimensionality * self.R)
+        ry_angles = np.zeros((num_positions, 2**self.label_qubits))
+        ry_angles[:, :self.num_labels] = rotation_angles(indices, angles, num_positions)
+        return ucry_angles(ry_angles.reshape(-1))
+
+    def bind(self, image: np.ndarray, batch: bool = False) -> np.ndarray:
+        """
+        Parameter values of the image, in the order of `parameters`.
+
+        With `batch=True` the leading axis of `image` indexes a stack of images and the
+        values are returned as the rows of a 2-D array, e.g. to be passed as
+        `circuit_param_values` of a single `execute` call.
+        """
+        if batch:
+            return np.stack([self._bind_single(single_image) for single_image in image])
+        return self._bind_single(image)
+
+    def assign(self, image: np.ndarray) -> QuantumCircuit:
+        """Concrete circuit of the image."""
+        return self.circuit.assign_parameters({self.parameters: self.bind(image)})
+
+
+def encode_template(
+    init_function: Callable[..., Statevector],
+    data_function: Callable[..., Statevector],
+    map_function: Callable[..., Operator],
+    image: np.ndarray,
+    image_dimensionality: int = 2,
+    perform_measurement: bool = True,
+    encoding_params: Dict[str, Any] = {},
+    prepare_function: Callable[..., np.ndarray] | None = None,
+    batch_data_function: Callable[..., np.ndarray] | None = None,
+    batch_angle_function: Callable[..., np.ndarray] | None = None,
+    metadata_function: Callable[..., EncodingMetadata] | None = None,
+    **_: Dict[Any, Any],
+) -> EncodingTemplate:
+    """
+    Build the parameterized template of an angle encoding for images shaped like `image`.
+
+    Takes the same arguments as `encode` and needs the `batch_data_function` and
+    `batch_angle_function` of the encoding. At the positions of the image, the template
+    produces the state of `encode` up to the signs that its unitarization may attach to
+    single positions, which leaves all measurement probabilities unchanged. Positions
+    outside a non-square image keep the angle 0 under every used label.
+    """
+    if batch_data_function is None or batch_angle_function is None:
+        raise ValueError("Templates require an angle encoding providing `batch_data_function` and `batch_angle_function`")
+    rotations = metadata_function(**encoding_params).rotations if metadata_function is not None else "labelled"
+    if rotations != "labelled":
+        raise ValueError(f"Templates require an angle encoding with labelled rotations, the encoding declares: {rotations}")
+
+    image_shape = image.shape[:image_dimensionality]
+    R = int(np.ceil(np.log2(max(image_shape))))
+    prepared_image = prepare_image(prepare_function, image, encoding_params)
+    angles = batch_angle_function(prepared_image, R=R, **encoding_params)
+    num_labels = angles.size // int(np.prod(image_shape))
+
+    label_qubits = int(np.ceil(np.log2(num_labels)))
+    position_qubits = image_dimensionality * R
+    num_controls = label_qubits + position_qubits
+    n_qubits = num_controls + 1
+
+    parameters = ParameterVector("theta", 2**num_controls)
+    circuit = superposition_circuit(n_qubits, position_qubits, num_labels=num_labels)
+    circuit.compose(ucry(parameters, num_controls), range(n_qubits), inplace=True)
+    if perform_measurement:
+        circuit.measure_all()
+
+    return EncodingTemplate(
+        circuit=circuit,
+        parameters=parameters,
+        image_shape=tuple(image_shape),
+        image_dimensionality=image_dimensionality,
+        num_labels=num_labels,
+        batch_data_function=batch_data_function,
+        batch_angle_function=batch_angle_function,
+        prepare_function=prepare_function,
+        encoding_params=dict(encoding_params),
+    )
@@ -0,0 +1,222 @@
+"""Tiled encoding of large images: power-of-two tiles encoded, simulated and retrieved independently."""
+
+from concurrent import futures
+from dataclasses import dataclass, field
+from multiprocessing import cpu_count
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from qiskit.circuit import QuantumCircuit
+from qiskit.quantum_info import Operator, Statevector
+
+import geqie.main as main
+from geqie.assembly import assemble, num_qubits
+from geqie.logging_utils.logger import setup_logger
+from geqie.parallel import init_worker
+from geqie.planner import BYTES_PER_AMPLITUDE, DEFAULT_MEMORY_BUDGET
+from geqie.preparation import prepare_image
+
+TILE_ORDERS = ("row-major", "z-order")
+
+
+@dataclass
+class TileLayout:
+    """Placement of equally sized square tiles over an image, in processing order."""
+    image_shape: Tuple[int, ...]
+    tile_size: int
+    origins: List[Tuple[int, ...]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "image_shape": list(self.image_shape),
+            "tile_size": self.tile_size,
+            "origins": [list(origin) for origin in self.origins],
+        }
+
+    @classmethod
+    def from_dict(cls, layout: Dict[str, Any]) -> "TileLayout":
+        return cls(
+            image_shape=tuple(layout["image_shape"]),
+            tile_size=int(layout["tile_size"]),
+            origins=[tuple(origin) for origin in layout["origins"]],
+        )
+
+
+@dataclass
+class TiledEncoding:
+    layout: TileLayout
+    circuits: List[QuantumCircuit]
+
+
+def _morton_key(coords: Tuple[int, ...]) -> int:
+    key = 0
+    for bit in range(max(coords).bit_length()):
+        for axis, coord in enumerate(coords):
+            key |= ((coord >> bit) & 1) << (bit * len(coords) + len(coords) - 1 - axis)
+    return key
+
+
+def tile_layout(image_shape: Tuple[int, ...], tile_size: int, order: str = "row-major") -> TileLayout:
+    """Cover `image_shape` with `tile_size`-sided tiles, ordered row-major or along a Z-order curve."""
+    if tile_size < 2 or tile_size & (tile_size - 1):
+        raise ValueError(f"Tile size must be a power of two of at least 2, got {tile_size}")
+    if order not in TILE_ORDERS:
+        raise ValueError(f"Unknown tile order '{order}'. Use one of {TILE_ORDERS}.")
+
+    grid = [int(np.ceil(extent / tile_size)) for extent in image_shape]
+    grid_coords = list(np.ndindex(*grid))
+    if order == "z-order":
+        grid_coords.sort(key=_morton_key)
+
+    origins = [tuple(int(coord) * tile_size for coord in coords) for coords in grid_coords]
+    return TileLayout(image_shape=tuple(image_shape), tile_size=tile_size, origins=origins)
+
+
+def split_tiles(image: np.ndarray, layout: TileLayout) -> List[np.ndarray]:
+    """Cut the image into tiles, zero-padding the ones that cross the image border."""
+    tiles = []
+    for origin in layout.origins:
+        window = tuple(slice(start, start + layout.tile_size) for start in origin)
+        tile = image[window]
+        padding = [(0, layout.tile_size - extent) for extent in tile.shape[:len(origin)]]
+        padding += [(0, 0)] * (tile.ndim - len(origin))
+        tiles.append(np.pad(tile, padding))
+    return tiles
+
+
+def stitch_tiles(tiles: List[np.ndarray], layout: TileLayout) -> np.ndarray:
+    """Reassemble retrieved tiles into a full image, cropping the padding of border tiles."""
+    n_dims = len(layout.image_shape)
+    image = np.zeros((*layout.image_shape, *tiles[0].shape[n_dims:]), dtype=tiles[0].dtype)
+    for origin, tile in zip(layout.origins, tiles):
+        window = tuple(slice(start, min(start + layout.tile_size, extent)) for start, extent in zip(origin, layout.image_shape))
+        crop = tuple(slice(0, w.stop - w.start) for w in window)
+        image[window] = tile[crop]
+    return image
+
+
+def tile_memory(tile_size: int, color_qubits: int, image_dimensionality: int = 2) -> int:
+    """Bytes held by the block-sparse operator and the simulated state of a single tile."""
+    n_positions = tile_size**image_dimensionality
+    block_dim = 2**color_qubits
+    return BYTES_PER_AMPLITUDE * n_positions * (block_dim**2 + block_dim)
+
+
+def choose_tile_size(
+    image_shape: Tuple[int, ...],
+    color_qubits: int,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+) -> int:
+    """Largest power-of-two tile size, not exceeding the image, whose memory fits the budget."""
+    largest = max(2, 2**int(np.ceil(np.log2(max(image_shape)))))
+    tile_size = 2
+    if tile_memory(tile_size, color_qubits, len(image_shape)) > memory_budget:
+        raise MemoryError(f"Even a {tile_size}-pixel tile exceeds the memory budget of {memory_budget} bytes")
+    while tile_size < largest and tile_memory(2 * tile_size, color_qubits, len(image_shape)) <= memory_budget:
+        tile_size *= 2
+    return tile_size
+
+
+def color_qubits(
+    data_function: Callable[..., Statevector],
+    map_function: Callable[..., Operator],
+    image: np.ndarray,
+    image_dimensionality: int = 2,
+    encoding_params: Dict[str, Any] = {},
+    prepare_function: Callable[..., np.ndarray] | None = None,
+    batch_data_function: Callable[..., np.ndarray] | None = None,
+    batch_map_function: Callable[..., np.ndarray] | None = None,
+    **_: Dict[Any, Any],
+) -> int:
+    """Number of non-position qubits of an encoding, probed on a 2-pixel-sided corner of the image."""
+    corner = image[(slice(0, 2),) * image_dimensionality]
+    corner = prepare_image(prepare_function, corner, encoding_params)
+    G = assemble(
+        data_function,
+        map_function,
+        corner,
+        image_dimensionality=image_dimensionality,
+        encoding_params=encoding_params,
+        batch_data_function=batch_data_function,
+        batch_map_function=batch_map_function,
+    )
+    R = int(np.ceil(np.log2(max(corner.shape[:image_dimensionality]))))
+    return num_qubits(G) - image_dimensionality * R
+
+
+def _map_tiles(fn: Callable, args_list: List[Tuple], workers: int | None) -> List[Any]:
+    if workers is None:
+        workers = max(1, cpu_count() - 1)
+    if workers == 1 or len(args_list) == 1:
+        return [fn(*args) for args in args_list]
+    with futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        return list(executor.map(fn, *zip(*args_list)))
+
+
+def _encode_tile(init_function, data_function, map_function, tile, encode_kwargs) -> QuantumCircuit:
+    return main.encode(init_function, data_function, map_function, tile, **encode_kwargs)
+
+
+def _simulate_tile(circuit, n_shots, simulate_kwargs) -> Any:
+    return main.simulate(circuit, n_shots, **simulate_kwargs)
+
+
+def encode_tiled(
+    init_function: Callable[..., Statevector],
+    data_function: Callable[..., Statevector],
+    map_function: Callable[..., Operator],
+    image: np.ndarray,
+    tile_size: int | None = None,
+    memory_budget: int | None = None,
+    tile_order: str = "row-major",
+    image_dimensionality: int = 2,
+    workers: int | None = None,
+    **encode_kwargs: Any,
+) -> TiledEncoding:
+    """
+    Encode an image as independent circuits of power-of-two tiles, across a process pool.
+
+    Without an explicit `tile_size`, the largest tile whose operator and state fit in
+    `memory_budget` bytes (1 GiB by default) is used. Tiles are processed in `tile_order`,
+    either "row-major" or "z-order". The remaining keyword arguments are passed to
+    `encode` for every tile; `workers` defaults to one process less than the CPU count.
+    """
+    logger = setup_logger(encode_kwargs.get("logging_level"))
+
+    image_shape = image.shape[:image_dimensionality]
+    if tile_size is None:
+        memory_budget = memory_budget or DEFAULT_MEMORY_BUDGET
+        n_color_qubits = color_qubits(data_function, map_function, image, image_dimensionality, **encode_kwargs)
+        tile_size = choose_tile_size(image_shape, n_color_qubits, memory_budget)
+    layout = tile_layout(image_shape, tile_size, tile_order)
+    logger.info(f"Encoding {len(layout.origins)} tiles of size {tile_size}...")
+
+    encode_kwargs = {**encode_kwargs, "image_dimensionality": image_dimensionality}
+    circuits = _map_tiles(
+        _encode_tile,
+        [(init_function, data_function, map_function, tile, encode_kwargs) for tile in split_tiles(image, layout)],
+        workers,
+    )
+    return TiledEncoding(layout=layout, circuits=circuits)
+
+
+def simulate_tiled(
+    tiled: TiledEncoding,
+    n_shots: int,
+    workers: int | None = None,
+    **simulate_kwargs: Any,
+) -> List[Any]:
+    """Simulate every tile circuit across a process pool, returning the results in tile order."""
+    return _map_tiles(_simulate_tile, [(circuit, n_shots, simulate_kwargs) for circuit in tiled.circuits], workers)
+
+
+def retrieve_tiled(
+    retrieve_function: Callable[..., np.ndarray],
+    results: List[Any],
+    layout: TileLayout,
+    **retrieve_kwargs: Any,
+) -> np.ndarray:
+    """Retrieve every tile from its results and stitch the tiles back into the full image."""
+    tiles = [retrieve_function(tile_results, **retrieve_kwargs) for tile_results in results]
+    return stitch_tiles(tiles, layout)
@@ -0,0 +1,124 @@
+"""Opt-in traces of the wall time and peak memory of every stage of encodes, simulations and executions."""
+
+import contextlib
+import sys
+import time
+import tracemalloc
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List
+
+from qiskit.circuit import QuantumCircuit
+
+# Stages recorded by `encode`, `simulate` and `execute`, in the order they run
+STAGES = (
+    "preprocessing",
+    "assembly",
+    "unitarization",
+    "circuit_build",
+    "transpile",
+    "simulation",
+    "execution",
+    "result_conversion",
+)
+
+
+def max_rss() -> int | None:
+    """High-water mark of the resident memory of the process in bytes, None where it cannot be queried."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+@dataclass
+class StageRecord:
+    """
+    Wall time of a stage in seconds and its peak memory in bytes.
+
+    `peak_memory` counts the Python and NumPy allocations made within the stage, on top of
+    those alive when it started, while `max_rss` is the high-water mark of the whole
+    process once the stage ended, which also covers native allocations such as Aer's.
+    """
+    name: str
+    wall_time: float
+    peak_memory: int | None = None
+    max_rss: int | None = None
+
+
+@dataclass
+class Trace:
+    """
+    Stages and counters recorded by the calls it is passed to, e.g. `encode(..., trace=trace)`.
+
+    `callback` is called with every `StageRecord` as soon as its stage ends, so that long
+    jobs can be monitored while they run. Memory is tracked with `tracemalloc`, which slows
+    down Python code such as per-pixel encoding functions; `track_memory=False` only
+    records wall times.
+    """
+    callback: Callable[[StageRecord], None] | None = None
+    track_memory: bool = True
+    stages: List[StageRecord] = field(default_factory=list)
+    counters: Dict[str, Any] = field(default_factory=dict)
+    # Peaks of the enclosing stages, which nested stages reset
+    _peaks: List[int] = field(default_factory=list, repr=False)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Record the wall time and peak memory of the enclosed block as stage `name`."""
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._peaks.append(current)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            peak_memory = None
+            if self.track_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, self._peaks.pop())
+                peak_memory = max(0, peak - current)
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                if started_tracing:
+                    tracemalloc.stop()
+
+            record = StageRecord(name, wall_time, peak_memory, max_rss())
+            self.stages.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def count(self, **counters: Any):
+        """Set counters such as `num_qubits` or `n_shots`, overwriting earlier values."""
+        self.counters.update(counters)
+
+    def count_circuit(self, circuit: QuantumCircuit, prefix: str = ""):
+        """Count the qubits, depth and size of a circuit, under names starting with `prefix`."""
+        self.count(**{
+            f"{prefix}num_qubits": circuit.num_qubits,
+            f"{prefix}depth": circuit.depth(),
+            f"{prefix}size": circuit.size(),
+        })
+
+    def wall_time(self, name: str) -> float:
+        """Total wall time of all the stages named `name`."""
+        return sum(record.wall_time for record in self.stages if record.name == name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stages": [asdict(record) for record in self.stages], "counters": dict(self.counters)}
+
+
+def stage(trace: Trace | None, name: str) -> contextlib.AbstractContextManager:
+    """`trace.stage(name)`, or a context that records nothing without a trace."""
+    return trace.stage(name) if trace is not None else contextlib.nullcontext()
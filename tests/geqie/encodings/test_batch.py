@@ -0,0 +1,43 @@
+import importlib
+
+import numpy as np
+import pytest
+
+from geqie.assembly import BlockAccumulator
+
+from ..helpers import random_image
+
+ENCODING_IMAGES = {
+    "frqi": (random_image((4, 4, 3)), 2),
+    "ifrqi": (random_image((2, 2)), 2),
+    "neqr": (random_image((2, 4)), 2),
+    "qualpi": (random_image((2, 2)), 2),
+    "frqci": (random_image((4, 4, 3)), 2),
+    "mcqi": (random_image((4, 4, 3)), 2),
+    "ncqi": (random_image((1, 2, 3)), 2),
+    "qrci": (random_image((2, 2, 3)), 2),
+    "mfrqi": (np.random.default_rng(0).random((2, 2, 2)), 3),
+}
+
+
+@pytest.mark.parametrize("encoding, image, image_dimensionality", [(k, *v) for k, v in ENCODING_IMAGES.items()])
+def test_batch_functions_match_scalar_functions(encoding, image, image_dimensionality):
+    module = importlib.import_module(f"geqie.encodings.{encoding}")
+    shape = image.shape[:image_dimensionality]
+    R = int(np.ceil(np.log2(max(shape))))
+
+    scalar = BlockAccumulator()
+    for coords in np.ndindex(*shape):
+        scalar.add(
+            module.data_function(*coords, R=R, image=image),
+            module.map_function(*coords, R=R, image=image),
+        )
+
+    batch = BlockAccumulator()
+    batch.add_blocks(
+        module.batch_data_function(image, R=R),
+        module.batch_map_function(image, R=R),
+        num_positions=2**(len(shape) * R),
+    )
+
+    assert np.allclose(scalar.result().blocks, batch.result().blocks)
@@ -0,0 +1,20 @@
+import numpy as np
+
+import geqie
+from geqie.encodings import optional_functions
+
+
+def random_image(shape, low=0, high=256, seed=0) -> np.ndarray:
+    return np.random.default_rng(seed).integers(low, high, shape, dtype=np.uint8)
+
+
+def encoding_functions(encoding) -> tuple:
+    return encoding.init_function, encoding.data_function, encoding.map_function
+
+
+def encode(encoding, image, **kwargs):
+    return geqie.encode(*encoding_functions(encoding), image, **optional_functions(encoding), **kwargs)
+
+
+def encode_statevector(encoding, image, **kwargs):
+    return geqie.encode_statevector(*encoding_functions(encoding), image, **optional_functions(encoding), **kwargs)
@@ -0,0 +1,68 @@
+import numpy as np
+from qiskit.quantum_info import Operator, Statevector
+
+import geqie
+from geqie.assembly import BlockAccumulator, BlockDiagonalOperator, assemble
+from geqie.encodings import frqi
+
+from .helpers import encode
+
+
+def _ry(theta: float) -> Operator:
+    return Operator([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+
+
+def test_block_accumulator_matches_outer_product_sum():
+    accumulator = BlockAccumulator()
+    expected = np.zeros((8, 8), dtype=complex)
+    for m, theta in enumerate([0.1, 0.7, 1.3]):
+        data_vector = Statevector.from_int(m, 4)
+        map_operator = _ry(theta)
+        accumulator.add(data_vector, map_operator)
+        expected += (data_vector.to_operator() ^ map_operator).data
+
+    assert accumulator.is_block_diagonal
+    assert isinstance(accumulator.result(), BlockDiagonalOperator)
+    assert np.array_equal(accumulator.to_matrix(), expected)
+
+
+def test_block_accumulator_falls_back_to_dense():
+    accumulator = BlockAccumulator()
+    expected = np.zeros((8, 8), dtype=complex)
+    data_vectors = [Statevector.from_int(0, 4), Statevector(np.array([0, 1, 1, 0]) / np.sqrt(2))]
+    for data_vector, theta in zip(data_vectors, [0.4, 0.9]):
+        accumulator.add(data_vector, _ry(theta))
+        expected += (data_vector.to_operator() ^ _ry(theta)).data
+
+    assert not accumulator.is_block_diagonal
+    assert np.allclose(accumulator.to_matrix(), expected)
+
+
+def test_unitarize_matches_dense_qr(rng):
+    blocks = rng.normal(size=(4, 2, 2)) + 1j * rng.normal(size=(4, 2, 2))
+    blocks[3] = 0
+    operator = BlockDiagonalOperator(blocks)
+
+    U = operator.unitarize().to_matrix()
+    U_dense, _r = np.linalg.qr(operator.to_matrix())
+
+    assert np.allclose(U, U_dense)
+    assert np.allclose(U.conj().T @ U, np.eye(8))
+
+
+def test_aer_simulates_uniform_image():
+    image = np.full((4, 4), 255, dtype=np.uint8)
+    circuit = encode(frqi, image)
+
+    retrieved_image = frqi.retrieve_function(geqie.simulate(circuit, 4096))
+    assert np.array_equal(image, retrieved_image)
+
+
+def test_sharded_assembly_matches_serial():
+    image = np.random.default_rng(0).random((4, 4))
+
+    serial = assemble(frqi.data_function, frqi.map_function, image)
+    sharded = assemble(frqi.data_function, frqi.map_function, image, workers=2)
+
+    assert isinstance(sharded, BlockDiagonalOperator)
+    assert np.allclose(sharded.to_matrix(), serial.to_matrix())
@@ -0,0 +1,49 @@
+import numpy as np
+
+from PIL import Image
+
+from geqie import benchmark
+
+from .helpers import random_image
+
+IMAGE = benchmark.TEST_IMAGES_PATH / "grayscale" / "test_flag_4x4.png"
+
+
+def test_benchmark_rows_round_trip(tmp_path):
+    rows = benchmark.run_benchmark(encodings=["frqi", "frqci"], images=[IMAGE], n_shots=[128], seed=7)
+
+    frqi, frqci = rows
+    assert frqi["status"] == "ok" and frqi["num_qubits"] == 5
+    assert frqi["total_time"] >= frqi["simulation_time"] > 0
+    assert frqci["status"] == "failed"
+
+    for name in ("results.csv", "results.json"):
+        benchmark.write_results(rows, tmp_path / name)
+        assert benchmark.read_results(tmp_path / name)[0] == frqi
+
+
+def test_compare_flags_regressions():
+    [row] = benchmark.run_benchmark(encodings=["frqi"], images=[IMAGE], n_shots=[128], seed=7)
+    slower = {**row, "total_time": row["total_time"] + 1.0, "two_qubit_gates": 2 * row["two_qubit_gates"]}
+
+    assert not any(comparison.regression for comparison in benchmark.compare_results([row], [row]))
+    regressions = {comparison.metric for comparison in benchmark.compare_results([row], [slower]) if comparison.regression}
+    assert regressions == {"total_time", "two_qubit_gates"}
+
+
+def test_two_qubit_gates_follow_image(tmp_path):
+    Image.fromarray(np.zeros((4, 4), dtype=np.uint8)).save(tmp_path / "blank.png")
+    Image.fromarray(random_image((4, 4))).save(tmp_path / "random.png")
+
+    blank, random = benchmark.run_benchmark(encodings=["neqr"], images=[tmp_path], n_shots=[128], seed=7)
+
+    assert blank["num_qubits"] == random["num_qubits"] == 12
+    assert blank["two_qubit_gates"] == 0 < random["two_qubit_gates"]
+
+
+def test_default_images_resolve_outside_repository(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rows = benchmark.run_benchmark(encodings=["frqi"], max_qubits=0)
+
+    assert len(rows) == len(benchmark.find_images([benchmark.TEST_IMAGES_PATH])) > 0
+    assert all(row["status"] == "skipped" for row in rows)
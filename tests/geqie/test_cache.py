@@ -0,0 +1,100 @@
+import importlib
+import shutil
+import sys
+
+import numpy as np
+from qiskit.quantum_info import Statevector
+
+import geqie
+from geqie import cache
+from geqie.cache import OperatorCache, cache_key
+from geqie.encodings import frqi, neqr
+
+from .helpers import encode, encoding_functions, random_image
+
+
+def test_cached_encode_matches_uncached(tmp_path):
+    for encoding, image in [(frqi, random_image((4, 4))), (neqr, random_image((2, 2)))]:
+        kwargs = dict(perform_measurement=False, synthesis="operator")
+        expected = Statevector(encode(encoding, image, **kwargs))
+        miss = encode(encoding, image, cache_dir=tmp_path, **kwargs)
+        hit = encode(encoding, image, cache_dir=tmp_path, **kwargs)
+
+        assert Statevector(miss).equiv(expected)
+        assert Statevector(hit).equiv(expected)
+    assert len(OperatorCache(tmp_path)) == 2
+
+
+def test_default_synthesis_bypasses_cache(tmp_path):
+    image = random_image((4, 4))
+    circuit = encode(frqi, image, perform_measurement=False, cache_dir=tmp_path)
+
+    assert Statevector(circuit).equiv(Statevector(encode(frqi, image, perform_measurement=False)))
+    assert len(OperatorCache(tmp_path)) == 0
+
+
+def test_cache_key_depends_on_inputs():
+    image = random_image((4, 4))
+    functions = encoding_functions(frqi)
+    key = cache_key(image, functions)
+
+    assert key == cache_key(image.copy(), functions)
+    assert key != cache_key(image + 1, functions)
+    assert key != cache_key(image, functions, encoding_params={"bitrate": 4})
+    assert key != cache_key(image, functions, image_dimensionality=3)
+    assert key != cache_key(image, encoding_functions(neqr))
+
+
+def test_editing_geqie_module_invalidates_cache(tmp_path, monkeypatch):
+    # A copy of the sources stands for geqie, e.g. an editable install, which the test must not edit
+    sources = tmp_path / "geqie"
+    shutil.copytree(cache.GEQIE_PATH, sources, ignore=shutil.ignore_patterns("__pycache__"))
+    monkeypatch.setattr(cache, "GEQIE_PATH", sources)
+    image = random_image((4, 4))
+    key = cache_key(image, encoding_functions(frqi))
+
+    for module in ("assembly.py", "encodings/__init__.py"):
+        with open(sources / module, "a") as file:
+            file.write("# edited\n")
+        assert cache_key(image, encoding_functions(frqi)) != key
+        key = cache_key(image, encoding_functions(frqi))
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = OperatorCache(tmp_path)
+    cache.put("a", np.eye(4), np.ones(4))
+    cache.max_size = 2 * cache.size()
+
+    cache.put("b", np.eye(4), np.ones(4))
+    assert cache.get("a") is not None
+    cache.put("c", np.eye(4), np.ones(4))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_editing_encoding_module_invalidates_cache(tmp_path, monkeypatch):
+    package = tmp_path / "edited_encoding"
+    package.mkdir()
+    (package / "map.py").write_text("from geqie.encodings.frqi import map_function as map\n")
+    (package / "__init__.py").write_text(
+        "from geqie.encodings.frqi import init_function, data_function\n"
+        "from .map import map as _map\n\n\n"
+        "def map_function(*args, **kwargs):\n"
+        "    return _map(*args, **kwargs)\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "edited_encoding", raising=False)
+    encoding = importlib.import_module("edited_encoding")
+
+    def cache_hit():
+        trace = geqie.Trace()
+        encode(encoding, random_image((2, 2)), synthesis="operator", cache_dir=tmp_path / "cache", trace=trace)
+        return trace.counters["operator_cache_hit"]
+
+    assert not cache_hit()
+    assert cache_hit()
+    with open(package / "map.py", "a") as file:
+        file.write("# edited\n")
+    assert not cache_hit()
@@ -1,7 +1,11 @@
+import json
+import pstats
+import shutil
 import subprocess
 import pytest
 
 from dataclasses import dataclass
+from pathlib import Path
 from typing import List, Optional
 
 @dataclass
@@ -45,3 +49,58 @@ def test_cli(method: str, params: CLIParameters):
         "--encoding", method, 
         *params.to_list(),
     ], check=True)
+
+
+def test_cli_profile(tmp_path):
+    prefix = tmp_path / "run"
+    subprocess.run([
+        "geqie", "--profile", str(prefix), "--profile-collapsed", "simulate",
+        "--encoding", "frqi",
+        *METHOD_CLI_MAPPING["frqi"].to_list(),
+    ], check=True)
+
+    pstats.Stats(str(prefix) + ".pstats")
+    assert (tmp_path / "run.allocations.txt").read_text().startswith("Top ")
+    assert (tmp_path / "run.collapsed.txt").exists()
+
+
+def test_cli_batch(tmp_path):
+    output_path = tmp_path / "results.jsonl"
+    subprocess.run([
+        "geqie", "simulate",
+        "--encoding", "frqi",
+        "--image-path", "assets/test_images/grayscale/test_image_*.png",
+        "--n-shots", "64",
+        "--workers", "2",
+        "--output-path", str(output_path),
+    ], check=True)
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert sorted(record["image"] for record in records) == [
+        "assets/test_images/grayscale/test_image_1010.png", "assets/test_images/grayscale/test_image_4x4.png",
+    ]
+    assert all(sum(record["result"].values()) == 64 for record in records)
+
+    retrieved = subprocess.run([
+        "geqie", "retrieve", "--encoding", "frqi", "--result", str(output_path),
+    ], check=True, capture_output=True, text=True).stdout
+    assert len(retrieved.splitlines()) == 2
+
+
+def test_cli_batch_mirrors_subdirectories(tmp_path):
+    image = Path("assets/test_images/grayscale/test_image_4x4.png")
+    for label in ("a", "b"):
+        (tmp_path / "in" / label).mkdir(parents=True)
+        shutil.copy(image, tmp_path / "in" / label / "img.png")
+
+    common = ["--encoding", "frqi", "--image-path", str(tmp_path / "in")]
+    subprocess.run(["geqie", "simulate", *common, "--n-shots", "64", "--output-path", f"{tmp_path / 'results'}/"], check=True)
+    subprocess.run(["geqie", "encode", *common, "--output-path", str(tmp_path / "circuits")], check=True)
+    subprocess.run([
+        "geqie", "retrieve", "--encoding", "frqi", "--result", str(tmp_path / "results"), "--output-path", str(tmp_path / "images"),
+    ], check=True, capture_output=True)
+
+    for directory, suffix in (("results", ".json"), ("circuits", ".qpy"), ("images", ".npy")):
+        assert sorted(path.relative_to(tmp_path / directory) for path in (tmp_path / directory).rglob(f"*{suffix}")) == [
+            Path("a", f"img{suffix}"), Path("b", f"img{suffix}"),
+        ]
@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+import pytest
+
+import geqie
+from geqie.counts import DenseCounts, as_dense
+from geqie.encodings import frqi, mcqi, neqr
+
+from .helpers import encode, encode_statevector, random_image
+
+
+def test_dense_counts_round_trip():
+    counts = {"011": 5, "100": 2, "111": 1}
+    dense = DenseCounts.from_dict(counts)
+
+    assert dense.num_qubits == 3
+    assert dense.shots == 8
+    assert dense.counts.tolist() == [0, 0, 0, 5, 2, 0, 0, 1]
+    assert dense.to_dict() == counts
+    assert len(dense.to_dict(padded=True)) == 2**3
+
+    big = dense.with_bit_order("big")
+    assert big.counts.tolist() == [0, 2, 0, 0, 0, 0, 5, 1]
+    assert big == dense
+    assert big.to_dict() == counts
+    assert as_dense(json.loads(json.dumps(big.to_record()))) == dense
+
+
+@pytest.mark.parametrize("encoding, image", [
+    (frqi, random_image((4, 4))),
+    (neqr, random_image((2, 2))),
+    (mcqi, random_image((2, 2, 3))),
+])
+def test_retrieve_accepts_dense_counts(encoding, image):
+    circuit = encode(encoding, image)
+
+    counts = geqie.simulate(circuit, 2**12, seed=7)
+    dense = geqie.simulate(circuit, 2**12, seed=7, return_dense_counts=True)
+    assert dense == DenseCounts.from_dict(counts, circuit.num_qubits)
+    assert np.array_equal(encoding.retrieve_function(dense), encoding.retrieve_function(counts))
+    assert len(geqie.simulate(circuit, 16, return_qiskit_result=True).get_memory()) == 16
+
+    analytic = geqie.simulate(circuit, 2**12, seed=7, analytic=True, return_dense_counts=True)
+    assert analytic.to_dict() == geqie.simulate(circuit, 2**12, seed=7, analytic=True)
+
+
+def test_basis_retrieve_takes_most_frequent_value():
+    image = random_image((2, 2))
+    counts = geqie.simulate(encode_statevector(neqr, image), 2**10, engine="direct", seed=7)
+    # A few shots of a wrong color for the first pixel must not override the measured one
+    counts[f"00{(int(image[0, 0]) ^ 1):08b}"] = 3
+
+    assert np.array_equal(neqr.retrieve_function(counts), image)
@@ -0,0 +1,26 @@
+import numpy as np
+
+from geqie.logging_utils import levels
+from geqie.logging_utils.logger import Lazy, setup_logger
+
+
+def test_disabled_levels_compute_nothing():
+    logger = setup_logger(levels.ERROR, reset=True)
+
+    def fail():
+        raise AssertionError("computed while disabled")
+
+    logger.state("%s", Lazy(fail))
+    logger.dump("G", fail)
+
+
+def test_dump_saves_npy_files(tmp_path):
+    logger = setup_logger(levels.MATH, reset=True, dump_dir=str(tmp_path))
+    matrix = np.arange(4).reshape(2, 2) * 1j
+    try:
+        logger.dump("G", lambda: matrix)
+    finally:
+        setup_logger(reset=True)
+
+    [path] = tmp_path.glob("*_G.npy")
+    assert np.array_equal(np.load(path), matrix)
@@ -0,0 +1,41 @@
+import pytest
+from qiskit import QuantumCircuit
+
+import geqie
+from geqie.encodings import frqi
+from geqie import planner
+from geqie.planner import ResourceError, available_memory, plan_simulation
+
+from .helpers import encode, random_image
+
+
+def test_plan_picks_statevector_for_encoded_images():
+    circuit = encode(frqi, random_image((4, 4)))
+
+    plan = geqie.simulate(circuit, 1024, dry_run=True)
+    # Aer keeps choosing the method of circuits whose statevector fits
+    assert plan.method == "automatic"
+    assert plan.num_qubits == 5
+    assert {estimate.method for estimate in plan.estimates} == {"statevector", "matrix_product_state", "density_matrix"}
+
+    with pytest.raises(ResourceError):
+        geqie.simulate(circuit, 1024, memory_budget=2**8)
+
+
+def test_plan_falls_back_to_matrix_product_state():
+    circuit = QuantumCircuit(40)
+    circuit.h(range(40))
+    circuit.cx(range(39), range(1, 40))
+
+    assert plan_simulation(circuit, 1024, memory_budget=2**30).method == "matrix_product_state"
+    with pytest.raises(ResourceError):
+        plan_simulation(circuit, 1024, method="statevector", memory_budget=2**30)
+    assert plan_simulation(circuit, 1024, method="stabilizer", memory_budget=2**30).estimates == []
+
+
+def test_available_memory_counts_reclaimable_cache(tmp_path, monkeypatch):
+    meminfo = tmp_path / "meminfo"
+    meminfo.write_text("MemTotal:  8000000 kB\nMemFree:  1000 kB\nMemAvailable:  4000000 kB\n")
+    monkeypatch.setattr(planner, "MEMINFO_PATH", str(meminfo))
+
+    assert available_memory() == 4000000 * 2**10
@@ -0,0 +1,26 @@
+from geqie.encodings import frqi
+from geqie.preparation import PreparedImageCache
+
+from .helpers import random_image
+
+
+def test_prepared_image_cache_reuses_prepared_images():
+    calls = []
+
+    def prepare(image, **params):
+        calls.append(params)
+        return frqi.prepare_function(image, **params)
+
+    cache = PreparedImageCache(max_entries=1)
+    image = random_image((4, 4, 3))
+
+    first = cache.prepare(prepare, image, {"grayscale_strategy": "average"})
+    second = cache.prepare(prepare, image.copy(), {"grayscale_strategy": "average"})
+    assert first is second
+    assert len(calls) == 1
+    assert first.shape == (4, 4)
+
+    image[0, 0] = 255 - image[0, 0]
+    cache.prepare(prepare, image, {"grayscale_strategy": "average"})
+    assert len(calls) == 2
+    assert len(cache) == 1
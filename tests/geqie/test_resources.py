@@ -0,0 +1,84 @@
+import importlib
+
+import pytest
+
+from qiskit import transpile
+
+import geqie
+from geqie.encodings import optional_functions
+from geqie.resources import max_image_size
+from geqie.tiling import color_qubits
+
+from .helpers import encode, random_image
+
+
+@pytest.mark.parametrize("name, shape", [
+    ("frqi", (4, 4)),
+    ("frqci", (4, 4, 3)),
+    ("mfrqi", (4, 4)),
+    ("mcqi", (2, 2, 3)),
+    ("ifrqi", (2, 2)),
+    ("ncqi", (2, 2, 3)),
+    ("neqr", (2, 2)),
+    ("qrci", (2, 2, 3)),
+    ("qualpi", (2, 2)),
+])
+def test_metadata_matches_encoded_circuits(name, shape):
+    encoding = importlib.import_module(f"geqie.encodings.{name}")
+    image = random_image(shape)
+
+    resources = geqie.estimate(encoding, shape)
+    probed = color_qubits(encoding.data_function, encoding.map_function, image, **optional_functions(encoding))
+    circuit = encode(encoding, image)
+
+    assert resources.color_qubits == probed
+    assert resources.num_qubits == circuit.num_qubits
+    assert resources.simulation_memory == 16 * 2**circuit.num_qubits
+
+
+def test_estimate_scales_with_encoding():
+    frqi = geqie.estimate("frqi", (64, 64), target="hardware")
+    neqr = geqie.estimate("neqr", (64, 64), target="hardware")
+
+    assert frqi.num_qubits == 13
+    assert frqi.two_qubit_gates < neqr.two_qubit_gates
+    assert frqi.encode_memory < neqr.encode_memory
+    assert geqie.estimate("neqr", (64, 64), {"bitrate": 4}).color_qubits == 4
+
+    assert max_image_size("frqi", 2**30) > max_image_size("neqr", 2**30) > 0
+
+
+@pytest.mark.parametrize("name, shape", [
+    ("ncqi", (2, 2, 3)),
+    ("neqr", (4, 4)),
+    ("qrci", (2, 2, 3)),
+    ("qualpi", (4, 4)),
+])
+def test_estimate_bounds_basis_circuits(name, shape):
+    encoding = importlib.import_module(f"geqie.encodings.{name}")
+    circuit = encode(encoding, random_image(shape))
+    transpiled = transpile(circuit, basis_gates=["cx", "u"])
+
+    aer = geqie.estimate(encoding, shape)
+    hardware = geqie.estimate(encoding, shape, target="hardware")
+
+    assert circuit.metadata["gates"] <= aer.two_qubit_gates
+    assert circuit.depth() <= aer.depth
+    assert transpiled.count_ops()["cx"] <= hardware.two_qubit_gates
+    assert transpiled.depth() <= hardware.depth
+    assert hardware.encode_memory < hardware.unitary_memory
+
+
+@pytest.mark.parametrize("name, shape", [
+    ("ifrqi", (2, 4)),
+    ("mcqi", (8, 16, 3)),
+    ("qualpi", (2, 4)),
+])
+def test_shared_positions_estimate_the_operator(name, shape):
+    circuit = encode(importlib.import_module(f"geqie.encodings.{name}"), random_image(shape), perform_measurement=False)
+    resources = geqie.estimate(name, shape)
+
+    assert "unitary" in circuit.count_ops()
+    assert resources.num_qubits == circuit.num_qubits
+    assert resources.depth == 3
+    assert resources.encode_memory > geqie.estimate(name, (16, 16) + shape[2:]).encode_memory
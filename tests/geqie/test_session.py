@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+import geqie
+from geqie.encodings import frqi, optional_functions
+from geqie.planner import ResourceError
+
+from .helpers import encode, encode_statevector, encoding_functions, random_image
+
+ENCODING = encoding_functions(frqi)
+
+
+def test_session_reuses_simulators_and_circuits():
+    session = geqie.Session()
+    image = random_image((4, 4))
+    circuit = session.encode(*ENCODING, image, **optional_functions(frqi))
+
+    counts = session.simulate(circuit, 1024, seed=7)
+    assert counts == session.simulate(circuit, 1024, seed=7)
+    assert counts == geqie.simulate(circuit, 1024, seed=7)
+    assert session.simulator() is session.simulator()
+    assert (session.hits, session.misses) == (1, 1)
+
+
+def test_session_simulates_bound_templates():
+    session = geqie.Session()
+    images = random_image((3, 4, 4))
+    template = session.encode_template(*ENCODING, images[0], **optional_functions(frqi))
+    assert session.encode_template(*ENCODING, images[1], **optional_functions(frqi)) is template
+
+    results = session.simulate(template.circuit, 2**15, parameter_values=template.bind(images, batch=True), seed=7)
+    single = session.simulate(template.circuit, 2**15, parameter_values=template.bind(images[0]), seed=7)
+
+    assert len(results) == len(images)
+    assert session.misses == 1
+    assert sum(single.values()) == 2**15
+    for image, counts in zip(images, results):
+        assert np.allclose(image, frqi.retrieve_function(counts), atol=20)
+
+
+def test_simulate_many_returns_counts_in_input_order():
+    images = random_image((4, 2, 2))
+    circuits = [encode(frqi, image) for image in images]
+
+    results = geqie.simulate_many(circuits, 2**15, seed=7, return_padded_counts=True)
+    assert results == geqie.Session().simulate_many(circuits, 2**15, seed=7, return_padded_counts=True)
+
+    assert len(results) == len(images)
+    for image, counts in zip(images, results):
+        assert len(counts) == 2**3
+        assert np.allclose(image, frqi.retrieve_function(counts), atol=20)
+
+
+def test_analytic_sampling_matches_exact_probabilities():
+    image = random_image((4, 4))
+    circuit = encode(frqi, image)
+    state = encode_statevector(frqi, image)
+
+    probabilities = geqie.simulate(circuit, 1, return_probabilities=True)
+    assert np.allclose(probabilities, np.abs(state)**2)
+    assert np.allclose(geqie.Session().simulate(circuit, 1, return_probabilities=True), probabilities)
+
+    sweep = geqie.simulate(circuit, [2**10, 2**14], analytic=True, seed=7)
+    assert sweep == geqie.simulate(circuit, [2**10, 2**14], analytic=True, seed=7)
+    assert sweep == geqie.Session().simulate(circuit, [2**10, 2**14], analytic=True, seed=7)
+    assert [sum(counts.values()) for counts in sweep] == [2**10, 2**14]
+
+
+def test_analytic_sampling_handles_mixed_sizes():
+    images = [random_image((2, 2)), random_image((4, 4)), random_image((8, 8))]
+    circuits = [encode(frqi, image) for image in images]
+    states = [encode_statevector(frqi, image) for image in images]
+
+    for simulate_many in (geqie.simulate_many, geqie.Session().simulate_many):
+        probabilities = simulate_many(circuits, 1, return_probabilities=True)
+        assert [len(row) for row in probabilities] == [2**3, 2**5, 2**7]
+        assert all(np.allclose(row, np.abs(state)**2) for row, state in zip(probabilities, states))
+
+        counts = simulate_many(circuits, 256, analytic=True, seed=7)
+        assert [len(next(iter(row))) for row in counts] == [3, 5, 7]
+        assert all(sum(row.values()) == 256 for row in counts)
+
+
+def test_session_plans_like_simulate():
+    session = geqie.Session(method="matrix_product_state")
+    circuit = encode(frqi, random_image((4, 4)))
+
+    with pytest.raises(ResourceError):
+        session.simulate(circuit, 1024, memory_budget=2**8)
+    assert session.simulate(circuit, 1024, dry_run=True).method == "matrix_product_state"
+    # Sequences of shot counts run through geqie.simulate, still on the method of the session
+    assert session.simulate(circuit, [16, 32], dry_run=True).method == "matrix_product_state"
+    assert [sum(counts.values()) for counts in session.simulate(circuit, [16, 32], seed=7)] == [16, 32]
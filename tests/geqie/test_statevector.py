@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from qiskit.quantum_info import Statevector
+
+import geqie
+from geqie.encodings import frqi, mcqi
+
+from .helpers import encode, encode_statevector, encoding_functions, random_image
+
+
+@pytest.mark.parametrize("encoding, image", [
+    (frqi, random_image((4, 4))),
+    (mcqi, random_image((2, 2, 3))),
+])
+def test_encode_statevector_matches_circuit(encoding, image):
+    circuit = encode(encoding, image, perform_measurement=False)
+    state = encode_statevector(encoding, image)
+
+    assert Statevector(circuit).equiv(Statevector(state))
+
+
+def test_encode_statevector_batch():
+    images = random_image((3, 2, 2))
+    states = geqie.encode_statevector(*encoding_functions(frqi), images, batch=True)
+
+    assert states.shape == (3, 2**3)
+    for image, state in zip(images, states):
+        single = geqie.encode_statevector(*encoding_functions(frqi), image)
+        assert np.allclose(state, single)
+
+
+def test_simulate_direct_engine():
+    image = random_image((4, 4))
+    state = geqie.encode_statevector(*encoding_functions(frqi), image)
+
+    counts = geqie.simulate(state, 4096, engine="direct", seed=7)
+    assert sum(counts.values()) == 4096
+    assert counts == geqie.simulate(state, 4096, engine="direct", seed=7)
+
+    retrieved_image = frqi.retrieve_function(geqie.simulate(state, 2**16, engine="direct", seed=7))
+    assert np.allclose(image, retrieved_image, atol=20)
@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+from qiskit import transpile
+from qiskit.quantum_info import Statevector
+
+import geqie
+from geqie.backends.aer import get_aer_simulator, prepare_circuit
+from geqie.encodings import frqci, frqi, ifrqi, mcqi, mfrqi, ncqi, neqr, optional_functions, qrci, qualpi
+from geqie.synthesis import esop_cover, product_structure
+
+from .helpers import encode, encode_statevector, random_image
+
+
+@pytest.mark.parametrize("encoding, image, image_dimensionality", [
+    (frqi, random_image((4, 4)), 2),
+    (frqci, random_image((4, 4, 3)), 2),
+    (mfrqi, random_image((2, 2, 2)) / 255, 3),
+    (mcqi, random_image((2, 2, 3)), 2),
+    (ifrqi, random_image((4, 4)), 2),
+])
+def test_rotation_synthesis_matches_operator(encoding, image, image_dimensionality):
+    kwargs = dict(image_dimensionality=image_dimensionality, perform_measurement=False)
+
+    circuit = encode(encoding, image, **kwargs)
+    expected = Statevector(encode(encoding, image, synthesis="operator", **kwargs))
+
+    assert "multiplexed_ry" in circuit.count_ops()
+    assert np.allclose(Statevector(circuit).probabilities(), expected.probabilities())
+    # Aer runs the rotations as its native multiplexer
+    assert "multiplexer" in prepare_circuit(circuit, get_aer_simulator()).count_ops()
+
+
+def test_rotation_synthesis_uses_linear_cnot_count():
+    image = random_image((8, 8))
+    circuit = encode(frqi, image)
+
+    transpiled = transpile(circuit, basis_gates=["cx", "ry", "h"], optimization_level=0)
+    assert transpiled.count_ops()["cx"] == image.size == geqie.estimate(frqi, image.shape, target="hardware").two_qubit_gates
+
+
+def test_shared_positions_fall_back_to_operator():
+    # ifrqi maps the pixels of non-square images onto shared basis positions
+    image = random_image((2, 4))
+
+    circuit = encode(ifrqi, image, perform_measurement=False)
+    expected = Statevector(encode(ifrqi, image, perform_measurement=False, synthesis="operator"))
+
+    assert np.allclose(Statevector(circuit).probabilities(), expected.probabilities())
+    with pytest.raises(ValueError):
+        encode(ifrqi, image, synthesis="quadtree")
+
+
+def test_custom_init_falls_back_to_operator():
+    def init_function(n_qubits: int, **_) -> Statevector:
+        # Only the color qubit and the lowest position qubit in superposition
+        return Statevector.from_label("0" * (n_qubits - 2) + "++")
+
+    image = random_image((4, 4))
+    functions = (init_function, frqi.data_function, frqi.map_function)
+    optional = optional_functions(frqi)
+
+    circuit = geqie.encode(*functions, image, perform_measurement=False, **optional)
+    expected = Statevector(geqie.encode(*functions, image, perform_measurement=False, synthesis="operator", **optional))
+
+    assert np.allclose(Statevector(circuit).probabilities(), expected.probabilities())
+    with pytest.raises(ValueError):
+        geqie.encode(*functions, image, synthesis="ucr", **optional)
+
+
+def test_label_superpositions_keep_measure_sampling():
+    circuit = encode(mcqi, random_image((2, 2, 3)))
+    simulator = get_aer_simulator(method="statevector")
+
+    runnable = prepare_circuit(circuit, simulator)
+    result = simulator.run(runnable, shots=64).result()
+
+    assert "initialize" not in runnable.count_ops()
+    assert result.results[0].metadata["measure_sampling"]
+
+
+def test_rotation_synthesis_requires_angle_encoding():
+    with pytest.raises(ValueError):
+        encode(neqr, random_image((2, 2)), synthesis="ucr")
+
+
+@pytest.mark.parametrize("num_variables, density", [(0, 1), (3, 0.5), (8, 0.1), (8, 0.9)])
+def test_esop_cover_is_exact(rng, num_variables, density):
+    function = rng.random(2**num_variables) < density
+    care, value = esop_cover(np.flatnonzero(function), num_variables)
+
+    inputs = np.arange(2**num_variables)[:, None]
+    assert np.array_equal(((inputs & care) == value).sum(axis=1) % 2 == 1, function)
+
+
+@pytest.mark.parametrize("encoding, image, encoding_params", [
+    (neqr, random_image((4, 4)), {"bitrate": 4}),
+    (qualpi, random_image((2, 2)), {}),
+    (ncqi, random_image((2, 2, 3)), {}),
+    (qrci, random_image((2, 2, 3)), {}),
+])
+def test_esop_synthesis_matches_operator(encoding, image, encoding_params):
+    kwargs = dict(perform_measurement=False, encoding_params=encoding_params)
+
+    circuit = encode(encoding, image, **kwargs)
+    expected = Statevector(encode(encoding, image, synthesis="operator", **kwargs))
+
+    assert "unitary" not in circuit.count_ops()
+    assert np.allclose(Statevector(circuit).probabilities(), expected.probabilities())
+
+
+def test_esop_synthesis_scales_with_entropy():
+    def controlled_gates(image):
+        circuit = encode(neqr, image)
+        return sum(count for name, count in circuit.count_ops().items() if name in ("cx", "ccx", "mcx"))
+
+    constant = np.full((16, 16), 200, dtype=np.uint8)
+    halves = np.repeat([[10], [200]], 8, axis=0).repeat(16, axis=1).astype(np.uint8)
+    noise = random_image((16, 16))
+
+    assert controlled_gates(constant) == 0
+    assert controlled_gates(halves) <= 8
+    assert controlled_gates(noise) > 100
+
+
+@pytest.mark.parametrize("encoding, image, image_dimensionality", [
+    (frqi, np.kron(random_image((2, 2)), np.ones((4, 4), dtype=np.uint8)), 2),
+    (mfrqi, np.kron(random_image((2, 2, 2)) / 255, np.ones((2, 2, 2))), 3),
+    (ifrqi, np.kron(random_image((2, 2)), np.ones((2, 2), dtype=np.uint8)), 2),
+    (neqr, np.kron(random_image((2, 2)), np.ones((4, 4), dtype=np.uint8)), 2),
+    (ncqi, np.kron(random_image((2, 2, 3)), np.ones((2, 2, 1), dtype=np.uint8)), 2),
+])
+def test_quadtree_synthesis_compresses_uniform_blocks(encoding, image, image_dimensionality):
+    kwargs = dict(image_dimensionality=image_dimensionality, perform_measurement=False)
+
+    circuit = encode(encoding, image, synthesis="quadtree", **kwargs)
+    expected = Statevector(encode(encoding, image, **kwargs))
+
+    assert np.allclose(Statevector(circuit).probabilities(), expected.probabilities())
+    assert circuit.metadata["compression"] >= 4
+    assert sum(geqie.simulate(circuit.measure_all(inplace=False), 100, seed=0).values()) == 100
+
+
+@pytest.mark.parametrize("encoding, image", [
+    (frqi, random_image((4, 4))),
+    (neqr, random_image((2, 2))),
+    (qrci, random_image((2, 2, 3))),
+])
+def test_structured_init_states_use_hadamards(encoding, image):
+    circuit = encode(encoding, image, perform_measurement=False, synthesis="operator")
+
+    assert "state_preparation" not in circuit.count_ops()
+    assert np.allclose(Statevector(circuit).data, encode_statevector(encoding, image))
+
+
+def test_product_structure():
+    assert product_structure(np.kron([1, 1], [0, 1])) == (0b10, 0b01, 0.0)
+    assert product_structure(-np.ones(4))[:2] == (0b11, 0)
+    assert product_structure(np.array([1, 0, 0, 1])) is None
+    assert product_structure(np.array([1, 1j, 0, 0])) is None
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from qiskit.circuit.library import RYGate
+from qiskit.quantum_info import Operator, Statevector
+from scipy.linalg import block_diag
+
+import geqie
+from geqie.encodings import frqci, frqi, mcqi, mfrqi, neqr, optional_functions
+from geqie.synthesis import ucry, ucry_angles
+
+from .helpers import encode, encoding_functions, random_image
+
+
+@pytest.mark.parametrize("num_controls", [0, 1, 3])
+def test_ucry_matches_multiplexed_rotations(rng, num_controls):
+    angles = rng.uniform(-np.pi, np.pi, 2**num_controls)
+    expected = block_diag(*[RYGate(angle).to_matrix() for angle in angles])
+
+    assert np.allclose(Operator(ucry(ucry_angles(angles), num_controls)).data, expected)
+
+
+@pytest.mark.parametrize("encoding, images, image_dimensionality", [
+    (frqi, random_image((2, 4, 4), low=1), 2),
+    (frqci, random_image((2, 4, 4, 3), low=1), 2),
+    (mfrqi, random_image((2, 2, 2, 2), low=26) / 255, 3),
+    (mcqi, random_image((2, 2, 2, 3), low=1), 2),
+])
+def test_template_matches_encode(encoding, images, image_dimensionality):
+    template = geqie.encode_template(
+        *encoding_functions(encoding),
+        images[0],
+        image_dimensionality=image_dimensionality,
+        perform_measurement=False,
+        **optional_functions(encoding),
+    )
+
+    values = template.bind(images, batch=True)
+    assert values.shape == (len(images), template.circuit.num_parameters)
+
+    for image in images:
+        circuit = encode(encoding, image, image_dimensionality=image_dimensionality, perform_measurement=False)
+        assert Statevector(template.assign(image)).equiv(Statevector(circuit))
+
+
+def test_template_requires_angle_encoding():
+    with pytest.raises(ValueError):
+        geqie.encode_template(*encoding_functions(neqr), random_image((2, 2)), **optional_functions(neqr))
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from geqie import tiling
+from geqie.encodings import frqi, neqr, optional_functions
+
+from .helpers import encoding_functions, random_image
+
+
+def test_tile_layout_orders():
+    row_major = tiling.tile_layout((8, 8), 2)
+    z_order = tiling.tile_layout((8, 8), 2, order="z-order")
+
+    assert row_major.origins[:4] == [(0, 0), (0, 2), (0, 4), (0, 6)]
+    assert z_order.origins[:4] == [(0, 0), (0, 2), (2, 0), (2, 2)]
+    assert sorted(z_order.origins) == sorted(row_major.origins)
+    assert tiling.TileLayout.from_dict(z_order.to_dict()) == z_order
+
+    with pytest.raises(ValueError):
+        tiling.tile_layout((8, 8), 3)
+
+
+def test_split_and_stitch_tiles_roundtrip():
+    image = random_image((7, 5, 3))
+    layout = tiling.tile_layout(image.shape[:2], 4)
+    tiles = tiling.split_tiles(image, layout)
+
+    assert all(tile.shape == (4, 4, 3) for tile in tiles)
+    assert np.array_equal(tiling.stitch_tiles(tiles, layout), image)
+
+
+def test_choose_tile_size_fits_memory_budget():
+    budget = tiling.tile_memory(8, 1)
+    assert tiling.choose_tile_size((64, 64), 1, budget) == 8
+    assert tiling.choose_tile_size((5, 5), 1, 2**30) == 8
+
+    with pytest.raises(MemoryError):
+        tiling.choose_tile_size((64, 64), 8, 1024)
+
+
+@pytest.mark.parametrize("encoding, tile_size", [(frqi, 4), (neqr, None)])
+def test_tiled_encoding_roundtrip(encoding, tile_size):
+    image = random_image((6, 5))
+    tiled = tiling.encode_tiled(
+        *encoding_functions(encoding),
+        image,
+        tile_size=tile_size,
+        memory_budget=2**24,
+        workers=1,
+        **optional_functions(encoding),
+    )
+    results = tiling.simulate_tiled(tiled, 2**16, workers=1, engine="direct", seed=7)
+    retrieved_image = tiling.retrieve_tiled(encoding.retrieve_function, results, tiled.layout)
+
+    assert retrieved_image.shape == image.shape
+    assert np.allclose(image, retrieved_image, atol=20)
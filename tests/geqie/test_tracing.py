@@ -0,0 +1,35 @@
+import numpy as np
+
+import geqie
+from geqie.encodings import frqi
+
+from .helpers import encode, random_image
+
+
+def test_trace_records_stages_and_counters():
+    image = random_image((4, 4))
+    records = []
+    trace = geqie.Trace(callback=records.append)
+
+    circuit = encode(frqi, image, synthesis="operator", trace=trace)
+    geqie.simulate(circuit, 128, seed=7, trace=trace)
+
+    assert [record.name for record in trace.stages] == [
+        "preprocessing", "assembly", "unitarization", "circuit_build", "transpile", "simulation", "result_conversion",
+    ]
+    assert records == trace.stages
+    assert all(record.wall_time >= 0 and record.peak_memory >= 0 for record in trace.stages)
+    assert trace.counters["num_qubits"] == circuit.num_qubits
+    assert trace.counters["n_shots"] == 128
+
+
+def test_nested_stages_report_enclosing_peaks():
+    trace = geqie.Trace()
+    with trace.stage("outer"):
+        with trace.stage("inner"):
+            block = np.ones(2**20)
+        del block
+
+    inner, outer = trace.stages
+    assert inner.peak_memory >= 2**23
+    assert outer.peak_memory >= inner.peak_memory